@@ -0,0 +1,25 @@
+import { readFile } from "fs/promises";
+import path from "path";
+import { NextResponse } from "next/server";
+
+import { parseSimulationOutput } from "@/lib/stream-data";
+
+export const dynamic = "force-dynamic";
+
+// Serves the records written so far by a (possibly running) simulation.
+// Point SIMULATION_OUTPUT at the file given to --frontend-output; `?from=N`
+// skips records the client already has.
+export async function GET(request: Request) {
+  const file =
+    process.env.SIMULATION_OUTPUT ?? path.join(process.cwd(), "..", "frontend_output.json");
+  const from = Number(new URL(request.url).searchParams.get("from") ?? 0);
+
+  let text: string;
+  try {
+    text = await readFile(file, "utf8");
+  } catch {
+    return NextResponse.json({ data: [], total: 0 }, { status: 404 });
+  }
+  const records = parseSimulationOutput(text);
+  return NextResponse.json({ data: records.slice(from), total: records.length });
+}
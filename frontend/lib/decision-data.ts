@@ -9,7 +9,7 @@ const AIDecisionSchema = z.object({
   amount: z.number(),
 });
 
-const EnergyDecisionSchema = z.object({
+export const EnergyDecisionSchema = z.object({
   step: z.string().regex(/^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$/),
   total_consumption: z.number(),
   total_production: z.number(),
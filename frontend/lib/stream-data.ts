@@ -0,0 +1,48 @@
+import { EnergyDecisionSchema, type EnergyDecision } from "./decision-data";
+
+// Reader for the simulation's frontend output while a run is still writing it.
+// Handles NDJSON (one record per line) and the `{"data": [...]}` array format;
+// anything after the last complete record is ignored.
+
+function completeArrayRecords(text: string): string[] {
+  const records: string[] = [];
+  let depth = 0;
+  let inString = false;
+  let escaped = false;
+  let start = -1;
+  for (let i = 0; i < text.length; i++) {
+    const ch = text[i];
+    if (inString) {
+      if (escaped) escaped = false;
+      else if (ch === "\\") escaped = true;
+      else if (ch === '"') inString = false;
+      continue;
+    }
+    if (ch === '"') {
+      inString = true;
+    } else if (ch === "{" || ch === "[") {
+      depth++;
+      // Records are the objects directly inside {"data": [ ... ]}
+      if (depth === 3 && ch === "{") start = i;
+    } else if (ch === "}" || ch === "]") {
+      if (depth === 3 && start >= 0) {
+        records.push(text.slice(start, i + 1));
+        start = -1;
+      }
+      depth--;
+    }
+  }
+  return records;
+}
+
+export function parseSimulationOutput(text: string): EnergyDecision[] {
+  const trimmed = text.trimStart();
+  let raw: string[];
+  if (/^\{\s*"data"/.test(trimmed)) {
+    raw = completeArrayRecords(trimmed);
+  } else {
+    // NDJSON: only newline-terminated lines are complete
+    raw = trimmed.split("\n").slice(0, -1).filter((line) => line.trim() !== "");
+  }
+  return raw.map((record) => EnergyDecisionSchema.parse(JSON.parse(record)));
+}
@@ -0,0 +1,4 @@
+def main():
+    from operatorzy.cli import main
+
+    main()
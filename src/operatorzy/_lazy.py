@@ -0,0 +1,25 @@
+import importlib
+
+
+def lazy_exports(package, exports):
+    """Module ``__getattr__``/``__dir__`` importing ``exports`` on first access.
+
+    ``exports`` maps a public name to the submodule (relative to
+    ``package``) that defines it; the submodule is imported only when the name
+    is looked up, and the result is cached in the package namespace.
+    """
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name):
+        try:
+            module = exports[name]
+        except KeyError:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}") from None
+        value = getattr(importlib.import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
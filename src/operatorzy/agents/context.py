@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class DecisionContext:
+    """Everything an agent may look at when deciding one simulation step."""
+
+    step: int
+    net_energy: float
+    consumption: float
+    production: float
+    storage_levels: list  # normalized 0–1, one entry per storage
+    storage_capacities: list = None  # kWh, one entry per storage
+    hour: int = 0  # hour of day
+    purchase_price: float = 0.0
+    sale_price: float = 0.0
+    prices: object = None  # PriceOracle for lookahead queries
+    date: str = None
+    future_data: list = field(default_factory=list)
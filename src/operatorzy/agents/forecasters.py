@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class RollingMeanForecaster:
+    """Mean of the last ``window`` observations, O(1) time and memory per step.
+
+    Keeps a ring buffer and a running sum; the sum is recomputed from the
+    buffer every time the ring wraps so rounding drift cannot build up over
+    long runs. A ``window`` of zero or less keeps no history and forecasts 0.
+    """
+
+    def __init__(self, window):
+        self.window = max(window, 0)
+        self._buffer = [0.0] * self.window
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, step, value):
+        if not self.window:
+            return
+        if self._count == self.window:
+            self._sum -= self._buffer[self._pos]
+        else:
+            self._count += 1
+        self._buffer[self._pos] = value
+        self._sum += value
+        self._pos += 1
+        if self._pos == self.window:
+            self._pos = 0
+            self._sum = sum(self._buffer)
+
+    def forecast(self, step):
+        if self._count == 0:
+            return 0
+        return self._sum / self._count
+
+
+class EWMAForecaster:
+    """Exponentially weighted moving average of the observations."""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self._level = None
+
+    def update(self, step, value):
+        if self._level is None:
+            self._level = value
+        else:
+            self._level += self.alpha * (value - self._level)
+
+    def forecast(self, step):
+        return 0 if self._level is None else self._level
+
+
+class SeasonalMeanForecaster:
+    """Per-slot mean (e.g. hour of day) over the last ``window`` periods."""
+
+    def __init__(self, period=24, window=7):
+        self.period = period
+        self.window = window
+        self._buffer = np.zeros((window, period))
+        self._sums = np.zeros(period)
+        self._counts = np.zeros(period, dtype=np.int64)
+
+    def update(self, step, value):
+        slot = step % self.period
+        row = (step // self.period) % self.window
+        if self._counts[slot] == self.window:
+            self._sums[slot] -= self._buffer[row, slot]
+        else:
+            self._counts[slot] += 1
+        self._buffer[row, slot] = value
+        self._sums[slot] += value
+        if row == self.window - 1:
+            self._sums[slot] = self._buffer[:, slot].sum()
+
+    def forecast(self, step):
+        slot = step % self.period
+        if self._counts[slot] == 0:
+            return 0
+        return self._sums[slot] / self._counts[slot]
+
+    def forecast_many(self, step, horizon):
+        """Forecasts for ``step .. step + horizon - 1`` as an array."""
+        slots = np.arange(step, step + horizon) % self.period
+        counts = self._counts[slots]
+        return np.divide(
+            self._sums[slots], counts, out=np.zeros(horizon), where=counts > 0
+        )
+
+
+def make_forecaster(kind, window):
+    """Build a forecaster from an agent's ``forecaster`` parameter.
+
+    ``window`` is the history in hours: the rolling mean's length, the EWMA's
+    span, and for the seasonal mean the days (rounded up) averaged per hour of
+    day. With ``window <= 0`` there is no history and every forecast is 0.
+    """
+    if not isinstance(kind, str):
+        return kind
+    if kind not in ("rolling", "ewma", "seasonal"):
+        raise ValueError(f"Unknown forecaster {kind!r}")
+    if kind == "rolling" or window <= 0:
+        return RollingMeanForecaster(window)
+    if kind == "ewma":
+        return EWMAForecaster(2 / (window + 1))
+    return SeasonalMeanForecaster(window=-(-window // 24))
@@ -1,5 +1,12 @@
 import numpy as np
-import random
+
+from operatorzy.agents.forecasters import make_forecaster
+
+# Monte Carlo draws are made for a block of steps at once, up to this many
+# samples per call
+MAX_BLOCK_SAMPLES = 1 << 20
+# Coin flips per step: aggressive sell/discharge, chaos sell/discharge/store
+N_FLIPS = 5
 
 class HybridEnergyAgent:
     def __init__(
@@ -14,10 +21,14 @@ class HybridEnergyAgent:
         high_consumption_threshold=0.8,
         aggressive_mode=True,
         montecarlo_trials=100,
-        chaos_mode=True
+        chaos_mode=True,
+        forecaster='rolling',
+        seed=0,
+        block_size=256,
     ):
         self.grid_costs = grid_costs
         self.forecast_horizon = forecast_horizon
+        self.forecaster = make_forecaster(forecaster, forecast_horizon)
         self.sell_threshold = sell_threshold
         self.grid_price_threshold = grid_price_threshold
         self.peak_morning = peak_morning
@@ -27,72 +38,102 @@ class HybridEnergyAgent:
         self.aggressive_mode = aggressive_mode
         self.montecarlo_trials = montecarlo_trials
         self.chaos_mode = chaos_mode  # unleash wild behavior for massive gains
+        # Separate streams so the coin flips do not depend on the trial count;
+        # seed=None draws fresh entropy
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self._mc_rng, self._flip_rng = self.rng.spawn(2)
+        self.block_size = block_size
+        self._mc_probability = 0.9 if chaos_mode else 0.6
+        self._mc_block = np.empty(0)
+        self._mc_pos = 0
+        self._flip_block = np.empty((0, N_FLIPS))
+        self._flip_pos = 0
 
     def in_peak(self, hour):
         return self.peak_morning[0] <= hour < self.peak_morning[1] or \
                self.peak_evening[0] <= hour < self.peak_evening[1]
 
-    def forecast_net_energy(self, net_energy_history):
-        window = min(len(net_energy_history), self.forecast_horizon)
-        if window == 0:
-            return 0
-        return np.mean(net_energy_history[-window:])
+    def forecast_net_energy(self, step, net_energy):
+        self.forecaster.update(step, net_energy)
+        return self.forecaster.forecast(step + 1)
+
+    def _gain_factors(self, steps, discharge_probability):
+        """Mean simulated gain per unit of sale price, for ``steps`` steps."""
+        trials = self.montecarlo_trials
+        sell = self._mc_rng.random((steps, trials)) < discharge_probability
+        gamble_multiplier = 1 + self._mc_rng.uniform(-0.2, 0.9, (steps, trials))  # even more volatile gamble
+        return np.where(sell, gamble_multiplier, -0.2).mean(axis=1)  # small penalty if it fails
 
     def montecarlo_expected_gain(self, sale_price, discharge_probability=0.6):
-        gains = []
-        for _ in range(self.montecarlo_trials):
-            sell = random.random() < discharge_probability
-            gamble_multiplier = 1 + random.uniform(-0.2, 0.9)  # even more volatile gamble
-            gains.append(sale_price * gamble_multiplier if sell else -sale_price * 0.2)  # small penalty if it fails
-        return np.mean(gains)
-
-    def decide(self, step, net_energy, consumption, production, storage_levels, net_energy_history):
-        hour = step % 24
-        sale_price = self.grid_costs[hour]['sale']
-        grid_price = self.grid_costs[hour]['purchase']
-
-        forecast = self.forecast_net_energy(net_energy_history)
-        storage_not_full = any(level < 0.9 for level in storage_levels)
-        storage_has_energy = any(level > 0.1 for level in storage_levels)
-        storage_full = all(level > 0.9 for level in storage_levels)
+        if discharge_probability != self._mc_probability:
+            return sale_price * float(self._gain_factors(1, discharge_probability)[0])
+        if self._mc_pos == len(self._mc_block):
+            steps = max(1, min(self.block_size, MAX_BLOCK_SAMPLES // self.montecarlo_trials))
+            self._mc_block = self._gain_factors(steps, discharge_probability).tolist()
+            self._mc_pos = 0
+        factor = self._mc_block[self._mc_pos]
+        self._mc_pos += 1
+        return sale_price * factor
+
+    def _coin_flips(self):
+        if self._flip_pos == len(self._flip_block):
+            self._flip_block = self._flip_rng.random((self.block_size, N_FLIPS)).tolist()
+            self._flip_pos = 0
+        flips = self._flip_block[self._flip_pos]
+        self._flip_pos += 1
+        return flips
+
+    def decide(self, ctx):
+        hour = ctx.hour
+        sale_price = ctx.sale_price
+        grid_price = ctx.purchase_price
+
+        forecast = self.forecast_net_energy(ctx.step, ctx.net_energy)
+        storage_not_full = any(level < 0.9 for level in ctx.storage_levels)
+        storage_has_energy = any(level > 0.1 for level in ctx.storage_levels)
+        storage_full = all(level > 0.9 for level in ctx.storage_levels)
 
         decision = {'store_energy': False, 'discharge': False, 'sell_energy': False}
 
         # 1. Always use storage to cover deficit
-        if net_energy < 0 and storage_has_energy:
+        if ctx.net_energy < 0 and storage_has_energy:
             decision['discharge'] = True
 
         # 2. Monte Carlo + Chaos: sell if simulated outcome is juicy
-        expected_gain = self.montecarlo_expected_gain(sale_price, discharge_probability=0.9 if self.chaos_mode else 0.6)
+        expected_gain = self.montecarlo_expected_gain(sale_price, discharge_probability=self._mc_probability)
         if (expected_gain >= self.sell_threshold or storage_full) and storage_has_energy:
             decision['sell_energy'] = True
 
         # 3. Store excess if we have production
-        if net_energy > 0 and storage_not_full and production >= self.high_production_threshold:
+        if ctx.net_energy > 0 and storage_not_full and ctx.production >= self.high_production_threshold:
             decision['store_energy'] = True
 
         # 4. If high consumption and grid is expensive → discharge
-        if consumption >= self.high_consumption_threshold and grid_price >= self.grid_price_threshold and storage_has_energy:
+        if ctx.consumption >= self.high_consumption_threshold and grid_price >= self.grid_price_threshold and storage_has_energy:
             decision['discharge'] = True
 
         # 5. Forecast says surplus is coming, free up space now
         if forecast > 0.5 and storage_full and sale_price >= self.sell_threshold:
             decision['sell_energy'] = True
 
+        # One flip per gamble, drawn every step so the streams stay aligned
+        flips = self._coin_flips()
+
         # 6. Aggressive mode: always gamble with prices
         if self.aggressive_mode:
-            if random.random() < 0.6 and sale_price >= self.sell_threshold * 0.7 and storage_has_energy:
+            if flips[0] < 0.6 and sale_price >= self.sell_threshold * 0.7 and storage_has_energy:
                 decision['sell_energy'] = True
-            if random.random() < 0.5 and grid_price >= self.grid_price_threshold * 0.7 and storage_has_energy:
+            if flips[1] < 0.5 and grid_price >= self.grid_price_threshold * 0.7 and storage_has_energy:
                 decision['discharge'] = True
 
         # 7. Chaos Mode: wild coin flips and occasional madness
         if self.chaos_mode and storage_has_energy:
-            if random.random() < 0.33:
+            if flips[2] < 0.33:
                 decision['sell_energy'] = True
-            if random.random() < 0.33:
+            if flips[3] < 0.33:
                 decision['discharge'] = True
-            if random.random() < 0.1 and storage_not_full:
+            if flips[4] < 0.1 and storage_not_full:
                 decision['store_energy'] = True
 
         return decision
\ No newline at end of file
@@ -0,0 +1,158 @@
+import numpy as np
+
+from operatorzy.agents.forecasters import make_forecaster
+
+
+class MPCAgent:
+    """Receding-horizon agent: re-solves a short dispatch problem every step.
+
+    Each step forecasts net energy for the next ``horizon`` hours (the current
+    hour is known), takes the tariff from ``ctx.prices`` and runs the same
+    backward DP as ``solve_optimal_dispatch`` over ``resolution`` levels of
+    the aggregate storage. Only the first decision is applied.
+
+    The state grid, its spacing and per-level room are cached until the
+    storage capacity changes. The transitions of the whole horizon are built
+    in one vectorized pass as lower-neighbour indices and weights, so the
+    backward loop is a gather and a max per step. The terminal value is
+    warm-started from the previous solve: its value-to-go one step in,
+    shifted to be relative to an empty storage and scaled by
+    ``terminal_weight``, prices the energy that is still stored when the
+    horizon ends (``terminal_weight=0`` solves every step from scratch).
+
+    ``p2p_base_price`` and ``token_burn_rate`` should match the run. The
+    forecaster learns from the last ``history`` hours (see
+    ``make_forecaster``). With ``perfect_foresight=True`` the actual future
+    profile from ``ctx.future_data`` replaces the forecast.
+    """
+
+    def __init__(
+        self,
+        grid_costs,
+        horizon=24,
+        resolution=41,
+        p2p_base_price=0.5,
+        token_burn_rate=0.1,
+        efficiency=1.0,
+        terminal_weight=0.5,
+        forecaster='seasonal',
+        perfect_foresight=False,
+        history=168,
+    ):
+        self.grid_costs = grid_costs
+        self.horizon = horizon
+        self.resolution = resolution
+        self.p2p_base_price = p2p_base_price
+        self.token_burn_rate = token_burn_rate
+        self.eta = float(np.sqrt(efficiency))
+        self.terminal_weight = terminal_weight
+        self.forecaster = make_forecaster(forecaster, history)
+        self.perfect_foresight = perfect_foresight
+        if perfect_foresight:
+            self.lookahead = horizon - 1
+        self._capacity = None
+        self._terminal = np.zeros(resolution)
+
+    def _prepare(self, capacity):
+        """Cache the level grid for ``capacity`` kWh."""
+        self._capacity = capacity
+        self._grid = np.linspace(0.0, capacity, self.resolution)
+        self._step = capacity / (self.resolution - 1)
+        self._room = (capacity - self._grid) / self.eta
+        self._available = self._grid * self.eta
+        self._terminal = np.zeros(self.resolution)
+
+    def forecast(self, ctx, steps):
+        if self.perfect_foresight:
+            future = ctx.future_data[:steps]
+            return np.array([f['production'] - f['consumption'] for f in future])
+        if hasattr(self.forecaster, 'forecast_many'):
+            return self.forecaster.forecast_many(ctx.step + 1, steps)
+        return np.array([self.forecaster.forecast(ctx.step + 1 + k) for k in range(steps)])
+
+    def decide(self, ctx):
+        self.forecaster.update(ctx.step, ctx.net_energy)
+        decision = {'store_energy': False, 'discharge': False, 'sell_energy': False}
+        if ctx.net_energy > 0 and ctx.sale_price >= 0:
+            decision['sell_energy'] = True  # whatever is not stored
+        capacities = ctx.storage_capacities or []
+        capacity = float(sum(capacities))
+        if capacity <= 0 or ctx.net_energy == 0:
+            return decision
+        if capacity != self._capacity:
+            self._prepare(capacity)
+
+        step = ctx.step
+        prices = ctx.prices
+        horizon = max(1, min(self.horizon, len(prices) - step))
+        net = np.zeros(horizon)
+        net[0] = ctx.net_energy
+        forecast = self.forecast(ctx, horizon - 1)[: horizon - 1]
+        net[1 : 1 + len(forecast)] = forecast
+        purchase = prices.purchase[step : step + horizon]
+        sale = np.maximum(prices.sale[step : step + horizon], 0.0)
+
+        after = self._value_to_go(net, purchase, sale)
+        level = sum(fill * size for fill, size in zip(ctx.storage_levels, capacities))
+        unit_cost = purchase[0] + self.token_burn_rate
+        n = net[0]
+        if n > 0:
+            charged = min(n, (capacity - level) / self.eta)
+            act = (
+                self.p2p_base_price * charged
+                + sale[0] * (n - charged)
+                + np.interp(min(level + charged * self.eta, capacity), self._grid, after)
+            )
+            idle = sale[0] * n + np.interp(level, self._grid, after)
+            decision['store_energy'] = bool(charged > 0 and act > idle)
+        else:
+            discharged = min(-n, level * self.eta)
+            act = (
+                unit_cost * (n + discharged)
+                - self.p2p_base_price * discharged
+                + np.interp(max(level - discharged / self.eta, 0.0), self._grid, after)
+            )
+            idle = unit_cost * n + np.interp(level, self._grid, after)
+            decision['discharge'] = bool(discharged > 0 and act > idle)
+        return decision
+
+    def _value_to_go(self, net, purchase, sale):
+        """Value of each level after the first step of the horizon."""
+        grid = self._grid
+        p2p = self.p2p_base_price
+        eta = self.eta
+        n = net[1:, None]
+        unit_cost = purchase[1:, None] + self.token_burn_rate
+        sale = sale[1:, None]
+
+        # Store on surplus, discharge on deficit: next level and reward of the
+        # active choice for every (step, level); idle keeps the level
+        charged = np.minimum(np.maximum(n, 0.0), self._room)
+        discharged = np.minimum(np.maximum(-n, 0.0), self._available)
+        surplus = n > 0
+        level = np.where(
+            surplus,
+            np.minimum(grid + charged * eta, self._capacity),
+            np.maximum(grid - discharged / eta, 0.0),
+        )
+        active = np.where(
+            surplus,
+            p2p * charged + sale * (n - charged),
+            unit_cost * (n + discharged) - p2p * discharged,
+        )
+        idle = np.where(surplus, sale * n, unit_cost * n)
+        position = level / self._step
+        lower = np.minimum(position.astype(np.intp), self.resolution - 2)
+        weight = position - lower
+
+        value = self._terminal
+        for t in range(len(n) - 1, -1, -1):
+            below = value[lower[t]]
+            value = np.maximum(
+                active[t] + below + weight[t] * (value[lower[t] + 1] - below),
+                idle[t] + value,
+            )
+        # Warm start: the next solve ends one step later. Its window overlaps
+        # this one, so the carried value is damped to avoid counting it twice
+        self._terminal = self.terminal_weight * (value - value[0])
+        return value
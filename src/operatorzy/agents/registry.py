@@ -0,0 +1,43 @@
+import importlib
+
+# Agent name -> "module:Class"; modules are imported only when the agent is used
+AGENTS = {
+    "smart": "operatorzy.agents.smart_agent:SmartAgent",
+    "profit_maximizing": "operatorzy.agents.profit_maximizing_agent:ProfitMaximizingAgent",
+    "planner": "operatorzy.agents.planner_agent:PlannerAgent",
+    "active_storage": "operatorzy.agents.active_storage_agent:ActiveStorageAgent",
+    "forecasting": "operatorzy.agents.forecasting_agent:ForecastingTraderAgent",
+    "ultimate": "operatorzy.agents.ultimate_energy_agent:UltimateEnergyAgent",
+    "ultimate_v2": "operatorzy.agents.ultimate_energy_agent_v2:UltimateEnergyAgentV2",
+    "hybrid": "operatorzy.agents.hybrid_energy_agent:HybridEnergyAgent",
+    "mpc": "operatorzy.agents.mpc_agent:MPCAgent",
+}
+
+DEFAULT_AGENT = "ultimate_v2"
+
+
+def register_agent(name, target):
+    """Register an agent class, or a ``"module:Class"`` path, under ``name``."""
+    AGENTS[name] = target
+
+
+def available_agents():
+    return sorted(AGENTS)
+
+
+def get_agent_class(name):
+    try:
+        target = AGENTS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown agent {name!r}; available: {', '.join(available_agents())}"
+        ) from None
+    if isinstance(target, str):
+        module_name, class_name = target.split(":")
+        target = getattr(importlib.import_module(module_name), class_name)
+    return target
+
+
+def create_agent(name, grid_costs, **params):
+    """Build the agent registered as ``name`` once for a whole run."""
+    return get_agent_class(name)(grid_costs, **params)
@@ -0,0 +1,20 @@
+class ScheduleAgent:
+    """Replays a precomputed decision schedule, e.g. a ``DispatchPlan``.
+
+    ``plan`` needs ``store_energy``, ``discharge`` and ``sell_energy``
+    sequences indexed by step.
+    """
+
+    def __init__(self, grid_costs, plan):
+        self.grid_costs = grid_costs
+        self.store_energy = [bool(x) for x in plan.store_energy]
+        self.discharge = [bool(x) for x in plan.discharge]
+        self.sell_energy = [bool(x) for x in plan.sell_energy]
+
+    def decide(self, ctx):
+        step = ctx.step
+        return {
+            'store_energy': self.store_energy[step],
+            'discharge': self.discharge[step],
+            'sell_energy': self.sell_energy[step],
+        }
@@ -8,36 +8,33 @@ class SmartAgent:
             return sum(history) / len(history)
         return sum(history[-self.window:]) / self.window
 
-    def should_store_energy(self, current_hour, storage_levels, production):
+    def should_store_energy(self, ctx):
         """Store energy if price is expected to rise and storage has room.
            If production is low, prioritize storage over selling."""
-        future_hours = range(current_hour+1, min(current_hour+4, 24))
-        future_prices = [self.grid_costs[h % 24]['purchase'] for h in future_hours]
-        current_price = self.grid_costs[current_hour % 24]['purchase']
-        storage_not_full = any(level < 0.95 for level in storage_levels)
+        future_max_price = ctx.prices.window_max('purchase', ctx.step + 1, ctx.step + 4)
+        current_price = ctx.purchase_price
+        storage_not_full = any(level < 0.95 for level in ctx.storage_levels)
 
-        low_production = production < 0.5  # tune this threshold
+        low_production = ctx.production < 0.5  # tune this threshold
 
-        return (max(future_prices) > current_price or low_production) and storage_not_full
+        return (future_max_price > current_price or low_production) and storage_not_full
 
-    def should_discharge(self, current_hour, storage_levels, consumption):
-        grid_price = self.grid_costs[current_hour % 24]['purchase']
-        storage_has_energy = any(level > 0.1 for level in storage_levels)
-        return grid_price > 0.6 and storage_has_energy and consumption > 0.5
+    def should_discharge(self, ctx):
+        grid_price = ctx.purchase_price
+        storage_has_energy = any(level > 0.1 for level in ctx.storage_levels)
+        return grid_price > 0.6 and storage_has_energy and ctx.consumption > 0.5
 
-    def decide(self, step, net_energy, consumption, production, storage_levels):
-        current_hour = step % 24
-
-        if net_energy > 0:
+    def decide(self, ctx):
+        if ctx.net_energy > 0:
             return {
-                'store_energy': self.should_store_energy(current_hour, storage_levels, production),
+                'store_energy': self.should_store_energy(ctx),
                 'discharge': False
             }
 
-        elif net_energy < 0:
+        elif ctx.net_energy < 0:
             return {
                 'store_energy': False,
-                'discharge': self.should_discharge(current_hour, storage_levels, consumption)
+                'discharge': self.should_discharge(ctx)
             }
 
         return {
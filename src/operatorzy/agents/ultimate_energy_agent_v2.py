@@ -1,5 +1,7 @@
 import numpy as np
 
+from operatorzy.agents.forecasters import make_forecaster
+
 class UltimateEnergyAgentV2:
     def __init__(
         self,
@@ -10,10 +12,12 @@ class UltimateEnergyAgentV2:
         morning_peak=(6, 9),
         evening_peak=(17, 21),
         high_demand_threshold=1.0,
-        high_production_threshold=1.2
+        high_production_threshold=1.2,
+        forecaster='rolling'
     ):
         self.grid_costs = grid_costs
         self.forecast_horizon = forecast_horizon
+        self.forecaster = make_forecaster(forecaster, forecast_horizon)
         self.sell_threshold = sell_threshold
         self.grid_threshold = grid_threshold
         self.morning_peak = morning_peak
@@ -21,34 +25,32 @@ class UltimateEnergyAgentV2:
         self.high_demand_threshold = high_demand_threshold
         self.high_production_threshold = high_production_threshold
 
-    def forecast_net_energy(self, net_energy_history):
-        window = min(len(net_energy_history), self.forecast_horizon)
-        if window == 0:
-            return 0
-        return np.mean(net_energy_history[-window:])
+    def forecast_net_energy(self, step, net_energy):
+        self.forecaster.update(step, net_energy)
+        return self.forecaster.forecast(step + 1)
 
     def in_peak_hour(self, hour):
         return self.morning_peak[0] <= hour < self.morning_peak[1] or \
                self.evening_peak[0] <= hour < self.evening_peak[1]
 
-    def decide(self, step, net_energy, consumption, production, storage_levels, net_energy_history):
-        current_hour = step % 24
-        sale_price = self.grid_costs[current_hour]['sale']
-        grid_price = self.grid_costs[current_hour]['purchase']
+    def decide(self, ctx):
+        current_hour = ctx.hour
+        sale_price = ctx.sale_price
+        grid_price = ctx.purchase_price
 
-        forecast = self.forecast_net_energy(net_energy_history)
-        storage_not_full = any(level < 0.95 for level in storage_levels)
-        storage_has_energy = any(level > 0.05 for level in storage_levels)
-        all_storage_full = all(level > 0.95 for level in storage_levels)
+        forecast = self.forecast_net_energy(ctx.step, ctx.net_energy)
+        storage_not_full = any(level < 0.95 for level in ctx.storage_levels)
+        storage_has_energy = any(level > 0.05 for level in ctx.storage_levels)
+        all_storage_full = all(level > 0.95 for level in ctx.storage_levels)
 
         decision = {'store_energy': False, 'discharge': False, 'sell_energy': False}
 
         # ✅ 1. If there's ANY deficit → try discharging storage
-        if net_energy < 0 and storage_has_energy:
+        if ctx.net_energy < 0 and storage_has_energy:
             decision['discharge'] = True
 
         # 🌞 2. High production → store or sell
-        if production > self.high_production_threshold:
+        if ctx.production > self.high_production_threshold:
             if storage_not_full:
                 decision['store_energy'] = True
             elif sale_price >= self.sell_threshold:
@@ -64,7 +66,7 @@ class UltimateEnergyAgentV2:
             decision['sell_energy'] = True
 
         # 🌼 5. Net surplus now → store or sell
-        if net_energy > 0:
+        if ctx.net_energy > 0:
             if storage_not_full:
                 decision['store_energy'] = True
             elif sale_price >= self.sell_threshold:
@@ -75,3 +77,48 @@ class UltimateEnergyAgentV2:
             decision['sell_energy'] = True
 
         return decision
+
+    def decide_batch(self, ctx):
+        """Same rules as ``decide`` with ``ctx.storage_levels`` as an ``(n, n_storages)`` array."""
+        current_hour = ctx.hour
+        sale_price = ctx.sale_price
+        grid_price = ctx.purchase_price
+
+        forecast = self.forecast_net_energy(ctx.step, ctx.net_energy)
+        storage_levels = np.asarray(ctx.storage_levels)
+        storage_not_full = (storage_levels < 0.95).any(axis=1)
+        storage_has_energy = (storage_levels > 0.05).any(axis=1)
+        all_storage_full = (storage_levels > 0.95).all(axis=1)
+
+        no = np.zeros(len(storage_levels), dtype=bool)
+        store, discharge, sell = no.copy(), no.copy(), no.copy()
+
+        # ✅ 1. If there's ANY deficit → try discharging storage
+        if ctx.net_energy < 0:
+            discharge |= storage_has_energy
+
+        # 🌞 2. High production → store or sell
+        if ctx.production > self.high_production_threshold:
+            store |= storage_not_full
+            if sale_price >= self.sell_threshold:
+                sell |= ~storage_not_full
+
+        # 📈 3. Forecast deficit + peak + high grid → pre-discharge
+        if forecast < -0.5 and self.in_peak_hour(current_hour) and grid_price >= self.grid_threshold:
+            discharge |= storage_has_energy
+
+        # 💰 4. Forecast surplus + full battery → sell
+        if forecast > 0.5 and sale_price >= self.sell_threshold:
+            sell |= all_storage_full
+
+        # 🌼 5. Net surplus now → store or sell
+        if ctx.net_energy > 0:
+            store |= storage_not_full
+            if sale_price >= self.sell_threshold:
+                sell |= ~storage_not_full
+
+        # ⚡ 6. Sitting on full battery and sale price is high
+        if sale_price >= self.sell_threshold:
+            sell |= all_storage_full
+
+        return {'store_energy': store, 'discharge': discharge, 'sell_energy': sell}
@@ -0,0 +1 @@
+# Offline benchmark suite: synthetic data, micro/macro benchmarks, baselines.
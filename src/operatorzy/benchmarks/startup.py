@@ -0,0 +1,90 @@
+import json
+import statistics
+import subprocess
+import sys
+
+# Entry points whose import time is checked, and their default budget
+ENTRY_POINTS = (
+    "operatorzy.simulation",
+    "operatorzy.cli",
+    "operatorzy.simulation.energy_community_simulation",
+    "operatorzy.simulation.sweep",
+    "operatorzy.models.cooperative",
+)
+BUDGET_MS = 300.0
+# Dependencies that must only load when a feature needs them
+HEAVY_MODULES = ("pandas", "matplotlib", "sklearn", "langchain_core", "uagents")
+
+_PROBE = """\
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure_import(module, repeat=5):
+    """Import time of ``module`` in fresh interpreters, in seconds.
+
+    Interpreter startup itself is not included. Also reports which of
+    ``HEAVY_MODULES`` the import pulled in.
+    """
+    times = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        elapsed, heavy = json.loads(output)
+        times.append(elapsed)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "repeat": repeat,
+        "heavy_modules": heavy,
+    }
+
+
+def check_startup(budget_ms=BUDGET_MS, modules=ENTRY_POINTS, repeat=5):
+    """Measure ``modules``; returns ``(results, failures)``.
+
+    A module fails when its fastest import exceeds ``budget_ms`` or when it
+    loads any of ``HEAVY_MODULES``.
+    """
+    results = {}
+    failures = []
+    for module in modules:
+        result = measure_import(module, repeat)
+        results[module] = result
+        if result["min"] * 1e3 > budget_ms:
+            failures.append(
+                f"{module}: {result['min'] * 1e3:.1f} ms > {budget_ms:.0f} ms budget"
+            )
+        if result["heavy_modules"]:
+            failures.append(
+                f"{module}: imports {', '.join(result['heavy_modules'])} at startup"
+            )
+    return results, failures
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the package import time")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS))
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    results, failures = check_startup(args.budget_ms, args.modules, args.repeat)
+    for module, result in results.items():
+        print(f"{module:<52} {result['min'] * 1e3:8.1f} ms")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
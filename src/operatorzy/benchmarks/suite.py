@@ -0,0 +1,444 @@
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from operatorzy.agents.context import DecisionContext
+from operatorzy.agents.registry import DEFAULT_AGENT, available_agents, create_agent
+from operatorzy.benchmarks.startup import BUDGET_MS, check_startup
+from operatorzy.benchmarks.synthetic import (
+    synthetic_grid_costs,
+    synthetic_storages,
+    synthetic_store,
+    write_profiles,
+)
+from operatorzy.models.batch_cooperative import BatchCooperative
+from operatorzy.models.cooperative import Cooperative
+from operatorzy.models.price_oracle import resolve_prices
+from operatorzy.models.storage import StorageBank
+from operatorzy.simulation.bureau import BureauCommunity
+from operatorzy.utils.profile_store import ProfileStore
+
+RESULTS_VERSION = 1
+# Timed calls per benchmark kind; micro benchmarks also get one warm-up call
+REPEAT = {"micro": 7, "macro": 3}
+WARMUP = {"micro": 1, "macro": 0}
+RUN_PARAMS = (0.5, 0.2, 0.1, 0.1)  # p2p price, min price, mint and burn rate
+
+# name -> (kind, setup); see ``benchmark``
+BENCHMARKS = {}
+
+
+def benchmark(name, kind):
+    """Register ``setup(workload) -> (prepare, items)`` under ``name``.
+
+    ``prepare()`` builds fresh state outside the timer and returns the
+    zero-argument callable that is timed; ``items`` is the number of
+    operations one call performs, for the per-item time.
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = (kind, setup)
+        return setup
+
+    return register
+
+
+class Workload:
+    """Synthetic community shared by every benchmark of a suite run."""
+
+    def __init__(self, n_ppe=50, hours=720, n_storages=2, seed=0):
+        self.params = {
+            "n_ppe": n_ppe,
+            "hours": hours,
+            "n_storages": n_storages,
+            "seed": seed,
+        }
+        self.store = synthetic_store(n_ppe, hours, seed)
+        self.storages = synthetic_storages(n_storages)
+        self.grid_costs = synthetic_grid_costs()
+        self.hourly_data = self.store.hourly_data()
+        self.prices = resolve_prices(self.grid_costs, self.hourly_data, lookahead=48)
+        self._tmp = None
+
+    @property
+    def tmp(self):
+        """Scratch directory, removed by ``close``."""
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="operatorzy-bench-")
+        return self._tmp.name
+
+    def close(self):
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def contexts(self):
+        """One ``DecisionContext`` per hour, with reproducible storage levels."""
+        rng = np.random.default_rng(self.params["seed"])
+        capacities = [float(s["capacity"]) for s in self.storages]
+        levels = rng.random((len(self.hourly_data), len(capacities))).tolist()
+        contexts = []
+        for step, entry in enumerate(self.hourly_data):
+            ctx = DecisionContext(
+                step=step,
+                net_energy=entry["production"] - entry["consumption"],
+                consumption=entry["consumption"],
+                production=entry["production"],
+                storage_levels=levels[step],
+                storage_capacities=capacities,
+                hour=int(self.prices.hour_of_day[step]),
+                purchase_price=float(self.prices.purchase[step]),
+                sale_price=float(self.prices.sale[step]),
+                prices=self.prices,
+                date=entry["date"],
+            )
+            ctx.future_data = self.hourly_data[step + 1 : step + 49]
+            contexts.append(ctx)
+        return contexts
+
+    def config(self, agent=DEFAULT_AGENT, **config):
+        return {
+            "storages": [dict(s) for s in self.storages],
+            "agent": agent,
+            "frontend_output": None,
+            "log_level": "OFF",
+            **config,
+        }
+
+    def cooperative(self, agent=DEFAULT_AGENT, **config):
+        return Cooperative(self.config(agent, **config), initial_token_balance=100)
+
+
+def _register_agents():
+    for name in available_agents():
+
+        def setup(workload, name=name):
+            contexts = workload.contexts()
+
+            def prepare():
+                agent = create_agent(name, workload.grid_costs)
+
+                def decide_all():
+                    for ctx in contexts:
+                        agent.decide(ctx)
+
+                return decide_all
+
+            return prepare, len(contexts)
+
+        benchmark(f"decide.{name}", "micro")(setup)
+
+
+_register_agents()
+
+
+@benchmark("storage.bank", "micro")
+def _storage_bank(workload):
+    net = (workload.store.total_production() - workload.store.total_consumption()).tolist()
+
+    def prepare():
+        bank = StorageBank.from_configs(workload.storages)
+
+        def cycle():
+            for amount in net:
+                if amount > 0:
+                    bank.charge(amount)
+                else:
+                    bank.discharge(-amount)
+
+        return cycle
+
+    return prepare, len(net)
+
+
+@benchmark("storage.unit", "micro")
+def _storage_unit(workload):
+    net = (workload.store.total_production() - workload.store.total_consumption()).tolist()
+
+    def prepare():
+        units = StorageBank.from_configs(workload.storages).units()
+
+        def cycle():
+            for amount in net:
+                for storage in units:
+                    if amount > 0:
+                        amount -= storage.charge(amount)
+                    else:
+                        amount += storage.discharge(-amount)
+
+        return cycle
+
+    return prepare, len(net)
+
+
+@benchmark("profiles.load_csv", "micro")
+def _profiles_load_csv(workload):
+    directory = os.path.join(workload.tmp, "profiles")
+    write_profiles(workload.store, directory)
+    return (lambda: lambda: ProfileStore.load(directory)), workload.store.n_ppe
+
+
+@benchmark("profiles.aggregate", "micro")
+def _profiles_aggregate(workload):
+    return (lambda: workload.store.hourly_data), len(workload.store)
+
+
+def _simulate(cooperative, workload):
+    cooperative.simulate(
+        len(workload.hourly_data),
+        *RUN_PARAMS,
+        workload.hourly_data,
+        workload.grid_costs,
+    )
+
+
+@benchmark("run.cooperative", "macro")
+def _run_cooperative(workload):
+    def prepare():
+        cooperative = workload.cooperative()
+        return lambda: _simulate(cooperative, workload)
+
+    return prepare, len(workload.hourly_data)
+
+
+@benchmark("run.outputs", "macro")
+def _run_outputs(workload):
+    """Full run with the dashboard output and an INFO log written to disk."""
+
+    def prepare():
+        cooperative = workload.cooperative(
+            frontend_output=os.path.join(workload.tmp, "frontend_output.json"),
+            log_level="INFO",
+            log_path=os.path.join(workload.tmp, "simulation.log"),
+        )
+        return lambda: _simulate(cooperative, workload)
+
+    return prepare, len(workload.hourly_data)
+
+
+@benchmark("run.households", "macro")
+def _run_households(workload):
+    def prepare():
+        cooperative = workload.cooperative()
+        return lambda: cooperative.simulate_households(
+            workload.store, *RUN_PARAMS, workload.grid_costs
+        )
+
+    return prepare, len(workload.hourly_data) * workload.store.n_ppe
+
+
+@benchmark("run.bureau", "macro")
+def _run_bureau(workload):
+    """``run.households`` with one message-passing agent per PPE and storage."""
+
+    def prepare():
+        community = BureauCommunity(workload.config(), workload.store, workload.grid_costs)
+        return community.run
+
+    return prepare, len(workload.hourly_data) * workload.store.n_ppe
+
+
+@benchmark("run.batch", "macro")
+def _run_batch(workload):
+    """64 storage-scale scenarios of the default agent in lock-step."""
+    capacities = [s["capacity"] for s in workload.storages]
+    scales = np.linspace(0.25, 4.0, 64)[:, None]
+
+    def prepare():
+        batch = BatchCooperative(scales * capacities, 0.5, 0.1, 0.1, 100.0)
+        agent = create_agent(DEFAULT_AGENT, workload.grid_costs)
+        return lambda: batch.simulate(
+            len(workload.hourly_data), workload.hourly_data, workload.grid_costs, agent
+        )
+
+    return prepare, len(workload.hourly_data) * len(scales)
+
+
+def select(patterns=None, kind=None):
+    """Benchmark names matching any of the glob ``patterns`` and ``kind``."""
+    return [
+        name
+        for name, (bench_kind, _) in BENCHMARKS.items()
+        if (kind is None or bench_kind == kind)
+        and (not patterns or any(fnmatch.fnmatch(name, p) for p in patterns))
+    ]
+
+
+def time_benchmark(workload, name, repeat=None):
+    """Time one benchmark; returns its statistics in seconds per call."""
+    kind, setup = BENCHMARKS[name]
+    prepare, items = setup(workload)
+    repeat = repeat or REPEAT[kind]
+    for _ in range(WARMUP[kind]):
+        prepare()()
+    times = []
+    for _ in range(repeat):
+        call = prepare()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "kind": kind,
+        "items": items,
+        "repeat": repeat,
+        "min": best,
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if repeat > 1 else 0.0,
+        "per_item_us": best / items * 1e6 if items else None,
+    }
+
+
+def run_suite(names, workload, repeat=None, progress=None):
+    """Time ``names`` on ``workload`` and return the results document."""
+    results = {}
+    for name in names:
+        results[name] = time_benchmark(workload, name, repeat)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "workload": workload.params,
+        "benchmarks": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10, stat="min"):
+    """Benchmarks of both documents, with their ``stat`` ratio to the baseline.
+
+    A benchmark regressed when it is more than ``threshold`` (a fraction)
+    slower than in the baseline. Benchmarks missing from either side are
+    skipped; results of a different workload are not comparable.
+    """
+    if current["workload"] != baseline["workload"]:
+        raise ValueError(
+            f"Baseline workload {baseline['workload']} differs from "
+            f"{current['workload']}"
+        )
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        ratio = result[stat] / before[stat] if before[stat] else float("inf")
+        rows.append(
+            {
+                "name": name,
+                "baseline": before[stat],
+                "current": result[stat],
+                "ratio": ratio,
+                "regressed": ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def _print_result(name, result):
+    per_item = result["per_item_us"]
+    print(
+        f"{name:<28} {result['min'] * 1e3:10.2f} ms min "
+        f"{result['median'] * 1e3:10.2f} ms median"
+        + (f" {per_item:10.2f} us/item" if per_item is not None else "")
+    )
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "-k",
+        dest="patterns",
+        action="append",
+        help="only benchmarks matching this glob, e.g. 'decide.*' (repeatable)",
+    )
+    parser.add_argument("--kind", choices=sorted(REPEAT), help="micro or macro only")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    parser.add_argument("--ppe", type=int, default=50, help="synthetic PPE count")
+    parser.add_argument("--hours", type=int, default=720, help="synthetic horizon")
+    parser.add_argument("--storages", type=int, default=2, help="storage count")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed")
+    parser.add_argument("--repeat", type=int, help="timed calls per benchmark")
+    parser.add_argument(
+        "--output",
+        help="results JSON path (default: results/benchmarks_<timestamp>.json)",
+    )
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="allowed slowdown vs the baseline, as a fraction (default: 0.10)",
+    )
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        nargs="?",
+        const=BUDGET_MS,
+        metavar="MS",
+        help="also check the import time of the entry points against this "
+        f"budget (default: {BUDGET_MS:.0f} ms) and that they load no heavy "
+        "dependencies",
+    )
+    return parser
+
+
+def run(args):
+    names = select(args.patterns, args.kind)
+    if args.list:
+        for name in names:
+            print(f"{name:<28} {BENCHMARKS[name][0]}")
+        return
+    if not names:
+        raise SystemExit("No benchmarks selected")
+
+    workload = Workload(args.ppe, args.hours, args.storages, args.seed)
+    try:
+        results = run_suite(names, workload, args.repeat, progress=_print_result)
+    finally:
+        workload.close()
+    failures = []
+    if args.startup_budget is not None:
+        results["startup"], failures = check_startup(args.startup_budget)
+        for module, result in results["startup"].items():
+            print(f"import {module:<50} {result['min'] * 1e3:8.1f} ms")
+
+    output = args.output
+    if output is None:
+        formatted_date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output = Path("results") / f"benchmarks_{formatted_date}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else ""
+            print(f"{row['name']:<28} {row['ratio']:6.2f}x {flag}")
+        regressed = [row["name"] for row in rows if row["regressed"]]
+        if regressed:
+            failures.append(
+                f"{len(regressed)} benchmark(s) slower than the baseline by more "
+                f"than {args.threshold:.0%}: {', '.join(regressed)}"
+            )
+    if failures:
+        raise SystemExit("\n".join(failures))
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from operatorzy.utils.profile_store import ProfileStore
+
+START = np.datetime64("2023-06-01T00:00", "m")
+
+# Hourly tariff shape of the bundled grid_costs.json: cheap nights, expensive
+# morning and evening peaks
+_PURCHASE = (
+    0.40, 0.38, 0.36, 0.34, 0.35, 0.38, 0.45, 0.60, 0.75, 0.70, 0.62, 0.58,
+    0.55, 0.55, 0.58, 0.62, 0.70, 0.82, 0.90, 0.85, 0.72, 0.60, 0.50, 0.44,
+)
+
+
+def synthetic_store(n_ppe=50, hours=720, seed=0):
+    """``ProfileStore`` of ``n_ppe`` PPEs over ``hours`` hours, reproducible.
+
+    Production is a daylight bell scaled by a per-PPE peak and a per-day
+    cloudiness; about a third of the PPEs have no PV. Consumption is a base
+    load with morning and evening peaks and hourly noise.
+    """
+    rng = np.random.default_rng(seed)
+    hour_of_day = np.arange(hours) % 24
+    day = np.arange(hours) // 24
+    daylight = np.clip(np.sin((hour_of_day - 5) / 15 * np.pi), 0.0, None)
+    peak = rng.uniform(1.0, 6.0, n_ppe) * (rng.random(n_ppe) > 1 / 3)
+    clouds = rng.uniform(0.3, 1.0, (n_ppe, day[-1] + 1 if hours else 0))[:, day]
+    production = peak[:, None] * daylight * clouds
+
+    base = rng.uniform(0.2, 1.0, n_ppe)[:, None]
+    peaks = np.exp(-((hour_of_day - 7.5) ** 2) / 4) + 1.5 * np.exp(
+        -((hour_of_day - 19) ** 2) / 6
+    )
+    consumption = base * (1 + peaks) * rng.uniform(0.7, 1.3, (n_ppe, hours))
+
+    labels = np.datetime_as_string(START + np.arange(hours).astype("m8[h]"), unit="m")
+    labels = np.char.replace(labels, "T", " ")
+    return ProfileStore(
+        [f"PPE_{i}" for i in range(n_ppe)],
+        labels,
+        np.round(production, 3),
+        np.round(consumption, 3),
+    )
+
+
+def synthetic_storages(n_storages=2, capacity=10.0):
+    """``load_storages``-style configs of growing capacity."""
+    return [
+        {"id": f"S{i + 1}", "capacity": capacity * (i + 1)} for i in range(n_storages)
+    ]
+
+
+def synthetic_grid_costs():
+    """Hourly tariff in the ``load_grid_costs`` format."""
+    return [
+        {
+            "hour": f"{h:02d}:00 - {(h + 1) % 24:02d}:00",
+            "purchase": purchase,
+            "sale": round(purchase / 2, 2),
+        }
+        for h, purchase in enumerate(_PURCHASE)
+    ]
+
+
+def write_profiles(store, directory):
+    """Write ``store`` as one ``load_profiles`` CSV per PPE."""
+    os.makedirs(directory, exist_ok=True)
+    labels = store.labels.tolist()
+    for i, name in enumerate(store.names):
+        rows = zip(labels, store.production[i].tolist(), store.consumption[i].tolist())
+        with open(os.path.join(directory, f"synthetic_profile_{name}.csv"), "w") as f:
+            f.write("hour,production,consumption\n")
+            f.writelines(f"{hour},{p},{c}\n" for hour, p, c in rows)
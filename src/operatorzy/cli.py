@@ -0,0 +1,46 @@
+import argparse
+import importlib
+import sys
+
+# Command -> (module with add_arguments/run, help); only the module of the
+# command being run is imported
+COMMANDS = {
+    "run": ("operatorzy.simulation.energy_community_simulation", "run one simulation"),
+    "sweep": ("operatorzy.simulation.sweep", "run a parameter sweep over a process pool"),
+    "live": ("operatorzy.simulation.live", "drive agents from streaming meter readings"),
+    "bureau": (
+        "operatorzy.simulation.bureau",
+        "run households and storages as message-passing agents",
+    ),
+    "bench": ("operatorzy.benchmarks.suite", "run the benchmark suite on synthetic data"),
+}
+
+
+def build_parser(command=None):
+    """Parser listing every command, with the arguments of ``command`` only."""
+    parser = argparse.ArgumentParser(
+        prog="operatorzy", description="Energy community simulation"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (module_name, help) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help, description=help)
+        if name == command:
+            module = importlib.import_module(module_name)
+            module.add_arguments(subparser)
+            subparser.set_defaults(func=module.run)
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # Bare positionals keep working as ``run``, like the old single command
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv = ["run", *argv]
+    command = argv[0] if argv and argv[0] in COMMANDS else None
+    args = build_parser(command).parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
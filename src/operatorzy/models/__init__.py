@@ -1,2 +1,24 @@
-# FILE: /fetchai-agent-simulation/fetchai-agent-simulation/operatorzy/models/__init__.py
-# This file is intentionally left blank.
+# Simulation models; the classes below are imported on first access.
+from operatorzy._lazy import lazy_exports
+
+_EXPORTS = {
+    "StreamingAggregates": ".aggregates",
+    "BatchCooperative": ".batch_cooperative",
+    "Cooperative": ".cooperative",
+    "SimulationHistory": ".history",
+    "LogSink": ".log_sink",
+    "DispatchPlan": ".optimal_dispatch",
+    "dispatch_upper_bound": ".optimal_dispatch",
+    "optimal_baseline": ".optimal_dispatch",
+    "solve_optimal_dispatch": ".optimal_dispatch",
+    "token_balance_bound": ".optimal_dispatch",
+    "P2PMarket": ".p2p_market",
+    "clear_market": ".p2p_market",
+    "PriceOracle": ".price_oracle",
+    "resolve_prices": ".price_oracle",
+    "Storage": ".storage",
+    "StorageBank": ".storage",
+    "TokenLedger": ".token_ledger",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
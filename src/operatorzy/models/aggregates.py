@@ -0,0 +1,216 @@
+import csv
+import itertools
+import os
+
+import numpy as np
+
+from .history import SimulationHistory
+
+# Calendar rollups: period name -> length of the date prefix naming a period
+# ("2023-06-01 02:00"[:10] is the day, [:7] the month)
+PERIODS = {"daily": 10, "monthly": 7}
+STATS = ("sum", "mean", "min", "max", "last")
+
+
+class RunningStats:
+    """Count, sum, min and max (with their dates) and last value per column.
+
+    Rows arrive in blocks. Each block is summed pairwise by NumPy and added to
+    the running sums with Neumaier compensation, so totals over millions of
+    steps are as accurate as summing the whole column at once.
+    """
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self._sum = np.zeros(n_columns)
+        self._compensation = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.min_date = [None] * n_columns
+        self.max_date = [None] * n_columns
+        self.last = np.full(n_columns, np.nan)
+
+    @property
+    def sum(self):
+        return self._sum + self._compensation
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else np.full(len(self._sum), np.nan)
+
+    def add(self, block, dates):
+        """Fold a ``(n_columns, steps)`` block whose steps are labelled ``dates``."""
+        if block.shape[1] == 0:
+            return
+        self.count += block.shape[1]
+        values = block.sum(axis=1)
+        total = self._sum + values
+        self._compensation += np.where(
+            np.abs(self._sum) >= np.abs(values),
+            (self._sum - total) + values,
+            (values - total) + self._sum,
+        )
+        self._sum = total
+        # Strict comparisons keep the first occurrence of a tie, like idxmin/idxmax
+        rows = np.arange(len(block))
+        low = block.argmin(axis=1)
+        for i in np.flatnonzero(block[rows, low] < self.min).tolist():
+            self.min[i] = block[i, low[i]]
+            self.min_date[i] = dates[low[i]]
+        high = block.argmax(axis=1)
+        for i in np.flatnonzero(block[rows, high] > self.max).tolist():
+            self.max[i] = block[i, high[i]]
+            self.max_date[i] = dates[high[i]]
+        self.last = block[:, -1].copy()
+
+    def values(self, stat):
+        return getattr(self, stat).tolist()
+
+
+class StreamingAggregates:
+    """Constant-memory stand-in for a ``SimulationHistory``.
+
+    Steps are buffered ``block_size`` at a time and folded into run totals
+    (``RunningStats``) and calendar rollups (``PERIODS``). A rollup row is
+    complete when its period ends; with a path for the period in
+    ``rollup_paths`` it is appended to that CSV file, otherwise it is kept in
+    ``rollups``. ``stats`` maps a column to the statistics its rollup rows
+    report (all of ``STATS`` by default). Call ``close`` at the end of a run
+    to finish the last periods.
+
+    Pickling keeps the buffered block (so a resumed run folds the same blocks)
+    and how much of each rollup file is written; the unpickled instance cuts
+    the files back to that point before appending.
+    """
+
+    def __init__(
+        self,
+        columns,
+        stats=None,
+        periods=tuple(PERIODS),
+        rollup_paths=None,
+        block_size=1024,
+    ):
+        self.columns = list(columns)
+        stats = stats or {}
+        self.stats = {column: tuple(stats.get(column, STATS)) for column in self.columns}
+        self.block_size = block_size
+        self.totals = RunningStats(len(self.columns))
+        self.periods = {name: PERIODS[name] for name in periods}
+        self.rollups = {name: [] for name in self.periods}
+        self.rollup_paths = {
+            name: os.fspath(path) for name, path in (rollup_paths or {}).items() if path
+        }
+        self._block = SimulationHistory(self.columns, capacity=block_size)
+        self._dates = []
+        self._open = dict.fromkeys(self.periods)  # period -> (key, RunningStats)
+        self._started = set()
+        self._resume_at = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, date, row, tail=None):
+        """Add one step, as ``SimulationHistory.append`` plus its ``date``."""
+        self._block.append(row, tail)
+        self._dates.append(date)
+        self.count += 1
+        if len(self._dates) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Fold the buffered steps into the totals and rollups."""
+        if not self._dates:
+            return
+        block = self._block.to_numpy()
+        dates = self._dates
+        self.totals.add(block, dates)
+        for name, width in self.periods.items():
+            finished = []
+            start = 0
+            for key, run in itertools.groupby(str(date)[:width] for date in dates):
+                stop = start + sum(1 for _ in run)
+                current = self._open[name]
+                if current is None or current[0] != key:
+                    if current is not None:
+                        finished.append(current)
+                    current = self._open[name] = (key, RunningStats(len(self.columns)))
+                current[1].add(block[:, start:stop], dates[start:stop])
+                start = stop
+            self._emit(name, finished)
+        self._block.clear()
+        self._dates = []
+
+    def close(self):
+        """Flush and finish the periods still open."""
+        self.flush()
+        for name, current in self._open.items():
+            self._emit(name, [] if current is None else [current])
+            self._open[name] = None
+
+    def header(self):
+        return ["period", "steps"] + [
+            f"{column}_{stat}" for column in self.columns for stat in self.stats[column]
+        ]
+
+    def _row(self, key, stats):
+        row = [key, stats.count]
+        values = {stat: stats.values(stat) for stat in STATS}
+        for i, column in enumerate(self.columns):
+            row.extend(values[stat][i] for stat in self.stats[column])
+        return row
+
+    def _emit(self, name, finished):
+        path = self.rollup_paths.get(name)
+        if path is None:
+            self.rollups[name].extend(self._row(key, stats) for key, stats in finished)
+            return
+        if not finished and name not in self._resume_at:
+            return
+        with open(path, "a" if name in self._started else "w", newline="") as f:
+            if name in self._resume_at:
+                f.truncate(self._resume_at.pop(name))
+            writer = csv.writer(f)
+            if name not in self._started:
+                writer.writerow(self.header())
+                self._started.add(name)
+            writer.writerows(self._row(key, stats) for key, stats in finished)
+
+    def rollup(self, name):
+        """Finished ``name`` rollup rows held in memory, as dicts."""
+        header = self.header()
+        return [dict(zip(header, row)) for row in self.rollups[name]]
+
+    def summary(self):
+        """Run totals per column: steps, sum, mean, min, max (with dates), last."""
+        totals = self.totals
+        values = {stat: totals.values(stat) for stat in STATS}
+        return [
+            {
+                "column": column,
+                "steps": totals.count,
+                "sum": values["sum"][i],
+                "mean": values["mean"][i],
+                "min": values["min"][i],
+                "min_at": totals.min_date[i],
+                "max": values["max"][i],
+                "max_at": totals.max_date[i],
+                "last": values["last"][i],
+            }
+            for i, column in enumerate(self.columns)
+        ]
+
+    def save_summary(self, path):
+        rows = self.summary()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["column"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_resume_at"] = dict(self._resume_at)
+        for name in self._started:
+            state["_resume_at"].setdefault(name, os.path.getsize(self.rollup_paths[name]))
+        return state
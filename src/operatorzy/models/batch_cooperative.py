@@ -0,0 +1,228 @@
+import copy
+
+import numpy as np
+
+from operatorzy.agents.context import DecisionContext
+
+from .price_oracle import resolve_prices
+from .storage import greedy_split
+
+
+class BatchCooperative:
+    """N independent ``Cooperative`` scenarios advanced in lock-step.
+
+    Every scenario shares the community profile and tariff but has its own
+    storage capacities, p2p price, mint/burn rates and initial token balance.
+    State lives in ``(n,)`` / ``(n, n_storages)`` arrays and each step repeats
+    the exact floating-point accounting of ``Cooperative.simulate_step`` for
+    storages without power limits or conversion losses.
+    """
+
+    TOTALS = (
+        "minted_tokens",
+        "burned_tokens",
+        "energy_added_to_storage",
+        "tokens_used_for_storage",
+        "energy_bought_from_storages",
+        "cost_from_storages",
+        "energy_bought_from_grid",
+        "cost_from_grid",
+        "energy_sold_to_grid",
+        "tokens_gained_from_grid",
+        "unmet_demand",
+    )
+
+    def __init__(
+        self,
+        capacities,
+        p2p_base_price,
+        token_mint_rate,
+        token_burn_rate,
+        initial_token_balance,
+    ):
+        capacities = np.atleast_1d(np.asarray(capacities, dtype=np.float64))
+        if capacities.ndim == 1:
+            capacities = capacities[None, :]
+        n = np.broadcast_shapes(
+            capacities.shape[:1],
+            np.shape(p2p_base_price),
+            np.shape(token_mint_rate),
+            np.shape(token_burn_rate),
+            np.shape(initial_token_balance),
+        )
+        self.n_scenarios = n[0] if n else 1
+        shape = (self.n_scenarios,)
+
+        self.capacity = np.ascontiguousarray(
+            np.broadcast_to(capacities, (self.n_scenarios, capacities.shape[1]))
+        )
+        self.level = np.zeros_like(self.capacity)
+        self.p2p_base_price = np.broadcast_to(
+            np.asarray(p2p_base_price, dtype=np.float64), shape
+        )
+        self.token_mint_rate = np.broadcast_to(
+            np.asarray(token_mint_rate, dtype=np.float64), shape
+        )
+        self.token_burn_rate = np.broadcast_to(
+            np.asarray(token_burn_rate, dtype=np.float64), shape
+        )
+        self.token_balance = np.array(
+            np.broadcast_to(np.asarray(initial_token_balance, dtype=np.float64), shape)
+        )
+        self.totals = {name: np.zeros(shape) for name in self.TOTALS}
+        self.history_token_balance = []
+        self.history_storage = []
+
+    @property
+    def storage_levels(self):
+        """Storage levels normalized to 0–1, shape ``(n, n_storages)``."""
+        return self.level / self.capacity
+
+    def step(
+        self,
+        consumption,
+        production,
+        grid_price,
+        sale_price,
+        store_energy,
+        discharge,
+        sell_energy,
+    ):
+        """Apply one hour to every scenario given per-scenario decision masks."""
+        totals = self.totals
+        balance = self.token_balance
+        net_energy = production - consumption
+
+        if net_energy > 0:
+            if consumption > 0:
+                minted = consumption * self.token_mint_rate
+                balance += minted
+                totals["minted_tokens"] += minted
+
+            remaining = np.full(self.n_scenarios, net_energy)
+            if np.any(store_energy):
+                # Storages fill in order, exactly like StorageBank.charge
+                charged = greedy_split(
+                    np.where(store_energy, remaining, 0.0),
+                    self.capacity - self.level,
+                )
+                self.level += charged
+                np.minimum(self.level, self.capacity, out=self.level)
+                charged = charged.sum(axis=1)
+                remaining -= charged
+                tokens = charged * self.p2p_base_price
+                balance += tokens
+                totals["tokens_used_for_storage"] += tokens
+                totals["energy_added_to_storage"] += charged
+
+            sold = np.where(sell_energy & (remaining > 0), remaining, 0.0)
+            gained = sold * sale_price
+            balance += gained
+            totals["energy_sold_to_grid"] += sold
+            totals["tokens_gained_from_grid"] += gained
+
+        elif net_energy < 0:
+            if consumption > 0:
+                minted = (consumption - production) * self.token_mint_rate
+                balance += minted
+                totals["minted_tokens"] += minted
+
+            remaining = np.full(self.n_scenarios, net_energy)
+            if np.any(discharge):
+                discharged = greedy_split(
+                    np.where(discharge, -remaining, 0.0), self.level
+                )
+                self.level -= discharged
+                np.maximum(self.level, 0.0, out=self.level)
+                discharged = discharged.sum(axis=1)
+                remaining += discharged
+                cost = discharged * self.p2p_base_price
+                balance -= cost
+                totals["energy_bought_from_storages"] += discharged
+                totals["cost_from_storages"] += cost
+
+            deficit = np.where(remaining < 0, -remaining, 0.0)
+            required = deficit * grid_price
+            affordable = balance >= required
+            # Too few tokens: buy what the balance covers and zero it out.
+            bought = np.where(affordable, deficit, balance / grid_price)
+            bought = np.where(deficit > 0, bought, 0.0)
+            burned = bought * self.token_burn_rate
+            balance[:] = np.where(
+                deficit > 0,
+                np.where(affordable, balance - required - burned, 0.0),
+                balance,
+            )
+            totals["burned_tokens"] += burned
+            totals["energy_bought_from_grid"] += bought
+            totals["cost_from_grid"] += bought * grid_price
+            totals["unmet_demand"] += deficit - bought
+
+    def simulate(self, steps, hourly_data, grid_costs, agent, record=False):
+        """Run ``steps`` hours, asking ``agent`` for a decision per scenario.
+
+        Agents exposing ``decide_batch`` are called once per step with the
+        ``(n, n_storages)`` storage levels; any other agent is copied once per
+        scenario, so its forecaster state stays per scenario, and each copy is
+        asked through its regular ``decide``.
+        """
+        lookahead = getattr(agent, "lookahead", 0)
+        prices = resolve_prices(grid_costs, hourly_data, lookahead=max(48, lookahead))
+        batched = hasattr(agent, "decide_batch")
+        if not batched:
+            agents = [copy.deepcopy(agent) for _ in range(self.n_scenarios)]
+        for step in range(steps):
+            hourly_data_step = hourly_data[step]
+            consumption = hourly_data_step["consumption"]
+            production = hourly_data_step["production"]
+            grid_price = float(prices.purchase[step])
+            sale_price = float(prices.sale[step])
+            net_energy = production - consumption
+
+            ctx = DecisionContext(
+                step=step,
+                net_energy=net_energy,
+                consumption=consumption,
+                production=production,
+                storage_levels=self.storage_levels,
+                storage_capacities=self.capacity,
+                hour=int(prices.hour_of_day[step]),
+                purchase_price=grid_price,
+                sale_price=sale_price,
+                prices=prices,
+                date=hourly_data_step.get("date"),
+            )
+            if lookahead:
+                # The same forecast window ``Cooperative.simulate_step`` gives
+                ctx.future_data = hourly_data[step + 1 : step + 1 + lookahead]
+            if batched:
+                decision = agent.decide_batch(ctx)
+            else:
+                decision = self._decide_each(agents, ctx)
+
+            self.step(
+                consumption,
+                production,
+                grid_price,
+                sale_price,
+                np.asarray(decision["store_energy"], dtype=bool),
+                np.asarray(decision["discharge"], dtype=bool),
+                np.asarray(decision.get("sell_energy", False), dtype=bool),
+            )
+            if record:
+                self.history_token_balance.append(self.token_balance.copy())
+                self.history_storage.append(self.level.copy())
+
+    def _decide_each(self, agents, ctx):
+        decision = {
+            key: np.zeros(self.n_scenarios, dtype=bool)
+            for key in ("store_energy", "discharge", "sell_energy")
+        }
+        capacities = ctx.storage_capacities.tolist()
+        for i, levels in enumerate(ctx.storage_levels.tolist()):
+            ctx.storage_levels = levels
+            ctx.storage_capacities = capacities[i]
+            single = agents[i].decide(ctx)
+            for key, value in single.items():
+                decision[key][i] = value
+        return decision
@@ -1,42 +1,127 @@
-from .storage import Storage
-from operatorzy.agents.smart_agent import SmartAgent
+from . import snapshot as snapshots
+from .aggregates import StreamingAggregates
+from .history import HistoryColumn, SimulationHistory
+from .log_sink import DEBUG, make_log_sink
+from .p2p_market import P2PMarket
+from .price_oracle import resolve_prices
+from .storage import StorageBank
+from .token_ledger import BURN, EARN, MINT, SPEND, TokenLedger
+from operatorzy.agents.context import DecisionContext
+from operatorzy.agents.registry import DEFAULT_AGENT, create_agent
+from operatorzy.utils.frontend_output import open_frontend_sink
+from operatorzy.utils.profiler import make_profiler
 
-# from operatorzy.agents.profit_maximizing_agent import ProfitMaximizingAgent
-# from operatorzy.agents.planner_agent import PlannerAgent
-# from operatorzy.agents.active_storage_agent import ActiveStorageAgent
-# from operatorzy.agents.forecasting_agent import ForecastingTraderAgent
-# from operatorzy.agents.ultimate_energy_agent import UltimateEnergyAgent
-from operatorzy.agents.ultimate_energy_agent_v2 import UltimateEnergyAgentV2
 
-# from operatorzy.agents.hybrid_energy_agent import HybridEnergyAgent
-import json
+# Per-step history columns, in recording order; storage levels follow them
+HISTORY_COLUMNS = (
+    "consumption",
+    "production",
+    "token_balance",
+    "p2p_price",
+    "grid_price",
+    "purchase_price",
+    "energy_deficit",
+    "energy_surplus",
+    "energy_sold_to_grid",
+    "tokens_gained_from_grid",
+    "minted_tokens",
+    "burned_tokens",
+    "energy_bought_from_grid",
+    "cost_from_grid",
+    "energy_added_to_storage",
+    "energy_bought_from_storages",
+    "cost_from_storages",
+)
+HISTORY_MODES = ("full", "stream", "off")
+# Rollup statistics of a streaming run: energy and token flows are summed
+# (their max is the peak, e.g. peak grid import), prices averaged; the
+# remaining columns are levels (token balance, storages)
+_FLOW_STATS = ("sum", "max")
+_PRICE_STATS = ("mean", "min", "max")
+_LEVEL_STATS = ("min", "max", "last")
+STREAM_STATS = {
+    column: _PRICE_STATS if column.endswith("_price") else _FLOW_STATS
+    for column in HISTORY_COLUMNS
+}
+STREAM_STATS["token_balance"] = _LEVEL_STATS
 
 
 class Cooperative:
-    def __init__(self, config, initial_token_balance):
-        self.agent = None
-        self.storages = [
-            Storage(**storage_config) for storage_config in config.get("storages", [])
+    history_consumption = HistoryColumn("consumption")
+    history_production = HistoryColumn("production")
+    history_token_balance = HistoryColumn("token_balance")
+    history_p2p_price = HistoryColumn("p2p_price")
+    history_grid_price = HistoryColumn("grid_price")
+    history_purchase_price = HistoryColumn("purchase_price")
+    history_energy_deficit = HistoryColumn("energy_deficit")
+    history_energy_surplus = HistoryColumn("energy_surplus")
+    history_energy_sold_to_grid = HistoryColumn("energy_sold_to_grid")
+    history_tokens_gained_from_grid = HistoryColumn("tokens_gained_from_grid")
+
+    def __init__(self, config, initial_token_balance, agent=None, storage_bank=None):
+        # Either a ready agent instance or the registry name/params from config;
+        # named agents are built once, on the first step of a run.
+        self.agent = agent
+        self.agent_name = config.get("agent", DEFAULT_AGENT)
+        self.agent_params = config.get("agent_params", {})
+        self._lookahead = getattr(agent, "lookahead", 0)
+        self.prices = None
+        # Likewise a ready bank (e.g. one mirroring remote storages) or config
+        if storage_bank is None:
+            storage_bank = StorageBank.from_configs(config.get("storages", []))
+        self.storage_bank = storage_bank
+        self.storages = self.storage_bank.units()
+        # "stream" folds every step into online aggregates instead of keeping
+        # the history, dashboard records, log and ledger events, so memory
+        # does not grow with the horizon; "off" keeps none of them (live runs)
+        mode = config.get("history", "full")
+        if mode not in HISTORY_MODES:
+            raise ValueError(f"Unknown history mode {mode!r}, expected one of {HISTORY_MODES}")
+        # Every token movement, per member; the community balance is also
+        # kept as a plain attribute for the step loop
+        self.ledger = TokenLedger(
+            {"community": initial_token_balance}, keep_events=mode == "full"
+        )
+        self._storage_ids = [
+            self.ledger.add_member(storage.name, initial_token_balance)
+            for storage in self.storages
         ]
-        self.token_balances = {"community": initial_token_balance}
-        for storage in self.storages:
-            self.token_balances[storage.name] = initial_token_balance
         self.community_token_balance = initial_token_balance
-        self.history_consumption = []
-        self.history_production = []
-        self.history_token_balance = []
-        self.history_p2p_price = []
-        self.history_grid_price = []
-        self.history_storage = {storage.name: [] for storage in self.storages}
-        self.history_energy_deficit = []
-        self.history_energy_surplus = []
-        self.history_energy_sold_to_grid = []
-        self.history_tokens_gained_from_grid = []
-        self.history_purchase_price = []
-        self.logs = []
-        self.frontend_data = []
-
-        self.net_energy_history = []
+        self.market = None
+        columns = HISTORY_COLUMNS + tuple(
+            f"storage_{storage.name}" for storage in self.storages
+        )
+        self.history = None
+        self.aggregates = None
+        if mode == "off":
+            self.log_sink = self.frontend_sink = None
+        elif mode == "stream":
+            self.aggregates = StreamingAggregates(
+                columns,
+                stats={column: STREAM_STATS.get(column, _LEVEL_STATS) for column in columns},
+                rollup_paths=config.get("rollup_paths"),
+            )
+            self.log_sink = self.frontend_sink = None
+        else:
+            self.history = SimulationHistory(columns)
+            # Per-step log fields, formatted only when written (None when OFF)
+            self.log_sink = make_log_sink(
+                [storage.name for storage in self.storages],
+                level=config.get("log_level", "INFO"),
+                path=config.get("log_path"),
+            )
+            # Dashboard records are streamed to disk as they are produced
+            self.frontend_sink = open_frontend_sink(
+                config.get("frontend_output", "frontend_output.json"),
+                format=config.get("frontend_format"),
+                compact=config.get("frontend_compact", False),
+            )
+        # Phase timings and event counts, only when asked for (None otherwise)
+        self.profile_trace = config.get("profile_trace")
+        self.profiler = make_profiler(config.get("profile", False), self.profile_trace)
+        # First step not simulated yet; a restored run continues from here
+        self.next_step = 0
+        self.residual = None
 
     def simulate_step(
         self,
@@ -48,74 +133,81 @@ class Cooperative:
         hourly_data,
         grid_costs,
     ):
-        # self.agent = SmartAgent(grid_costs)
-        # self.agent = ProfitMaximizingAgent(grid_costs)
-        # self.agent = PlannerAgent(grid_costs)
-        # self.agent = ActiveStorageAgent(grid_costs)
-        # self.agent = ForecastingTraderAgent(grid_costs)
-        # self.agent = UltimateEnergyAgent(grid_costs)
-        self.agent = UltimateEnergyAgentV2(grid_costs)
-        # self.agent = HybridEnergyAgent(grid_costs)
-
-        hourly_data_step = hourly_data[step]
-        consumption = hourly_data_step["consumption"]
-        production = hourly_data_step["production"]
-        date = hourly_data_step["date"]
-
-        grid_price = grid_costs[step % len(grid_costs)]["purchase"]
-        sale_price = grid_costs[step % len(grid_costs)]["sale"]
+        if self.agent is None:
+            self.create_agent(grid_costs)
+        if self.prices is None:
+            self.prices = resolve_prices(
+                grid_costs, hourly_data, lookahead=max(48, self._lookahead)
+            )
+        future_data = None
+        if self._lookahead:
+            future_data = hourly_data[step + 1 : step + 1 + self._lookahead]
+        return self.step_reading(
+            step,
+            hourly_data[step],
+            p2p_base_price,
+            min_price,
+            token_mint_rate,
+            token_burn_rate,
+            future_data,
+        )
+
+    def create_agent(self, grid_costs):
+        """Build the configured registry agent (done on the first step)."""
+        self.agent = create_agent(self.agent_name, grid_costs, **self.agent_params)
+        self._lookahead = getattr(self.agent, "lookahead", 0)
+        return self.agent
+
+    def step_reading(
+        self,
+        step,
+        reading,
+        p2p_base_price,
+        min_price,
+        token_mint_rate,
+        token_burn_rate,
+        future_data=None,
+    ):
+        """Simulate ``step`` from one ``hourly_data``-style ``reading``.
+
+        The agent and ``prices`` (covering ``step``) must already be set; live
+        runs call this directly as meter readings arrive. Returns the agent's
+        decision.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin()
+        consumption = reading["consumption"]
+        production = reading["production"]
+        date = reading["date"]
+
+        grid_price = float(self.prices.purchase[step])
+        sale_price = float(self.prices.sale[step])
 
         # Calculate net energy balance
         net_energy = production - consumption
 
-        # self.net_energy_history.append(net_energy)
-
-        # future_data = hourly_data[step + 1:step + 1 + self.agent.lookahead]
-
-        # decision = self.agent.decide(
-        #     step=step,
-        #     net_energy=net_energy,
-        #     consumption=consumption,
-        #     production=production,
-        #     storage_levels=[s.current_level / s.capacity for s in self.storages]  # normalize 0–1
-        # )
-
-        # decision = self.agent.decide(
-        #     step=step,
-        #     net_energy=net_energy,
-        #     consumption=consumption,
-        #     production=production,
-        #     storage_levels=[s.current_level / s.capacity for s in self.storages],
-        #     future_data=future_data
-        # )
-
-        # decision = self.agent.decide(
-        #     step=step,
-        #     net_energy=net_energy,
-        #     consumption=consumption,
-        #     production=production,
-        #     storage_levels=[s.current_level / s.capacity for s in self.storages]
-        # )
-
-        # decision = self.agent.decide(
-        #     step=step,
-        #     net_energy=net_energy,
-        #     consumption=consumption,
-        #     production=production,
-        #     storage_levels=[s.current_level / s.capacity for s in self.storages],
-        #     net_energy_history=self.net_energy_history
-        # )
-
-        self.net_energy_history.append(net_energy)
-
-        decision = self.agent.decide(
+        ctx = DecisionContext(
             step=step,
             net_energy=net_energy,
             consumption=consumption,
             production=production,
-            storage_levels=[s.current_level / s.capacity for s in self.storages],
-            net_energy_history=self.net_energy_history,
+            storage_levels=self.storage_bank.fill_ratio.tolist(),
+            storage_capacities=self.storage_bank.capacity.tolist(),
+            hour=int(self.prices.hour_of_day[step]),
+            purchase_price=grid_price,
+            sale_price=sale_price,
+            prices=self.prices,
+            date=date,
         )
+        if future_data is not None:
+            ctx.future_data = future_data
+        if profiler is not None:
+            profiler.mark("context")
+        decision = self.agent.decide(ctx)
+        if profiler is not None:
+            profiler.mark("decide")
+        ledger = self.ledger
 
         # Initialize variables
         energy_surplus = 0
@@ -190,40 +282,51 @@ class Cooperative:
             if consumption > 0:
                 minted_tokens = consumption * token_mint_rate
                 self.community_token_balance += minted_tokens
+                ledger.record(step, 0, MINT, minted_tokens)
+
+            if decision.get("store_energy"):
+                if profiler is not None:
+                    profiler.mark("tokens")
+                charged = self.storage_bank.charge(net_energy)
+                if profiler is not None:
+                    profiler.mark("storage")
+                    profiler.count("charge_events", bool(charged.any()))
+                charged_energy = float(charged.sum())
+                net_energy -= charged_energy
+                if charged_energy > 0:
+                    tokens_used_for_storage = charged_energy * p2p_base_price
+                    self.community_token_balance += tokens_used_for_storage
+                    energy_added_to_storage = charged_energy
+                    ledger.record(step, 0, EARN, tokens_used_for_storage)
+                    self._record_storages(step, SPEND, charged, p2p_base_price)
 
-            if decision["store_energy"]:
-                for storage in self.storages:
-                    charged_energy = storage.charge(net_energy)
-                    net_energy -= charged_energy
-                    if charged_energy > 0:
-                        tokens_used_for_storage += charged_energy * p2p_base_price
-                        self.community_token_balance += charged_energy * p2p_base_price
-                        energy_added_to_storage += charged_energy
-                    if net_energy <= 0:
-                        break
-
-            if decision["sell_energy"] and net_energy > 0:
+            if decision.get("sell_energy") and net_energy > 0:
                 energy_sold_to_grid = net_energy
                 tokens_gained_from_grid = energy_sold_to_grid * sale_price
                 self.community_token_balance += tokens_gained_from_grid
+                ledger.record(step, 0, EARN, tokens_gained_from_grid)
 
         elif net_energy < 0:
             if consumption > 0:
                 minted_tokens = (consumption - production) * token_mint_rate
                 self.community_token_balance += minted_tokens
+                ledger.record(step, 0, MINT, minted_tokens)
 
-            if decision["discharge"]:
-                for storage in self.storages:
-                    discharged_energy = storage.discharge(-net_energy)
-                    net_energy += discharged_energy
-                    if discharged_energy > 0:
-                        self.community_token_balance -= (
-                            discharged_energy * p2p_base_price
-                        )
-                        energy_bought_from_storages += discharged_energy
-                        cost_from_storages += discharged_energy * p2p_base_price
-                    if net_energy >= 0:
-                        break
+            if decision.get("discharge"):
+                if profiler is not None:
+                    profiler.mark("tokens")
+                discharged = self.storage_bank.discharge(-net_energy)
+                if profiler is not None:
+                    profiler.mark("storage")
+                    profiler.count("discharge_events", bool(discharged.any()))
+                discharged_energy = float(discharged.sum())
+                net_energy += discharged_energy
+                if discharged_energy > 0:
+                    cost_from_storages = discharged_energy * p2p_base_price
+                    self.community_token_balance -= cost_from_storages
+                    energy_bought_from_storages = discharged_energy
+                    ledger.record(step, 0, SPEND, cost_from_storages)
+                    self._record_storages(step, EARN, discharged, p2p_base_price)
 
             if net_energy < 0:
                 energy_deficit = -net_energy
@@ -232,100 +335,297 @@ class Cooperative:
                     self.community_token_balance -= required_tokens
                     burned_tokens = energy_deficit * token_burn_rate
                     self.community_token_balance -= burned_tokens
+                    ledger.record(step, 0, SPEND, required_tokens)
+                    ledger.record(step, 0, BURN, burned_tokens)
                     energy_bought_from_grid = energy_deficit
                     cost_from_grid = energy_deficit * grid_price
                 else:
                     affordable_energy = self.community_token_balance / grid_price
                     energy_deficit -= affordable_energy
+                    # The whole balance goes to the grid; the burn is not charged
+                    ledger.record(step, 0, SPEND, self.community_token_balance)
                     self.community_token_balance = 0
                     burned_tokens = affordable_energy * token_burn_rate
                     energy_bought_from_grid = affordable_energy
                     cost_from_grid = affordable_energy * grid_price
+                    if profiler is not None:
+                        profiler.count("grid_shortfalls")
+                if profiler is not None:
+                    profiler.count("grid_purchases")
+
+        if profiler is not None:
+            profiler.mark("tokens")
 
         # SAVE DATA IN JSON TO HAVE IT ON THE FRONTEND
-        self.frontend_data.append(
-            {
-                "step": hourly_data[step][
-                    "date"
-                ],  # assuming timestamp is a string like "2023-06-01 02:00"
-                "total_consumption": round(consumption, 2),
-                "total_production": round(production, 2),
-                "energy_bought_from_grid": round(energy_bought_from_grid, 2),
-                "cost_from_grid": round(cost_from_grid, 2),
-                "energy_sold_to_grid": round(energy_sold_to_grid, 2),
-                "tokens_gained_from_grid": round(tokens_gained_from_grid, 2),
-                "tokens_burned_due_to_grid": round(burned_tokens, 2),
-                "storage_S1_level": round(self.storages[0].current_level, 2),
-                "storage_S2_level": round(self.storages[1].current_level, 2)
-                if len(self.storages) > 1
-                else 0.0,
-                "token_balance": round(self.community_token_balance, 2),
-                "ai_decision": {
-                    "action": self._get_ai_action_label(decision, net_energy),
-                    "amount": round(abs(net_energy), 2),
-                },
-            }
-        )
+        if self.frontend_sink is not None:
+            self.frontend_sink.write(
+                {
+                    "step": date,  # assuming timestamp is a string like "2023-06-01 02:00"
+                    "total_consumption": round(consumption, 2),
+                    "total_production": round(production, 2),
+                    "energy_bought_from_grid": round(energy_bought_from_grid, 2),
+                    "cost_from_grid": round(cost_from_grid, 2),
+                    "energy_sold_to_grid": round(energy_sold_to_grid, 2),
+                    "tokens_gained_from_grid": round(tokens_gained_from_grid, 2),
+                    "tokens_burned_due_to_grid": round(burned_tokens, 2),
+                    "storage_S1_level": round(self.storages[0].current_level, 2),
+                    "storage_S2_level": round(self.storages[1].current_level, 2)
+                    if len(self.storages) > 1
+                    else 0.0,
+                    "token_balance": round(self.community_token_balance, 2),
+                    "ai_decision": {
+                        "action": self._get_ai_action_label(decision, net_energy),
+                        "amount": round(abs(net_energy), 2),
+                    },
+                }
+            )
+            if profiler is not None:
+                profiler.mark("frontend")
 
         # Log the negotiation details
-        log_entry = f"=== Current step: {date} ===\n"
-        log_entry += f"Total consumption: {consumption:.2f} kWh\n"
-        log_entry += f"Total production: {production:.2f} kWh\n"
-        log_entry += f"Energy surplus: {max(0, production - consumption):.2f} kWh\n"
-        log_entry += f"Tokens minted in this step: {minted_tokens:.2f}\n"
-        log_entry += f"Energy added to storage: {energy_added_to_storage:.2f} kWh, tokens used: {tokens_used_for_storage:.2f}\n"
-        log_entry += f"Energy got from storages: {energy_bought_from_storages:.2f} kWh, cost: {cost_from_storages:.2f} CT\n"
-        log_entry += f"Energy bought from grid: {energy_bought_from_grid:.2f} kWh, cost: {cost_from_grid:.2f} CT\n"
-        log_entry += f"Energy sold to grid: {energy_sold_to_grid:.2f} kWh, price: {sale_price:.2f} CT/kWh, tokens gained: {tokens_gained_from_grid:.2f}\n"
-        log_entry += f"Tokens burned due to grid: {burned_tokens:.2f}\n"
-        log_entry += f"Purchase grid price for this step: {grid_price:.2f} CT/kWh\n"
-        log_entry += f"Sale grid price for this step: {sale_price:.2f} CT/kWh\n"
-        for storage in self.storages:
-            log_entry += f"Storage {storage.name} level after intervention: {storage.current_level:.2f} kWh\n"
-        log_entry += f"Token balance: {self.community_token_balance:.2f} CT\n"
-        self.logs.append(log_entry)
+        log_sink = self.log_sink
+        if log_sink is not None:
+            log_sink.record(
+                date,
+                (
+                    consumption,
+                    production,
+                    max(0, production - consumption),
+                    minted_tokens,
+                    energy_added_to_storage,
+                    tokens_used_for_storage,
+                    energy_bought_from_storages,
+                    cost_from_storages,
+                    energy_bought_from_grid,
+                    cost_from_grid,
+                    energy_sold_to_grid,
+                    sale_price,
+                    tokens_gained_from_grid,
+                    burned_tokens,
+                    grid_price,
+                ),
+                self.storage_bank.level,
+                self.community_token_balance,
+                (
+                    bool(decision.get("store_energy")),
+                    bool(decision.get("discharge")),
+                    bool(decision.get("sell_energy")),
+                    p2p_base_price,
+                    net_energy,
+                )
+                if log_sink.level >= DEBUG
+                else (),
+            )
+            if profiler is not None:
+                profiler.mark("log")
 
         # Update history
-        self.history_consumption.append(consumption)
-        self.history_production.append(production)
-        self.history_token_balance.append(self.community_token_balance)
-        self.history_p2p_price.append(p2p_base_price)
-        self.history_grid_price.append(sale_price)
-        self.history_purchase_price.append(grid_price)
-        for storage in self.storages:
-            self.history_storage[storage.name].append(storage.current_level)
-        self.history_energy_deficit.append(energy_deficit)
-        self.history_energy_surplus.append(energy_surplus)
-        self.history_energy_sold_to_grid.append(energy_sold_to_grid)
-        self.history_tokens_gained_from_grid.append(tokens_gained_from_grid)
+        row = (
+            consumption,
+            production,
+            self.community_token_balance,
+            p2p_base_price,
+            sale_price,
+            grid_price,
+            energy_deficit,
+            energy_surplus,
+            energy_sold_to_grid,
+            tokens_gained_from_grid,
+            minted_tokens,
+            burned_tokens,
+            energy_bought_from_grid,
+            cost_from_grid,
+            energy_added_to_storage,
+            energy_bought_from_storages,
+            cost_from_storages,
+        )
+        if self.history is not None:
+            self.history.append(row, self.storage_bank.level)
+        elif self.aggregates is not None:
+            self.aggregates.append(date, row, self.storage_bank.level)
+        if profiler is not None:
+            profiler.mark("history")
+            profiler.count("surplus_steps" if production > consumption else "deficit_steps")
+            profiler.end()
+        self.next_step = step + 1
+        return decision
+
+    def _record_storages(self, step, kind, energy, p2p_base_price):
+        """Ledger entries of the storages that took part in a charge/discharge."""
+        for unit in energy.nonzero()[0].tolist():
+            self.ledger.record(
+                step, self._storage_ids[unit], kind, float(energy[unit]) * p2p_base_price
+            )
 
     def simulate(
         self,
         steps,
         p2p_base_price,
-        grid_price,
         min_price,
         token_mint_rate,
         token_burn_rate,
         hourly_data,
+        grid_costs,
+        checkpoint_every=None,
+        checkpoint_path=None,
     ):
-        for step in range(steps):
-            self.simulate_step(
-                step,
-                p2p_base_price,
-                grid_price,
-                min_price,
-                token_mint_rate,
-                token_burn_rate,
-                hourly_data,
+        """Run steps ``next_step`` up to ``steps``.
+
+        With ``checkpoint_every`` the full state is written to
+        ``checkpoint_path`` every that many steps (see ``checkpoint``); a run
+        restored from it continues where the checkpoint was taken. A streaming
+        run closes its aggregates once the last step is done. The dashboard
+        file is complete after every call; a later call continues it. A
+        profiled run prints its phase report (``PhaseProfiler.report``, totals
+        so far) when the call ends.
+        """
+        start = self.next_step
+        if self.history is not None:
+            self.history.reserve(len(self.history) + steps - start)
+        try:
+            for step in range(start, steps):
+                self.simulate_step(
+                    step,
+                    p2p_base_price,
+                    min_price,
+                    token_mint_rate,
+                    token_burn_rate,
+                    hourly_data,
+                    grid_costs,
+                )
+                done = step + 1
+                if checkpoint_every and done % checkpoint_every == 0 and done < steps:
+                    self.checkpoint(checkpoint_path)
+            if self.aggregates is not None:
+                self.aggregates.close()
+        finally:
+            if self.frontend_sink is not None:
+                self.frontend_sink.close()
+            if self.profiler is not None:
+                if self.profile_trace is not None:
+                    self.profiler.write_trace(self.profile_trace)
+                print(self.profiler.report())
+
+    def simulate_households(
+        self,
+        store,
+        p2p_base_price,
+        min_price,
+        token_mint_rate,
+        token_burn_rate,
+        grid_costs,
+        ask=None,
+        bid=None,
+        checkpoint_every=None,
+        checkpoint_path=None,
+    ):
+        """Run with every PPE of a ``ProfileStore`` kept separate.
+
+        Each hour first clears a P2P market between members (see
+        ``P2PMarket.run``) at ``p2p_base_price``, moved into the range between
+        the hour's marginal ask and bid when it lies outside; only the residual
+        surplus and deficit reach storage and the grid through the regular
+        step. Member trades go to the ledger and the market, with hourly prices
+        and volumes, to ``self.market``. A restored run reuses the market it
+        had already cleared.
+        """
+        totals = store.hourly_data()
+        if self.residual is None:
+            prices = resolve_prices(grid_costs, totals)
+            self.market = P2PMarket(store.names, ledger=self.ledger)
+            self.residual = self.market.run(
+                store,
+                prices.purchase,
+                prices.sale,
+                ask=ask,
+                bid=bid,
+                reference=p2p_base_price,
             )
-        with open("frontend_output.json", "w") as f:
-            json.dump({"data": self.frontend_data}, f, indent=2)
+        production = self.residual[0].tolist()
+        consumption = self.residual[1].tolist()
+        hourly_data = [
+            dict(entry, production=production[i], consumption=consumption[i])
+            for i, entry in enumerate(totals)
+        ]
+        self.simulate(
+            len(hourly_data),
+            p2p_base_price,
+            min_price,
+            token_mint_rate,
+            token_burn_rate,
+            hourly_data,
+            grid_costs,
+            checkpoint_every,
+            checkpoint_path,
+        )
+        return hourly_data
+
+    def snapshot(self, outputs=True):
+        """The full run state as compact bytes, for ``restore``.
+
+        Covers storages, tokens and ledger, history, the agent with its
+        forecaster and RNG state, prices and the market. With ``outputs`` the
+        dashboard and log sinks and the profiler are included too; the sinks
+        are flushed first and remember how much of their files is written.
+        """
+        state = self.__dict__
+        if not outputs:
+            state = dict(
+                state, frontend_sink=None, log_sink=None, profiler=None, profile_trace=None
+            )
+        return snapshots.dumps((type(self), state))
+
+    def checkpoint(self, path):
+        """Write ``snapshot()`` to ``path``, replacing it atomically."""
+        snapshots.write(path, self.snapshot())
+
+    @classmethod
+    def restore(cls, source):
+        """Cooperative from ``snapshot`` bytes or a ``checkpoint`` file.
+
+        ``simulate`` then continues from the step after the snapshot with the
+        same inputs, giving the same results as an uninterrupted run. Restored
+        sinks cut their files back to the snapshot before writing on.
+        """
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            source = snapshots.read(source)
+        kind, state = snapshots.loads(source)
+        if not issubclass(kind, cls):
+            raise TypeError(f"Snapshot holds a {kind.__name__}, not a {cls.__name__}")
+        cooperative = kind.__new__(kind)
+        cooperative.__dict__.update(state)
+        return cooperative
+
+    def fork(self):
+        """Independent copy of the run so far, without outputs.
+
+        Branches can change the agent, its parameters or the storages and be
+        simulated to the end without repeating the shared prefix. To fork in
+        other processes, send them ``snapshot(outputs=False)`` and ``restore``.
+        """
+        return self.restore(self.snapshot(outputs=False))
+
+    @property
+    def token_balances(self):
+        return self.ledger.balances()
+
+    @property
+    def history_storage(self):
+        return {
+            storage.name: self.history.column(f"storage_{storage.name}")
+            for storage in self.storages
+        }
+
+    @property
+    def logs(self):
+        """Formatted log entries still held in memory."""
+        return [] if self.log_sink is None else self.log_sink.entries()
 
     def save_logs(self, filename):
-        with open(filename, "w") as f:
-            for log in self.logs:
-                f.write(log + "\n")
+        if self.log_sink is None:
+            open(filename, "w").close()
+            return
+        self.log_sink.save(filename)
 
     @staticmethod
     def _get_ai_action_label(decision, net_energy):
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class SimulationHistory:
+    """Preallocated float64 columns holding one row per simulation step.
+
+    Columns are stored contiguously as a ``(n_columns, capacity)`` array that
+    is sized up front when the step count is known (``reserve``) and doubles
+    when it runs out. Column accessors and exports are read-only views.
+    """
+
+    def __init__(self, columns, capacity=256):
+        self.columns = list(columns)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._data = np.empty((len(self.columns), max(capacity, 1)))
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._data.shape[1]
+
+    def reserve(self, capacity):
+        """Make room for at least ``capacity`` rows in total."""
+        if capacity > self.capacity:
+            data = np.empty((len(self.columns), capacity))
+            data[:, : self._size] = self._data[:, : self._size]
+            self._data = data
+
+    def append(self, row, tail=None):
+        """Add one step: ``row`` fills the leading columns, ``tail`` the rest."""
+        if self._size == self.capacity:
+            self.reserve(2 * self.capacity)
+        i = self._size
+        self._data[: len(row), i] = row
+        if tail is not None:
+            self._data[len(row) :, i] = tail
+        self._size = i + 1
+
+    def load(self, data):
+        """Replace the recorded rows with a ``(n_columns, steps)`` array."""
+        data = np.asarray(data, dtype=np.float64)
+        if data.shape[0] != len(self.columns):
+            raise ValueError(
+                f"Expected {len(self.columns)} columns, got {data.shape[0]}"
+            )
+        self.reserve(data.shape[1])
+        self._data[:, : data.shape[1]] = data
+        self._size = data.shape[1]
+
+    def __getstate__(self):
+        # Only the recorded rows, not the unused part of the buffer
+        state = self.__dict__.copy()
+        state["_data"] = self._data[:, : max(self._size, 1)].copy()
+        return state
+
+    def clear(self):
+        """Drop the recorded rows, keeping the allocated buffer."""
+        self._size = 0
+
+    def column(self, name):
+        return self._view(self._data[self._index[name], : self._size])
+
+    def to_numpy(self):
+        """``(n_columns, steps)`` view of the recorded data."""
+        return self._view(self._data[:, : self._size])
+
+    def to_dataframe(self):
+        """DataFrame over the recorded data without copying it."""
+        import pandas as pd
+
+        return pd.DataFrame(self.to_numpy().T, columns=self.columns, copy=False)
+
+    @staticmethod
+    def _view(array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+
+class HistoryColumn:
+    """Read-only attribute exposing one column of the owner's ``history``."""
+
+    def __init__(self, column):
+        self.column = column
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.history.column(self.column)
@@ -0,0 +1,157 @@
+import os
+import shutil
+
+from .history import SimulationHistory
+
+OFF, INFO, DEBUG = 0, 1, 2
+LEVELS = {"OFF": OFF, "INFO": INFO, "DEBUG": DEBUG}
+
+# Numeric fields of one step, in the order ``record`` receives them
+STEP_FIELDS = (
+    "consumption",
+    "production",
+    "surplus",
+    "minted_tokens",
+    "energy_added_to_storage",
+    "tokens_used_for_storage",
+    "energy_bought_from_storages",
+    "cost_from_storages",
+    "energy_bought_from_grid",
+    "cost_from_grid",
+    "energy_sold_to_grid",
+    "sale_price",
+    "tokens_gained_from_grid",
+    "burned_tokens",
+    "purchase_price",
+)
+DEBUG_FIELDS = ("store_energy", "discharge", "sell_energy", "p2p_price", "net_energy")
+
+# Placeholder 0 is the date, 1.. the buffered columns (see ``LogSink``)
+_STEP_TEMPLATE = (
+    "=== Current step: {0} ===\n"
+    "Total consumption: {1:.2f} kWh\n"
+    "Total production: {2:.2f} kWh\n"
+    "Energy surplus: {3:.2f} kWh\n"
+    "Tokens minted in this step: {4:.2f}\n"
+    "Energy added to storage: {5:.2f} kWh, tokens used: {6:.2f}\n"
+    "Energy got from storages: {7:.2f} kWh, cost: {8:.2f} CT\n"
+    "Energy bought from grid: {9:.2f} kWh, cost: {10:.2f} CT\n"
+    "Energy sold to grid: {11:.2f} kWh, price: {12:.2f} CT/kWh, tokens gained: {13:.2f}\n"
+    "Tokens burned due to grid: {14:.2f}\n"
+    "Purchase grid price for this step: {15:.2f} CT/kWh\n"
+    "Sale grid price for this step: {12:.2f} CT/kWh\n"
+)
+_BALANCE_TEMPLATE = "Token balance: {16:.2f} CT\n"
+_DEBUG_TEMPLATE = (
+    "Agent decision: store {17:.0f}, discharge {18:.0f}, sell {19:.0f}; "
+    "p2p price {20:.2f} CT/kWh, net energy after storage {21:.2f} kWh\n"
+)
+
+
+def parse_level(level):
+    if isinstance(level, str):
+        try:
+            return LEVELS[level.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown log level {level!r}") from None
+    return int(level)
+
+
+class LogSink:
+    """Per-step simulation log kept as numbers and rendered to text on demand.
+
+    Each step is one float64 row: ``STEP_FIELDS``, the token balance,
+    ``DEBUG_FIELDS`` at DEBUG, then the storage levels. With a ``path`` full
+    batches of ``batch_size`` steps are formatted and appended to the file, so
+    memory stays bounded; without one all rows are kept until ``save``.
+    Pickling flushes the buffered steps first and the unpickled sink cuts the
+    file back to that point before writing more (see ``JsonArraySink``).
+    """
+
+    def __init__(self, storage_names, level=INFO, path=None, batch_size=1024):
+        self.level = parse_level(level)
+        self.storage_names = list(storage_names)
+        self.path = os.fspath(path) if path else None
+        self.batch_size = batch_size
+        columns = STEP_FIELDS + ("token_balance",)
+        if self.level >= DEBUG:
+            columns += DEBUG_FIELDS
+        columns += tuple(f"storage_{name}" for name in self.storage_names)
+        self._rows = SimulationHistory(columns, capacity=batch_size)
+        self._dates = []
+        self._template = self._build_template()
+        self._started = False
+        self._resume_at = None
+        self.count = 0
+
+    def _build_template(self):
+        first = len(STEP_FIELDS) + 2
+        if self.level >= DEBUG:
+            first += len(DEBUG_FIELDS)
+        template = _STEP_TEMPLATE
+        for i, name in enumerate(self.storage_names, first):
+            template += f"Storage {name} level after intervention: {{{i}:.2f}} kWh\n"
+        template += _BALANCE_TEMPLATE
+        if self.level >= DEBUG:
+            template += _DEBUG_TEMPLATE
+        return template
+
+    def record(self, date, fields, storage_levels, token_balance, debug=()):
+        """Buffer one step; ``debug`` holds ``DEBUG_FIELDS`` and is used at DEBUG."""
+        row = fields + (token_balance,)
+        if self.level >= DEBUG:
+            row += tuple(debug)
+        self._rows.append(row, storage_levels)
+        self._dates.append(date)
+        self.count += 1
+        if self.path is not None and len(self._dates) >= self.batch_size:
+            self.flush()
+
+    def entries(self):
+        """Buffered steps as formatted text entries."""
+        template = self._template.format
+        return [
+            template(date, *row)
+            for date, row in zip(self._dates, self._rows.to_numpy().T.tolist())
+        ]
+
+    def flush(self):
+        """Append the buffered steps to ``path`` and drop them from memory."""
+        if self.path is None or not (self._dates or self._resume_at is not None):
+            return
+        with open(self.path, "a" if self._started else "w") as f:
+            if self._resume_at is not None:
+                f.truncate(self._resume_at)
+                self._resume_at = None
+            for entry in self.entries():
+                f.write(entry + "\n")
+        self._started = True
+        self._rows.clear()
+        self._dates = []
+
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        if self._started:
+            state["_resume_at"] = os.path.getsize(self.path)
+        return state
+
+    def save(self, filename):
+        """Write the whole log to ``filename``."""
+        if self.path is not None:
+            self.flush()
+            if not self._started:
+                open(self.path, "w").close()
+            if os.path.abspath(filename) != os.path.abspath(self.path):
+                shutil.copyfile(self.path, filename)
+            return
+        with open(filename, "w") as f:
+            for entry in self.entries():
+                f.write(entry + "\n")
+
+
+def make_log_sink(storage_names, level=INFO, path=None, batch_size=1024):
+    """``LogSink`` for the given level, or None when logging is OFF."""
+    if parse_level(level) <= OFF:
+        return None
+    return LogSink(storage_names, level=level, path=path, batch_size=batch_size)
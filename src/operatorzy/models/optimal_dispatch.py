@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from operatorzy.agents.schedule_agent import ScheduleAgent
+
+from .cooperative import Cooperative
+from .price_oracle import resolve_prices
+from .storage import StorageBank
+
+
+@dataclass
+class DispatchPlan:
+    """Per-step decisions of the optimal schedule and the storage level path."""
+
+    store_energy: np.ndarray
+    discharge: np.ndarray
+    sell_energy: np.ndarray
+    levels: np.ndarray  # aggregate kWh after each step
+    value: float  # token gain from storage/grid trades, excluding minting
+
+
+def solve_optimal_dispatch(
+    consumption,
+    production,
+    purchase,
+    sale,
+    capacity,
+    p2p_base_price,
+    token_burn_rate,
+    max_charge=np.inf,
+    max_discharge=np.inf,
+    efficiency=1.0,
+    initial_level=0.0,
+    resolution=401,
+):
+    """Store/discharge/sell schedule maximizing the final token balance.
+
+    Backward dynamic programming over the aggregate storage level, discretized
+    into ``resolution`` states, with the same per-step token rules as
+    ``Cooperative.simulate_step``: storing earns ``p2p_base_price`` per kWh,
+    discharging costs it, surplus sells at ``sale`` and any deficit left is
+    bought at ``purchase`` plus the burn rate. Each step evaluates both
+    choices for every state at once; values between states are interpolated.
+    Minted tokens do not depend on the decisions and are left out of
+    ``value``. The decisions are then rolled forward on the exact,
+    continuous level, so replaying them reproduces ``levels``.
+
+    The storage is one aggregate unit. That is exact for lossless banks
+    without power limits, which fill and drain in any order to the same
+    total. Deficits are assumed to be paid in full, so runs whose balance
+    would hit zero are not modelled. For banks with per-unit limits or losses
+    the schedule is only a good one, not the best; ``token_balance_bound``
+    gives a bound no run can beat.
+    """
+    consumption = np.asarray(consumption, dtype=np.float64)
+    production = np.asarray(production, dtype=np.float64)
+    net = production - consumption
+    steps = len(net)
+    unit_cost = np.asarray(purchase, dtype=np.float64)[:steps] + token_burn_rate
+    sell_price = np.maximum(np.asarray(sale, dtype=np.float64)[:steps], 0.0)
+    eta = np.sqrt(efficiency)
+    grid = np.linspace(0.0, capacity, resolution if capacity > 0 else 1)
+
+    values = np.empty((steps + 1, len(grid)))
+    values[steps] = 0.0  # energy left in storage earns nothing
+    # Room and energy available from each state, independent of the step
+    room = np.minimum((capacity - grid) / eta, max_charge)
+    available = np.minimum(grid * eta, max_discharge)
+    for t in range(steps - 1, -1, -1):
+        after = values[t + 1]
+        n = net[t]
+        if n > 0:
+            charged = np.minimum(n, room)
+            store = (
+                p2p_base_price * charged
+                + sell_price[t] * (n - charged)
+                + np.interp(np.minimum(grid + charged * eta, capacity), grid, after)
+            )
+            np.maximum(store, sell_price[t] * n + after, out=values[t])
+        elif n < 0:
+            discharged = np.minimum(-n, available)
+            discharge = (
+                unit_cost[t] * (n + discharged)
+                - p2p_base_price * discharged
+                + np.interp(np.maximum(grid - discharged / eta, 0.0), grid, after)
+            )
+            np.maximum(discharge, unit_cost[t] * n + after, out=values[t])
+        else:
+            values[t] = after
+
+    store_energy = np.zeros(steps, dtype=bool)
+    discharge_energy = np.zeros(steps, dtype=bool)
+    levels = np.empty(steps)
+    level = float(initial_level)
+    value = 0.0
+    room_max, available_max = float(max_charge), float(max_discharge)
+    for t in range(steps):
+        after = values[t + 1]
+        n = net[t]
+        if n > 0:
+            charged = min(n, (capacity - level) / eta, room_max)
+            stored_level = min(level + charged * eta, capacity)
+            gain = p2p_base_price * charged + sell_price[t] * (n - charged)
+            if charged > 0 and gain + np.interp(stored_level, grid, after) > (
+                sell_price[t] * n + np.interp(level, grid, after)
+            ):
+                store_energy[t] = True
+                level = stored_level
+                value += gain
+            else:
+                value += sell_price[t] * n
+        elif n < 0:
+            discharged = min(-n, level * eta, available_max)
+            drained_level = max(level - discharged / eta, 0.0)
+            gain = unit_cost[t] * (n + discharged) - p2p_base_price * discharged
+            if discharged > 0 and gain + np.interp(drained_level, grid, after) > (
+                unit_cost[t] * n + np.interp(level, grid, after)
+            ):
+                discharge_energy[t] = True
+                level = drained_level
+                value += gain
+            else:
+                value += unit_cost[t] * n
+        levels[t] = level
+
+    return DispatchPlan(
+        store_energy=store_energy,
+        discharge=discharge_energy,
+        sell_energy=(net > 0) & (np.asarray(sale)[:steps] >= 0),
+        levels=levels,
+        value=value,
+    )
+
+
+def optimal_baseline(
+    config,
+    hourly_data,
+    grid_costs,
+    p2p_base_price,
+    min_price,
+    token_mint_rate,
+    token_burn_rate,
+    initial_token_balance=100,
+    resolution=401,
+):
+    """Solve the aggregate-unit schedule and replay it through ``Cooperative``.
+
+    Returns ``(plan, cooperative)``; the replayed cooperative holds the exact
+    outcome of the schedule under the simulation's own accounting. It is the
+    best schedule for lossless banks without power limits and an achievable
+    reference otherwise; see ``token_balance_bound`` for an upper bound.
+    """
+    bank = StorageBank.from_configs(config.get("storages", []))
+    capacity = float(bank.capacity.sum())
+    prices = resolve_prices(grid_costs, hourly_data)
+    plan = solve_optimal_dispatch(
+        [entry["consumption"] for entry in hourly_data],
+        [entry["production"] for entry in hourly_data],
+        prices.purchase,
+        prices.sale,
+        capacity,
+        p2p_base_price,
+        token_burn_rate,
+        max_charge=bank.max_charge.sum(),
+        max_discharge=bank.max_discharge.sum(),
+        # capacity-weighted round-trip efficiency of the bank
+        efficiency=float((bank.efficiency * bank.capacity).sum() / capacity)
+        if capacity
+        else 1.0,
+        resolution=resolution,
+    )
+    replay = {
+        "storages": config.get("storages", []),
+        "frontend_output": None,
+        "log_level": "OFF",
+    }
+    cooperative = Cooperative(
+        replay, initial_token_balance, agent=ScheduleAgent(prices, plan)
+    )
+    cooperative.simulate(
+        len(hourly_data),
+        p2p_base_price,
+        min_price,
+        token_mint_rate,
+        token_burn_rate,
+        hourly_data,
+        prices,
+    )
+    return plan, cooperative
+
+
+def dispatch_upper_bound(
+    consumption,
+    production,
+    purchase,
+    sale,
+    bank,
+    p2p_base_price,
+    token_mint_rate,
+    token_burn_rate,
+    initial_token_balance,
+    resolution=401,
+):
+    """Final token balance no run over these profiles and storages can exceed.
+
+    The bound comes from backward dynamic programming over the total stored
+    energy, split into ``resolution`` level bins. A storing step takes as much
+    surplus as the units have room for; from the total level alone that
+    amount is only known to lie between the room with every unit at the best
+    efficiency and the smallest power limit, and the room with every unit at
+    the worst efficiency and the summed limits. The bound lets the agent pick
+    any amount in between and any bin the new level can reach with the
+    units' efficiencies; discharging is bounded the same way. Every real run
+    is one of these choices with the same tokens. Minting does not depend on
+    the decisions and is added in.
+
+    A deficit the balance cannot pay empties it instead. After the last such
+    step, a run earns at most the relaxed value from a full bank, plus what is
+    minted after it. The bound is the largest of these cases.
+    """
+    consumption = np.asarray(consumption, dtype=np.float64)
+    production = np.asarray(production, dtype=np.float64)
+    net = production - consumption
+    steps = len(net)
+    unit_cost = np.asarray(purchase, dtype=np.float64)[:steps] + token_burn_rate
+    sell_price = np.maximum(np.asarray(sale, dtype=np.float64)[:steps], 0.0)
+    minted = np.where(
+        (consumption > 0) & (net != 0),
+        np.where(net > 0, consumption, -net) * token_mint_rate,
+        0.0,
+    )
+    minted_after = np.zeros(steps + 1)  # minted in steps t.. onwards
+    minted_after[:steps] = np.cumsum(minted[::-1])[::-1]
+
+    capacity = float(bank.capacity.sum()) if len(bank) else 0.0
+    max_charge = float(bank.max_charge.sum())
+    max_discharge = float(bank.max_discharge.sum())
+    min_unit_charge = float(bank.max_charge.min()) if len(bank) else 0.0
+    min_unit_discharge = float(bank.max_discharge.min()) if len(bank) else 0.0
+    eta_high = float(bank.charge_efficiency.max()) if len(bank) else 1.0
+    eta_low = float(bank.charge_efficiency.min()) if len(bank) else 1.0
+    states = resolution if capacity > 0 else 1
+    grid = np.linspace(0.0, capacity, states)
+    spacing = capacity / (states - 1) if states > 1 else np.inf
+    index = np.arange(states)
+
+    lower = np.concatenate(([0.0], grid[:-1]))  # levels in (lower, grid] share a bin
+    value = np.zeros(states)  # best gain from each level bin after the last step
+    best_after_shortfall = -np.inf
+    for t in range(steps - 1, -1, -1):
+        n = net[t]
+        if n > 0 and capacity > 0:
+            # Storing takes min(n, sum of unit rooms); bounds on it per bin
+            most = np.minimum(min(n, max_charge), (capacity - lower) / eta_low)
+            least = np.minimum(min(n, min_unit_charge), (capacity - grid) / eta_high)
+            width = min(int(np.ceil(most[0] * eta_high / spacing)) + 1, states - 1)
+            offsets = np.arange(1, width + 1)
+            # Charges whose new level may fall `offsets` bins higher
+            low = np.maximum((offsets - 1) * spacing / eta_high, least[:, None])
+            high = np.where(
+                index[:, None] + offsets >= states - 1,
+                most[:, None],
+                np.minimum((offsets + 1) * spacing / eta_low, most[:, None]),
+            )
+            extra = p2p_base_price - sell_price[t]
+            target = np.minimum(index[:, None] + offsets, states - 1)
+            candidates = np.where(
+                low <= high,
+                extra * (high if extra >= 0 else low) + value[target],
+                -np.inf,
+            )
+            result = sell_price[t] * n + np.maximum(value, candidates.max(axis=1))
+        elif n > 0:
+            result = sell_price[t] * n + value
+        elif n < 0:
+            # The balance may run dry here; from then on it starts at zero
+            best_after_shortfall = max(
+                best_after_shortfall, minted_after[t + 1] + value.max()
+            )
+            extra = unit_cost[t] - p2p_base_price
+            result = unit_cost[t] * n + value
+            if capacity > 0:
+                # Discharging covers min(-n, sum of unit availabilities)
+                most = np.minimum(min(-n, max_discharge), grid * eta_high)
+                least = np.minimum(min(-n, min_unit_discharge), lower * eta_low)
+                width = min(int(np.ceil(most[-1] / eta_low / spacing)) + 1, states - 1)
+                offsets = np.arange(width + 1)
+                # Discharges whose new level may fall `offsets` bins lower
+                low = np.maximum((offsets - 1) * spacing * eta_low, least[:, None])
+                high = np.minimum((offsets + 1) * spacing * eta_high, most[:, None])
+                target = index[:, None] - offsets
+                candidates = np.where(
+                    (target >= 0) & (low <= high),
+                    extra * (high if extra >= 0 else low)
+                    + value[np.maximum(target, 0)],
+                    -np.inf,
+                )
+                result = np.maximum(result, unit_cost[t] * n + candidates.max(axis=1))
+        else:
+            result = value
+        value = result
+
+    return max(
+        initial_token_balance + minted_after[0] + value[0], best_after_shortfall
+    )
+
+
+def token_balance_bound(
+    config,
+    hourly_data,
+    grid_costs,
+    p2p_base_price,
+    min_price,
+    token_mint_rate,
+    token_burn_rate,
+    initial_token_balance=100,
+    resolution=401,
+):
+    """``dispatch_upper_bound`` for a run with ``optimal_baseline``'s arguments."""
+    prices = resolve_prices(grid_costs, hourly_data)
+    return dispatch_upper_bound(
+        [entry["consumption"] for entry in hourly_data],
+        [entry["production"] for entry in hourly_data],
+        prices.purchase,
+        prices.sale,
+        StorageBank.from_configs(config.get("storages", [])),
+        p2p_base_price,
+        token_mint_rate,
+        token_burn_rate,
+        initial_token_balance,
+        resolution=resolution,
+    )
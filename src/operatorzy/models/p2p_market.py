@@ -0,0 +1,236 @@
+import numpy as np
+
+from .token_ledger import EARN, SPEND
+
+# Elements per (hours, members) block cleared at once
+CHUNK_ELEMENTS = 1 << 21
+
+
+def clear_market(supply, demand, ask, bid, reference=None):
+    """Uniform-price double auction for every row (hour) of ``(hours, n)`` arrays.
+
+    ``supply``/``demand`` are each member's surplus and deficit in kWh.
+    ``ask``/``bid`` are their limit prices: a scalar or ``(hours,)`` array (one
+    price per hour for everyone), or 2-D and broadcastable to ``(hours, n)``.
+
+    The volume is the largest quantity both curves support. The price is the
+    midpoint of the marginal ask and bid or, given a ``reference`` price
+    (scalar or per hour), that price clipped to the range between them, so
+    no trade is worse for either side than its quote. Members priced strictly
+    inside the market trade everything. The marginal price tier is filled pro
+    rata.
+    Returns ``(sold, bought, price, volume)``, with ``price`` NaN for hours
+    without trade.
+    """
+    supply = np.asarray(supply, dtype=np.float64)
+    demand = np.asarray(demand, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    bid = np.asarray(bid, dtype=np.float64)
+    if ask.ndim <= 1 and bid.ndim <= 1:
+        return _clear_uniform(supply, demand, ask, bid, reference)
+
+    hours, n = supply.shape
+    ask = np.broadcast_to(ask if ask.ndim == 2 else ask.reshape(-1, 1), (hours, n))
+    bid = np.broadcast_to(bid if bid.ndim == 2 else bid.reshape(-1, 1), (hours, n))
+    rows = np.arange(hours)[:, None]
+
+    # Supply curve: cumulative surplus by ascending ask
+    order = np.argsort(ask, axis=1, kind="stable")
+    ask_sorted = ask[rows, order]
+    cum_supply = np.cumsum(supply[rows, order], axis=1)
+
+    # Demand still willing to pay each ask: one searchsorted over all rows,
+    # made row-local by offsetting every row past the previous one's prices
+    order = np.argsort(bid, axis=1, kind="stable")
+    bid_sorted = bid[rows, order]
+    cum_demand = np.zeros((hours, n + 1))
+    np.cumsum(demand[rows, order], axis=1, out=cum_demand[:, 1:])
+    low = min(ask.min(), bid.min())
+    span = max(ask.max(), bid.max()) - low + 1.0
+    offset = rows * span - low
+    position = np.searchsorted(
+        (bid_sorted + offset).ravel(), (ask_sorted + offset).ravel(), side="left"
+    ).reshape(hours, n) - rows * n
+    willing = cum_demand[:, -1:] - cum_demand[rows, position]
+    volume = np.minimum(cum_supply, willing).max(axis=1)
+
+    # Marginal ask and bid: the orders that complete the volume (the sums
+    # are taken in different orders, hence the rounding allowance)
+    reached = (volume - 1e-9 * np.maximum(volume, 1.0))[:, None]
+    marginal_ask = ask_sorted[rows[:, 0], np.argmax(cum_supply >= reached, axis=1)]
+    cum_demand_desc = np.cumsum(demand[rows, order[:, ::-1]], axis=1)
+    marginal_bid = bid_sorted[:, ::-1][
+        rows[:, 0], np.argmax(cum_demand_desc >= reached, axis=1)
+    ]
+
+    sold = _fill(supply, ask < marginal_ask[:, None], ask == marginal_ask[:, None], volume)
+    bought = _fill(demand, bid > marginal_bid[:, None], bid == marginal_bid[:, None], volume)
+    price = np.where(
+        volume > 0, _clearing_price(marginal_ask, marginal_bid, reference), np.nan
+    )
+    return sold, bought, price, volume
+
+
+def _clearing_price(ask, bid, reference):
+    if reference is None:
+        return (ask + bid) / 2
+    return np.minimum(np.maximum(reference, ask), bid)
+
+
+def _fill(amount, inside, marginal, volume):
+    """Full fills inside the market, the marginal tier pro rata up to ``volume``."""
+    full = np.where(inside, amount, 0.0)
+    tier = np.where(marginal, amount, 0.0)
+    tier_total = tier.sum(axis=1)
+    share = np.divide(
+        volume - full.sum(axis=1),
+        tier_total,
+        out=np.zeros_like(volume),
+        where=tier_total > 0,
+    )
+    return full + tier * np.clip(share, 0.0, 1.0)[:, None]
+
+
+def _clear_uniform(supply, demand, ask, bid, reference=None):
+    """``clear_market`` when everyone quotes the same ask and bid each hour."""
+    total_supply = supply.sum(axis=1)
+    total_demand = demand.sum(axis=1)
+    volume = np.where(ask <= bid, np.minimum(total_supply, total_demand), 0.0)
+    sold = supply * _ratio(volume, total_supply)[:, None]
+    bought = demand * _ratio(volume, total_demand)[:, None]
+    price = np.where(volume > 0, _clearing_price(ask, bid, reference), np.nan)
+    return sold, bought, price, volume
+
+
+def _ratio(part, total):
+    return np.divide(part, total, out=np.zeros_like(part), where=total > 0)
+
+
+class P2PMarket:
+    """Hourly P2P clearing between the members of a community.
+
+    Members with surplus sell to members with deficit before anything reaches
+    storage or the grid. Token balances and traded energy are kept per member.
+    With a ``TokenLedger``, members join it (or reuse an entry of the same
+    name) and every nonzero trade is recorded there, one event per member and
+    hour.
+    """
+
+    def __init__(self, names, initial_balance=0.0, ledger=None):
+        self.names = list(names)
+        n = len(self.names)
+        self.ledger = ledger
+        if ledger is not None:
+            self._ledger_ids = np.array(
+                [
+                    ledger.member_id(name)
+                    if name in ledger
+                    else ledger.add_member(name, float(initial_balance))
+                    for name in self.names
+                ],
+                dtype=np.int32,
+            )
+        self.balances = np.full(n, float(initial_balance))
+        self.energy_sold = np.zeros(n)
+        self.energy_bought = np.zeros(n)
+        self.price = np.empty(0)
+        self.volume = np.empty(0)
+
+    def clear(self, production, consumption, ask, bid, step=0, reference=None):
+        """Clear ``(hours, n)`` profiles; returns the residual community totals.
+
+        The residual production is the surplus left unsold and the residual
+        consumption is the deficit left unmet, one value per hour. ``step`` is
+        the index of the first hour, for the ledger.
+        """
+        net = production - consumption
+        supply = np.maximum(net, 0.0)
+        demand = np.maximum(-net, 0.0)
+        sold, bought, price, volume = self.settle(
+            supply, demand, ask, bid, step, reference
+        )
+        return (
+            supply.sum(axis=1) - sold.sum(axis=1),
+            demand.sum(axis=1) - bought.sum(axis=1),
+            price,
+            volume,
+        )
+
+    def settle(self, supply, demand, ask, bid, step=0, reference=None):
+        """Clear ``(hours, n)`` surpluses and deficits and book the trades.
+
+        Like ``clear`` for members that quote their surplus and deficit
+        directly; returns ``clear_market``'s ``(sold, bought, price, volume)``.
+        """
+        sold, bought, price, volume = clear_market(supply, demand, ask, bid, reference)
+        paid = np.nan_to_num(price)[:, None]
+        tokens = (sold - bought) * paid
+        self.balances += tokens.sum(axis=0)
+        if self.ledger is not None:
+            hours, members = np.nonzero(tokens)
+            amounts = tokens[hours, members]
+            self.ledger.extend(
+                hours + step,
+                self._ledger_ids[members],
+                np.where(amounts > 0, EARN, SPEND),
+                np.abs(amounts),
+            )
+        self.energy_sold += sold.sum(axis=0)
+        self.energy_bought += bought.sum(axis=0)
+        return sold, bought, price, volume
+
+    def run(
+        self,
+        store,
+        purchase,
+        sale,
+        ask=None,
+        bid=None,
+        chunk_hours=None,
+        reference=None,
+    ):
+        """Clear every hour of a ``ProfileStore`` in chunks of hours.
+
+        Asks default to the hour's grid sale price and bids to its purchase
+        price, the members' alternatives. Custom ``ask``/``bid`` may be
+        scalars, per-member ``(n,)`` arrays or ``(steps, n)`` arrays. Trades
+        clear at the scalar ``reference`` price where the quotes allow it (see
+        ``clear_market``). Returns the residual production and consumption per
+        hour.
+        """
+        steps = len(store)
+        n = len(self.names)
+        if chunk_hours is None:
+            chunk_hours = max(1, CHUNK_ELEMENTS // max(n, 1))
+        residual_production = np.empty(steps)
+        residual_consumption = np.empty(steps)
+        self.price = np.empty(steps)
+        self.volume = np.empty(steps)
+        for start in range(0, steps, chunk_hours):
+            window = slice(start, min(start + chunk_hours, steps))
+            chunk = (
+                residual_production[window],
+                residual_consumption[window],
+                self.price[window],
+                self.volume[window],
+            )
+            results = self.clear(
+                store.production[:, window].T,
+                store.consumption[:, window].T,
+                _quotes(sale, ask, window),
+                _quotes(purchase, bid, window),
+                step=start,
+                reference=reference,
+            )
+            for out, result in zip(chunk, results):
+                out[...] = result
+        return residual_production, residual_consumption
+
+
+def _quotes(default, quotes, window):
+    if quotes is None:
+        return np.asarray(default, dtype=np.float64)[window]
+    quotes = np.asarray(quotes, dtype=np.float64)
+    if quotes.ndim == 1:
+        return quotes[None, :]  # per member, same every hour
+    return quotes[window] if quotes.ndim == 2 else quotes
@@ -0,0 +1,207 @@
+import numpy as np
+
+_WEEKDAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_DAY_GROUPS = {
+    "all": range(7),
+    "weekday": range(5),
+    "weekdays": range(5),
+    "weekend": range(5, 7),
+    "weekends": range(5, 7),
+}
+
+
+class SparseTable:
+    """Range argmax/argmin over a fixed array with O(1) queries."""
+
+    def __init__(self, values, better):
+        self.values = values
+        self._better = better  # np.greater_equal for max, np.less_equal for min
+        n = len(values)
+        levels = [np.arange(n)]
+        width = 1
+        while 2 * width <= n:
+            prev = levels[-1]
+            left, right = prev[: n - 2 * width + 1], prev[width : n - width + 1]
+            levels.append(np.where(better(values[left], values[right]), left, right))
+            width *= 2
+        self._levels = levels
+
+    def argbest(self, start, stop):
+        """Index of the best value in ``values[start:stop]``; -1 when empty."""
+        if stop <= start:
+            return -1
+        k = (stop - start).bit_length() - 1
+        left = self._levels[k][start]
+        right = self._levels[k][stop - (1 << k)]
+        return left if self._better(self.values[left], self.values[right]) else right
+
+
+class PriceOracle:
+    """Purchase/sale prices for every step of a run, with O(1) window queries.
+
+    Prices are resolved once from the tariff, so agents can ask for the
+    highest or lowest price in the next ``k`` steps without rebuilding lists.
+    Arrays run ``lookahead`` steps past the horizon so windows near the end
+    of a run still see the following prices.
+    """
+
+    def __init__(self, purchase, sale, hour_of_day=None):
+        self.purchase = np.asarray(purchase, dtype=np.float64)
+        self.sale = np.asarray(sale, dtype=np.float64)
+        if hour_of_day is None:
+            hour_of_day = np.arange(len(self.purchase)) % 24
+        self.hour_of_day = np.asarray(hour_of_day)
+        self._tables = {}
+
+    @classmethod
+    def from_grid_costs(
+        cls, grid_costs, steps, start=None, step_minutes=60, lookahead=48
+    ):
+        """Resolve a ``load_grid_costs`` tariff over ``steps`` steps.
+
+        Entries are matched by their ``hour`` range (any slot length), and may
+        be restricted by ``days`` (``weekday``, ``weekend``, weekday names) or
+        a ``date``; date entries beat day entries, which beat plain ones.
+        ``start`` anchors the calendar and is required for day/date entries.
+        Tariffs without parseable hour ranges are applied cyclically by step.
+        """
+        n = steps + lookahead
+        slots = [_parse_slot(entry.get("hour")) for entry in grid_costs]
+        calendar = any("days" in entry or "date" in entry for entry in grid_costs)
+        if None in slots and not calendar:
+            index = np.arange(n) % len(grid_costs)
+            purchase = np.array([entry["purchase"] for entry in grid_costs])[index]
+            sale = np.array([entry["sale"] for entry in grid_costs])[index]
+            return cls(purchase, sale, index * 24 // len(grid_costs))
+        if None in slots:
+            raise ValueError("Every tariff entry needs an 'HH:MM - HH:MM' hour range")
+        if start is None:
+            if calendar:
+                raise ValueError("Day- or date-specific tariffs need a start timestamp")
+            start = "1970-01-01T00:00"  # only the time of day matters
+
+        times = np.datetime64(start, "m") + np.arange(n) * np.timedelta64(
+            int(step_minutes), "m"
+        )
+        days = times.astype("datetime64[D]")
+        minute = (times - days).astype(np.int64)
+        weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+        purchase = np.full(n, np.nan)
+        sale = np.full(n, np.nan)
+        priority = np.full(n, -1)
+        for entry, (begin, end) in zip(grid_costs, slots):
+            if begin < end:
+                mask = (minute >= begin) & (minute < end)
+            else:  # wraps past midnight
+                mask = (minute >= begin) | (minute < end)
+            rank = 0
+            if "date" in entry:
+                mask &= days == np.datetime64(entry["date"], "D")
+                rank = 2
+            elif "days" in entry:
+                mask &= np.isin(weekday, _parse_days(entry["days"]))
+                rank = 1
+            mask &= rank >= priority
+            purchase[mask] = entry["purchase"]
+            sale[mask] = entry["sale"]
+            priority[mask] = rank
+        if np.isnan(purchase).any():
+            missing = times[np.isnan(purchase)][0]
+            raise ValueError(f"No tariff entry covers {missing}")
+        return cls(purchase, sale, minute // 60)
+
+    def __len__(self):
+        return len(self.purchase)
+
+    def _table(self, kind, best):
+        key = (kind, best)
+        table = self._tables.get(key)
+        if table is None:
+            better = np.greater_equal if best == "max" else np.less_equal
+            table = self._tables[key] = SparseTable(getattr(self, kind), better)
+        return table
+
+    def _clamp(self, start, stop):
+        return max(start, 0), min(stop, len(self.purchase))
+
+    def window_argmax(self, kind, start, stop):
+        """Step of the highest ``kind`` price in ``[start, stop)``; -1 if empty."""
+        return self._table(kind, "max").argbest(*self._clamp(start, stop))
+
+    def window_argmin(self, kind, start, stop):
+        return self._table(kind, "min").argbest(*self._clamp(start, stop))
+
+    def window_max(self, kind, start, stop):
+        """Highest ``kind`` (``"purchase"``/``"sale"``) price in ``[start, stop)``."""
+        i = self.window_argmax(kind, start, stop)
+        return -np.inf if i < 0 else float(getattr(self, kind)[i])
+
+    def window_min(self, kind, start, stop):
+        i = self.window_argmin(kind, start, stop)
+        return np.inf if i < 0 else float(getattr(self, kind)[i])
+
+
+def resolve_prices(grid_costs, hourly_data, lookahead=48):
+    """``PriceOracle`` for a run over ``hourly_data``, anchored on its first dates.
+
+    ``grid_costs`` may already be a ``PriceOracle``, which is returned as is.
+    """
+    if isinstance(grid_costs, PriceOracle):
+        return grid_costs
+    start, step_minutes = infer_calendar(
+        [entry.get("date") for entry in hourly_data[:2]]
+    )
+    return PriceOracle.from_grid_costs(
+        grid_costs,
+        len(hourly_data),
+        start=start,
+        step_minutes=step_minutes,
+        lookahead=lookahead,
+    )
+
+
+def infer_calendar(dates):
+    """Start timestamp and step length in minutes from the first two date labels.
+
+    Returns ``(None, 60)`` when the labels are not parseable timestamps.
+    """
+    if not dates or not isinstance(dates[0], str):
+        return None, 60
+    try:
+        first = np.datetime64(dates[0], "m")
+        if len(dates) < 2:
+            return first, 60
+        step = int((np.datetime64(dates[1], "m") - first).astype(np.int64))
+    except (ValueError, TypeError):
+        return None, 60
+    return first, step if step > 0 else 60
+
+
+def _parse_slot(label):
+    if not isinstance(label, str) or "-" not in label:
+        return None
+    try:
+        begin, end = (_minutes(part) for part in label.split("-"))
+    except ValueError:
+        return None
+    return begin, 24 * 60 if end == 0 else end
+
+
+def _minutes(text):
+    hours, minutes = text.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _parse_days(days):
+    if isinstance(days, str):
+        days = [days]
+    result = []
+    for day in days:
+        if isinstance(day, int):
+            result.append(day)
+        elif day.lower() in _DAY_GROUPS:
+            result.extend(_DAY_GROUPS[day.lower()])
+        else:
+            result.append(_WEEKDAY_NAMES.index(day.lower()[:3]))
+    return result
@@ -0,0 +1,73 @@
+import os
+import pickle
+import uuid
+import warnings
+import zlib
+
+# File header: magic, format version, then the length-prefixed code
+# fingerprint of the package that wrote the snapshot
+MAGIC = b"OPZSNAP"
+SNAPSHOT_VERSION = 1
+
+
+def dumps(state, level=1):
+    """Serialize ``state`` to compressed pickle bytes with a small header.
+
+    zlib level 1 keeps periodic checkpoints cheap; history columns and price
+    arrays still shrink several-fold.
+    """
+    from operatorzy.utils.run_cache import code_fingerprint
+
+    code = code_fingerprint().encode()
+    payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), level)
+    return MAGIC + bytes([SNAPSHOT_VERSION, len(code)]) + code + payload
+
+
+def loads(data):
+    """Inverse of ``dumps``.
+
+    Warns when the snapshot was written by different package code: the run
+    still resumes, but not necessarily bit-identically.
+    """
+    from operatorzy.utils.run_cache import code_fingerprint
+
+    data = memoryview(data)
+    header = len(MAGIC)
+    if bytes(data[:header]) != MAGIC:
+        raise ValueError("Not an operatorzy snapshot")
+    version, size = data[header], data[header + 1]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}"
+        )
+    code = bytes(data[header + 2 : header + 2 + size]).decode()
+    if code != code_fingerprint():
+        warnings.warn(
+            "Snapshot was written by different operatorzy code; "
+            "the resumed run may differ from an uninterrupted one",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+    return pickle.loads(zlib.decompress(data[header + 2 + size :]))
+
+
+def write(path, data):
+    """Write snapshot bytes to ``path`` atomically (temporary file + rename)."""
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
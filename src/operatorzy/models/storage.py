@@ -1,16 +1,148 @@
+import math
+
+import numpy as np
+
+
+def greedy_split(amount, room):
+    """Split ``amount`` over units in order, each taking at most its ``room``.
+
+    Works along the last axis, so ``amount`` may be a scalar with a 1-D
+    ``room`` or one amount per row of a 2-D ``room``.
+    """
+    filled = np.cumsum(room, axis=-1)
+    before = np.zeros_like(filled)
+    before[..., 1:] = filled[..., :-1]
+    return np.clip(np.expand_dims(amount, -1) - before, 0.0, room)
+
+
+class StorageBank:
+    """Fleet of storages with capacities and levels in contiguous arrays.
+
+    Charging and discharging fill or drain units greedily in order, as the old
+    per-``Storage`` loop did, but in one vectorized operation. Power limits are
+    per step and measured at the community side; the round-trip efficiency is
+    split evenly between charging and discharging.
+    """
+
+    def __init__(
+        self, names, capacities, max_charge=None, max_discharge=None, efficiency=None
+    ):
+        self.names = list(names)
+        n = len(self.names)
+        self.capacity = np.asarray(capacities, dtype=np.float64).reshape(n)
+        self.level = np.zeros(n)
+        self.max_charge = self._per_unit(max_charge, np.inf)
+        self.max_discharge = self._per_unit(max_discharge, np.inf)
+        self.efficiency = self._per_unit(efficiency, 1.0)
+        self.charge_efficiency = np.sqrt(self.efficiency)
+        self.discharge_efficiency = self.charge_efficiency.copy()
+
+    def _per_unit(self, values, default):
+        if values is None:
+            return np.full(len(self.names), default)
+        values = np.asarray(values, dtype=np.float64)
+        values = np.where(np.isnan(values), default, values)
+        return np.array(np.broadcast_to(values, (len(self.names),)))
+
+    @classmethod
+    def from_configs(cls, configs):
+        """Build a bank from ``load_storages``-style dicts."""
+
+        def column(key):
+            return [config.get(key, math.nan) for config in configs]
+
+        return cls(
+            [config["id"] for config in configs],
+            [config["capacity"] for config in configs],
+            max_charge=column("max_charge"),
+            max_discharge=column("max_discharge"),
+            efficiency=column("efficiency"),
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def units(self):
+        return [Storage(name, bank=self, index=i) for i, name in enumerate(self.names)]
+
+    @property
+    def fill_ratio(self):
+        """Levels normalized to 0–1."""
+        return self.level / self.capacity
+
+    def charge(self, amount):
+        """Charge up to ``amount``; returns the energy taken by each unit."""
+        room = np.minimum(
+            (self.capacity - self.level) / self.charge_efficiency, self.max_charge
+        )
+        charged = greedy_split(amount, room)
+        self.level += charged * self.charge_efficiency
+        np.minimum(self.level, self.capacity, out=self.level)
+        return charged
+
+    def discharge(self, amount):
+        """Discharge up to ``amount``; returns the energy delivered by each unit."""
+        available = np.minimum(
+            self.level * self.discharge_efficiency, self.max_discharge
+        )
+        discharged = greedy_split(amount, available)
+        self.level -= discharged / self.discharge_efficiency
+        np.maximum(self.level, 0.0, out=self.level)
+        return discharged
+
+    def charge_unit(self, index, amount):
+        room = min(
+            (self.capacity[index] - self.level[index])
+            / self.charge_efficiency[index],
+            self.max_charge[index],
+        )
+        charged = float(min(amount, room))
+        self.level[index] = min(
+            self.level[index] + charged * self.charge_efficiency[index],
+            self.capacity[index],
+        )
+        return charged
+
+    def discharge_unit(self, index, amount):
+        available = min(
+            self.level[index] * self.discharge_efficiency[index],
+            self.max_discharge[index],
+        )
+        discharged = float(min(amount, available))
+        self.level[index] = max(
+            self.level[index] - discharged / self.discharge_efficiency[index], 0.0
+        )
+        return discharged
+
+
 class Storage:
-    def __init__(self, id, capacity):
+    """Single storage; a view over one unit of a ``StorageBank``."""
+
+    def __init__(self, id, capacity=None, bank=None, index=0):
+        if bank is None:
+            bank = StorageBank([id], [capacity])
         self.name = id
-        self.capacity = capacity
-        self.current_level = 0
+        self.bank = bank
+        self.index = index
+
+    @property
+    def capacity(self):
+        return float(self.bank.capacity[self.index])
+
+    @capacity.setter
+    def capacity(self, value):
+        self.bank.capacity[self.index] = value
+
+    @property
+    def current_level(self):
+        return float(self.bank.level[self.index])
+
+    @current_level.setter
+    def current_level(self, value):
+        self.bank.level[self.index] = value
 
     def charge(self, amount):
-        available_capacity = self.capacity - self.current_level
-        charged = min(amount, available_capacity)
-        self.current_level += charged
-        return charged
+        return self.bank.charge_unit(self.index, amount)
 
     def discharge(self, amount):
-        discharged = min(amount, self.current_level)
-        self.current_level -= discharged
-        return discharged
\ No newline at end of file
+        return self.bank.discharge_unit(self.index, amount)
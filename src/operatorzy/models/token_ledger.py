@@ -0,0 +1,242 @@
+import numpy as np
+
+MINT, BURN, SPEND, EARN = range(4)
+KINDS = ("mint", "burn", "spend", "earn")
+# Balance effect of each kind; amounts are stored as positive numbers
+_SIGN = np.array([1.0, -1.0, -1.0, 1.0])
+
+_COLUMNS = {
+    "step": np.int64,
+    "member": np.int32,
+    "kind": np.int8,
+    "amount": np.float64,
+    "balance": np.float64,  # member's balance right after the event
+}
+
+
+class TokenLedger:
+    """Append-only token event log with per-member running balances.
+
+    Events are stored column-wise in typed arrays that double when full, and
+    every event carries its member's balance after it, so current balances
+    are O(1) and ``balance_at`` is a binary search. Window queries
+    (``totals``, ``top_earners``) use a member-grouped index with cumulative
+    amounts, built on the first query after new events, and answer for all
+    members with one vectorized search instead of replaying the log.
+
+    Each member's steps must be appended in non-decreasing order. With
+    ``keep_events=False`` only the balances are tracked, in constant memory,
+    and the event queries are unavailable.
+    """
+
+    def __init__(self, initial_balances=None, capacity=1024, keep_events=True):
+        self.keep_events = keep_events
+        if not keep_events:
+            capacity = 1
+        self.names = []
+        self._ids = {}
+        self._initial = []
+        self._current = []
+        self._data = {
+            name: np.empty(capacity, dtype=dtype) for name, dtype in _COLUMNS.items()
+        }
+        self._size = 0
+        self._last_step = []
+        self._index = None
+        for name, balance in (initial_balances or {}).items():
+            self.add_member(name, balance)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def add_member(self, name, balance=0.0):
+        if name in self._ids:
+            raise ValueError(f"Member {name!r} is already in the ledger")
+        self._ids[name] = len(self.names)
+        self.names.append(name)
+        self._initial.append(balance)
+        self._current.append(balance)
+        self._last_step.append(-1)
+        self._index = None
+        return self._ids[name]
+
+    def member_id(self, name):
+        return self._ids[name]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._data["step"])
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            for name, column in self._data.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[: self._size] = column[: self._size]
+                self._data[name] = grown
+
+    def _member_id(self, member):
+        """Id of ``member``, given by name or by (NumPy) integer id."""
+        if isinstance(member, (int, np.integer)):
+            return int(member)
+        return self._ids[member]
+
+    def record(self, step, member, kind, amount):
+        """Append one event; ``member`` is a name or id, ``amount`` positive."""
+        member = self._member_id(member)
+        if step < self._last_step[member]:
+            raise ValueError(
+                f"Steps of {self.names[member]!r} must not decrease "
+                f"({step} after {self._last_step[member]})"
+            )
+        self._last_step[member] = step
+        balance = self._current[member]
+        balance = balance + amount if kind in (MINT, EARN) else balance - amount
+        self._current[member] = balance
+        if not self.keep_events:
+            return
+        if self._size == len(self._data["step"]):
+            self._reserve(1)
+        i = self._size
+        data = self._data
+        data["step"][i] = step
+        data["member"][i] = member
+        data["kind"][i] = kind
+        data["amount"][i] = amount
+        data["balance"][i] = balance
+        self._size = i + 1
+        self._index = None
+
+    def extend(self, steps, members, kinds, amounts):
+        """Append many events at once; arrays broadcast against each other."""
+        steps, members, kinds, amounts = np.broadcast_arrays(
+            np.asarray(steps, dtype=np.int64),
+            np.asarray(members, dtype=np.int32),
+            np.asarray(kinds, dtype=np.int8),
+            np.asarray(amounts, dtype=np.float64),
+        )
+        count = len(steps)
+        if count == 0:
+            return
+        order = np.argsort(members, kind="stable")
+        grouped = members[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        last = np.r_[starts[1:], count] - 1
+        ordered_steps = steps[order]
+        first_step = np.asarray(self._last_step)[grouped[starts]]
+        if np.any(ordered_steps[starts] < first_step) or np.any(
+            np.delete(np.diff(ordered_steps) < 0, starts[1:] - 1)
+        ):
+            raise ValueError("Each member's ledger steps must not decrease")
+
+        # Running balances: per-member cumulative sums on top of the current ones
+        delta = amounts * _SIGN[kinds]
+        sums = np.cumsum(delta[order])
+        base = np.repeat(sums[starts] - delta[order][starts], np.diff(np.r_[starts, count]))
+        current = np.asarray(self._current)
+        balance = np.empty(count)
+        balance[order] = current[grouped] + (sums - base)
+        for member, value, step in zip(
+            grouped[starts].tolist(),
+            balance[order][last].tolist(),
+            ordered_steps[last].tolist(),
+        ):
+            self._current[member] = value
+            self._last_step[member] = step
+        if not self.keep_events:
+            return
+
+        self._reserve(count)
+        window = slice(self._size, self._size + count)
+        data = self._data
+        data["step"][window] = steps
+        data["member"][window] = members
+        data["kind"][window] = kinds
+        data["amount"][window] = amounts
+        data["balance"][window] = balance
+        self._size += count
+        self._index = None
+
+    def __getstate__(self):
+        # Recorded events only; the query index is rebuilt on demand
+        state = self.__dict__.copy()
+        size = max(self._size, 1)
+        state["_data"] = {name: column[:size].copy() for name, column in self._data.items()}
+        state["_index"] = None
+        return state
+
+    def column(self, name):
+        view = self._data[name][: self._size].view()
+        view.flags.writeable = False
+        return view
+
+    def balance(self, member):
+        member = self._member_id(member)
+        return self._current[member]
+
+    def balances(self):
+        return dict(zip(self.names, self._current))
+
+    def _grouped(self):
+        """Events grouped by member (step order kept) and per-member offsets."""
+        if not self.keep_events:
+            raise ValueError("This ledger keeps balances only, not events")
+        if self._index is None:
+            members = self.column("member")
+            order = np.argsort(members, kind="stable")
+            offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(members, minlength=len(self.names)), out=offsets[1:])
+            steps = self.column("step")[order]
+            # Composite member/step key, sorted, for all-member window searches
+            span = (int(steps.max()) + 2) if len(steps) else 1
+            key = members[order].astype(np.int64) * span + steps
+            self._index = {
+                "order": order,
+                "offsets": offsets,
+                "steps": steps,
+                "balance": self.column("balance")[order],
+                "key": key,
+                "span": span,
+                "cumulative": {},
+            }
+        return self._index
+
+    def balance_at(self, member, step):
+        """Balance of ``member`` after every event up to and including ``step``."""
+        member = self._member_id(member)
+        index = self._grouped()
+        lo, hi = index["offsets"][member], index["offsets"][member + 1]
+        found = np.searchsorted(index["steps"][lo:hi], step, side="right")
+        if found == 0:
+            return self._initial[member]
+        return float(index["balance"][lo + found - 1])
+
+    def totals(self, start=None, stop=None, kinds=(EARN,)):
+        """Per-member sum of ``kinds`` amounts over steps ``[start, stop)``."""
+        index = self._grouped()
+        kinds = tuple(sorted(kinds))
+        cumulative = index["cumulative"].get(kinds)
+        if cumulative is None:
+            amount = self.column("amount")[index["order"]]
+            selected = np.isin(self.column("kind")[index["order"]], kinds)
+            cumulative = np.zeros(self._size + 1)
+            np.cumsum(np.where(selected, amount, 0.0), out=cumulative[1:])
+            index["cumulative"][kinds] = cumulative
+        span = index["span"]
+        start = 0 if start is None else max(int(start), 0)
+        stop = span if stop is None else min(int(stop), span)
+        base = np.arange(len(self.names), dtype=np.int64) * span
+        lo = np.searchsorted(index["key"], base + start, side="left")
+        hi = np.searchsorted(index["key"], base + max(stop, start), side="left")
+        return cumulative[hi] - cumulative[lo]
+
+    def top_earners(self, start=None, stop=None, k=10, kinds=(EARN,)):
+        """The ``k`` members with most ``kinds`` tokens in ``[start, stop)``."""
+        totals = self.totals(start, stop, kinds)
+        k = min(k, len(totals))
+        if k == 0:
+            return []
+        best = np.argpartition(-totals, k - 1)[:k]
+        best = best[np.argsort(-totals[best], kind="stable")]
+        return [(self.names[i], float(totals[i])) for i in best]
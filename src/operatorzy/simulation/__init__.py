@@ -1,2 +1,15 @@
-# File: /fetchai-agent-simulation/fetchai-agent-simulation/operatorzy/simulation/__init__.py
-# This file is intentionally left blank.
+# Simulation entry points; imported on first access.
+from operatorzy._lazy import lazy_exports
+
+_EXPORTS = {
+    "load_grid_costs": ".energy_community_simulation",
+    "main": ".energy_community_simulation",
+    "BureauCommunity": ".bureau",
+    "LocalBureau": ".bureau",
+    "LiveRuntime": ".live",
+    "ReplaySource": ".live",
+    "expand_spec": ".sweep",
+    "run_sweep": ".sweep",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
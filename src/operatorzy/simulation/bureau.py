@@ -0,0 +1,559 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from operatorzy.models.cooperative import Cooperative
+from operatorzy.models.p2p_market import P2PMarket
+from operatorzy.models.price_oracle import PriceOracle, infer_calendar
+from operatorzy.models.storage import StorageBank
+
+OPERATOR = "operator"
+
+
+# Messages of one step: the operator sends every participant a Tick, each
+# household answers with a Bid and each storage with a StorageReport, and the
+# operator settles the step with a Dispatch to everyone who traded, charged
+# or discharged. Messages are shared between recipients and never modified.
+@dataclass(slots=True)
+class Tick:
+    step: int
+    purchase_price: float
+    sale_price: float
+
+
+@dataclass(slots=True)
+class Bid:
+    step: int
+    supply: float  # kWh surplus for sale
+    demand: float  # kWh deficit to cover
+    ask: float  # lowest price accepted for the surplus
+    bid: float  # highest price paid for the deficit
+
+
+@dataclass(slots=True)
+class StorageReport:
+    step: int
+    level: float  # kWh stored
+
+
+@dataclass(slots=True)
+class Dispatch:
+    step: int
+    # Households: sold (+) or bought (-) on the P2P market; storages:
+    # charged (+) or discharged (-), both in kWh at the community side
+    energy: float
+    tokens: float  # change of the participant's token balance
+
+
+class LocalBureau:
+    """In-process message bus for agents, run in synchronous rounds.
+
+    Messages sent during a round are delivered together in the next one:
+    each agent's ``handle`` gets its whole inbox as ``(sender, message)``
+    pairs, in sending order, in a single call. A simulation step thus costs
+    two rounds and one call per agent, however many messages the operator
+    receives. Nothing leaves the process.
+    """
+
+    def __init__(self):
+        self.agents = {}
+        self.rounds = 0
+        self.messages = 0
+        self.deliveries = 0  # handle calls
+        self._outbox = {}
+
+    def add(self, agent):
+        if agent.address in self.agents:
+            raise ValueError(f"Address {agent.address!r} is already in the bureau")
+        self.agents[agent.address] = agent
+        agent.bureau = self
+        return agent
+
+    def send(self, sender, recipient, message):
+        inbox = self._outbox.get(recipient)
+        if inbox is None:
+            if recipient not in self.agents:
+                raise KeyError(f"No agent at {recipient!r}")
+            inbox = self._outbox[recipient] = []
+        inbox.append((sender, message))
+
+    def broadcast(self, sender, recipients, message):
+        envelope = (sender, message)
+        outbox = self._outbox
+        for recipient in recipients:
+            inbox = outbox.get(recipient)
+            if inbox is None:
+                self.send(sender, recipient, message)
+            else:
+                inbox.append(envelope)
+
+    def step(self):
+        """Deliver the messages of the last round; False if there were none."""
+        outbox, self._outbox = self._outbox, {}
+        if not outbox:
+            return False
+        self.rounds += 1
+        agents = self.agents
+        for address, inbox in outbox.items():
+            self.messages += len(inbox)
+            agents[address].handle(inbox)
+        self.deliveries += len(outbox)
+        return True
+
+    def run(self):
+        """Deliver rounds until no agent sends anything."""
+        while self.step():
+            pass
+
+
+class BureauAgent:
+    """Participant of a ``LocalBureau``; ``handle`` receives a round's inbox."""
+
+    def __init__(self, address):
+        self.address = address
+        self.bureau = None
+
+    def send(self, recipient, message):
+        self.bureau.send(self.address, recipient, message)
+
+    def handle(self, inbox):
+        raise NotImplementedError
+
+
+class HouseholdAgent(BureauAgent):
+    """A PPE with its meter profile; bids its net energy every step.
+
+    The surplus is offered at ``ask`` and the deficit bid at ``bid``, by
+    default the step's grid sale and purchase prices (the household's
+    alternatives, as in ``P2PMarket.run``). Dispatches update its token
+    balance and traded energy.
+    """
+
+    def __init__(
+        self, address, production, consumption, ask=None, bid=None, operator=OPERATOR
+    ):
+        super().__init__(address)
+        self.production = production
+        self.consumption = consumption
+        self.ask = ask
+        self.bid = bid
+        self.operator = operator
+        self.balance = 0.0
+        self.energy_sold = 0.0
+        self.energy_bought = 0.0
+
+    def handle(self, inbox):
+        for _, message in inbox:
+            if type(message) is Tick:
+                step = message.step
+                net = float(self.production[step] - self.consumption[step])
+                self.send(
+                    self.operator,
+                    Bid(
+                        step,
+                        net if net > 0.0 else 0.0,
+                        -net if net < 0.0 else 0.0,
+                        message.sale_price if self.ask is None else self.ask,
+                        message.purchase_price if self.bid is None else self.bid,
+                    ),
+                )
+            else:
+                if message.energy > 0:
+                    self.energy_sold += message.energy
+                else:
+                    self.energy_bought -= message.energy
+                self.balance += message.tokens
+
+
+class StorageAgent(BureauAgent):
+    """One storage unit from a ``load_storages``-style config.
+
+    Reports its level every step and charges or discharges what it is
+    dispatched, with its own power limits and efficiency.
+    """
+
+    def __init__(self, address, config, initial_token_balance=0.0, operator=OPERATOR):
+        super().__init__(address)
+        self.name = config["id"]
+        self.bank = StorageBank.from_configs([config])
+        self.operator = operator
+        self.balance = initial_token_balance
+
+    @property
+    def level(self):
+        return float(self.bank.level[0])
+
+    def handle(self, inbox):
+        for _, message in inbox:
+            if type(message) is Tick:
+                self.send(self.operator, StorageReport(message.step, self.level))
+            else:
+                if message.energy > 0:
+                    self.bank.charge(message.energy)
+                else:
+                    self.bank.discharge(-message.energy)
+                self.balance += message.tokens
+
+
+class _MirrorBank(StorageBank):
+    """The operator's copy of the storage agents' units.
+
+    Levels are overwritten with the agents' reports before every step; what
+    the step charges (+) or discharges (-) per unit is kept in
+    ``dispatched`` for the operator to send out.
+    """
+
+    dispatched = None
+
+    def charge(self, amount):
+        charged = super().charge(amount)
+        self.dispatched = charged
+        return charged
+
+    def discharge(self, amount):
+        discharged = super().discharge(amount)
+        self.dispatched = -discharged
+        return discharged
+
+
+class OperatorAgent(BureauAgent):
+    """Community operator: clears the bids, then steps the cooperative.
+
+    Once all bids and storage reports of a step are in, the households'
+    surpluses and deficits are cleared on ``market`` and the residual goes
+    through ``cooperative.step_reading`` (agent decision, tokens, history
+    and outputs), with the storage bank set to the reported levels. The
+    trades and the storage charges/discharges are dispatched back, together
+    with the next step's tick.
+    """
+
+    def __init__(
+        self,
+        cooperative,
+        market,
+        households,
+        storages,
+        dates,
+        economics,
+        address=OPERATOR,
+    ):
+        super().__init__(address)
+        self.cooperative = cooperative
+        self.market = market
+        self.households = list(households)
+        self.storages = list(storages)
+        self.dates = dates
+        self.economics = economics
+        self.steps = len(dates)
+        self.step = 0
+        self.busy = 0.0  # seconds spent clearing and stepping
+        self._participants = self.households + self.storages
+        self._household_ids = {address: i for i, address in enumerate(self.households)}
+        self._storage_ids = {address: i for i, address in enumerate(self.storages)}
+        n = len(self.households)
+        self._supply = np.zeros(n)
+        self._demand = np.zeros(n)
+        self._ask = np.zeros(n)
+        self._bid = np.zeros(n)
+        self._levels = np.zeros(len(self.storages))
+
+    def start(self, steps=None):
+        """Send the first tick; the run goes on to ``steps`` or the last date."""
+        if steps is not None:
+            self.steps = min(steps, len(self.dates))
+        self.market.price = np.full(self.steps, np.nan)
+        self.market.volume = np.zeros(self.steps)
+        self._tick(0)
+
+    def _tick(self, step):
+        self.step = step
+        if step >= self.steps:
+            self.finish()
+            return
+        prices = self.cooperative.prices
+        self.bureau.broadcast(
+            self.address,
+            self._participants,
+            Tick(step, float(prices.purchase[step]), float(prices.sale[step])),
+        )
+
+    def handle(self, inbox):
+        started = time.perf_counter()
+        step = self.step
+        household_ids = self._household_ids
+        supply, demand, ask, bid = self._supply, self._demand, self._ask, self._bid
+        bids = reports = 0
+        for sender, message in inbox:
+            if message.step != step:
+                raise RuntimeError(
+                    f"{sender} answered step {message.step} during step {step}"
+                )
+            if type(message) is Bid:
+                i = household_ids[sender]
+                supply[i] = message.supply
+                demand[i] = message.demand
+                ask[i] = message.ask
+                bid[i] = message.bid
+                bids += 1
+            else:
+                self._levels[self._storage_ids[sender]] = message.level
+                reports += 1
+        if bids != len(self.households) or reports != len(self.storages):
+            raise RuntimeError(
+                f"Step {step}: {bids} of {len(self.households)} bids and {reports} of "
+                f"{len(self.storages)} storage reports arrived"
+            )
+        self._settle(step)
+        self.busy += time.perf_counter() - started
+        self._tick(step + 1)
+
+    def _settle(self, step):
+        p2p_base_price = self.economics[0]
+        sold, bought, price, volume = self.market.settle(
+            self._supply[None],
+            self._demand[None],
+            _uniform(self._ask),
+            _uniform(self._bid),
+            step,
+            reference=p2p_base_price,
+        )
+        self.market.price[step] = price[0]
+        self.market.volume[step] = volume[0]
+        traded = sold[0] - bought[0]
+        tokens = (traded * np.nan_to_num(price[0])).tolist()
+        send = self.send
+        for i in np.flatnonzero(traded).tolist():
+            send(self.households[i], Dispatch(step, float(traded[i]), tokens[i]))
+
+        cooperative = self.cooperative
+        bank = cooperative.storage_bank
+        bank.level[:] = self._levels
+        bank.dispatched = None
+        cooperative.step_reading(
+            step,
+            {
+                "hour": step,
+                "date": self.dates[step],
+                "production": float(self._supply.sum() - sold.sum()),
+                "consumption": float(self._demand.sum() - bought.sum()),
+            },
+            *self.economics,
+        )
+        if bank.dispatched is not None:
+            energy = bank.dispatched.tolist()
+            for i in np.flatnonzero(bank.dispatched).tolist():
+                send(
+                    self.storages[i],
+                    Dispatch(step, energy[i], -energy[i] * p2p_base_price),
+                )
+
+    def finish(self):
+        """Close the cooperative's outputs, as at the end of ``simulate``."""
+        cooperative = self.cooperative
+        if cooperative.aggregates is not None:
+            cooperative.aggregates.close()
+        if cooperative.frontend_sink is not None:
+            cooperative.frontend_sink.close()
+        if cooperative.profiler is not None:
+            if cooperative.profile_trace is not None:
+                cooperative.profiler.write_trace(cooperative.profile_trace)
+            print(cooperative.profiler.report())
+
+
+def _uniform(quotes):
+    """One price for everyone when all quotes agree (the fast clearing path)."""
+    if len(quotes) and quotes.min() == quotes.max():
+        return quotes[:1]
+    return quotes[None, :]
+
+
+def _per_household(quotes, n):
+    if quotes is None or np.ndim(quotes) == 0:
+        return [quotes] * n
+    return np.asarray(quotes, dtype=np.float64).reshape(n).tolist()
+
+
+class BureauCommunity:
+    """A cooperative run as one agent per household and storage.
+
+    Every PPE of a ``ProfileStore`` is a ``HouseholdAgent`` and every storage
+    a ``StorageAgent``; an ``OperatorAgent`` runs the configured decision
+    agent. They only talk through messages on a ``LocalBureau``, batched per
+    step: two rounds per step, one inbox per agent and round. The outcome is
+    that of ``Cooperative.simulate_households`` with the same inputs (up to
+    the rounding of sums over households), except that agents looking at
+    future readings (``future_data``) see none: the residual of later steps
+    is only known once they are cleared.
+
+    ``config`` is a ``Cooperative`` config, so history, log and dashboard
+    outputs work as in a regular run. ``ask``/``bid`` are fixed quotes, a
+    scalar or one per PPE, instead of the grid prices.
+    """
+
+    def __init__(
+        self,
+        config,
+        store,
+        grid_costs,
+        initial_token_balance=100,
+        p2p_base_price=0.5,
+        min_price=0.2,
+        token_mint_rate=0.1,
+        token_burn_rate=0.1,
+        ask=None,
+        bid=None,
+    ):
+        self.bureau = LocalBureau()
+        storage_configs = config.get("storages", [])
+        cooperative = Cooperative(
+            config,
+            initial_token_balance,
+            storage_bank=_MirrorBank.from_configs(storage_configs),
+        )
+        cooperative.create_agent(grid_costs)
+        dates = store.labels.tolist()
+        start, step_minutes = infer_calendar(dates[:2])
+        cooperative.prices = PriceOracle.from_grid_costs(
+            grid_costs,
+            len(dates),
+            start=start,
+            step_minutes=step_minutes,
+            lookahead=max(48, cooperative._lookahead),
+        )
+        cooperative.market = P2PMarket(store.names, ledger=cooperative.ledger)
+        self.cooperative = cooperative
+
+        ask = _per_household(ask, store.n_ppe)
+        bid = _per_household(bid, store.n_ppe)
+        self.households = [
+            self.bureau.add(
+                HouseholdAgent(
+                    f"household/{name}",
+                    store.production[i],
+                    store.consumption[i],
+                    ask=ask[i],
+                    bid=bid[i],
+                )
+            )
+            for i, name in enumerate(store.names)
+        ]
+        self.storages = [
+            self.bureau.add(
+                StorageAgent(f"storage/{c['id']}", c, initial_token_balance)
+            )
+            for c in storage_configs
+        ]
+        self.operator = self.bureau.add(
+            OperatorAgent(
+                cooperative,
+                cooperative.market,
+                [household.address for household in self.households],
+                [storage.address for storage in self.storages],
+                dates,
+                (p2p_base_price, min_price, token_mint_rate, token_burn_rate),
+            )
+        )
+        self.elapsed = 0.0
+
+    def run(self, steps=None):
+        """Simulate every step (or the first ``steps``); returns ``stats()``."""
+        started = time.perf_counter()
+        self.operator.start(steps)
+        self.bureau.run()
+        self.elapsed = time.perf_counter() - started
+        return self.stats()
+
+    def stats(self):
+        bureau = self.bureau
+        steps = self.cooperative.next_step
+        per_step = max(steps, 1)
+        return {
+            "participants": len(self.households) + len(self.storages),
+            "steps": steps,
+            "rounds": bureau.rounds,
+            "messages": bureau.messages,
+            "messages_per_step": bureau.messages / per_step,
+            "deliveries_per_step": bureau.deliveries / per_step,
+            "elapsed_s": self.elapsed,
+            "operator_s": self.operator.busy,
+            "steps_per_s": steps / self.elapsed if self.elapsed else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (
+            f"{stats['steps']} steps of {stats['participants']} agents in "
+            f"{stats['elapsed_s']:.2f} s ({stats['steps_per_s']:.1f} steps/s), "
+            f"{stats['messages_per_step']:.0f} messages and "
+            f"{stats['deliveries_per_step']:.0f} inboxes per step; "
+            f"operator clearing and deciding {stats['operator_s']:.2f} s"
+        )
+
+
+def add_arguments(parser):
+    from operatorzy.agents.registry import DEFAULT_AGENT, available_agents
+
+    parser.add_argument("storages", help="storage file path")
+    parser.add_argument("profiles", help="profiles directory path")
+    parser.add_argument("grid_costs", help="grid costs file path")
+    parser.add_argument(
+        "--agent",
+        choices=available_agents(),
+        help=f"decision agent (default: {DEFAULT_AGENT})",
+    )
+    parser.add_argument(
+        "--agent-param", action="append", default=[], metavar="KEY=VALUE"
+    )
+    parser.add_argument("--steps", type=int, help="simulate at most this many steps")
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="also run the monolithic households simulation and compare",
+    )
+    return parser
+
+
+def run(args):
+    from operatorzy.agents.registry import DEFAULT_AGENT
+    from operatorzy.simulation.energy_community_simulation import (
+        load_grid_costs,
+        parse_agent_params,
+    )
+    from operatorzy.utils.helper_functions import load_storages
+    from operatorzy.utils.profile_cache import load_profile_store
+
+    config = {
+        "storages": load_storages(args.storages),
+        "agent": args.agent or DEFAULT_AGENT,
+        "agent_params": parse_agent_params(args.agent_param),
+        "frontend_output": None,
+        "log_level": "OFF",
+    }
+    store = load_profile_store(args.profiles)
+    if args.steps is not None:
+        store = store.window(0, args.steps)
+    grid_costs = load_grid_costs(args.grid_costs)
+
+    community = BureauCommunity(config, store, grid_costs)
+    community.run()
+    print(community.report())
+    market = community.cooperative.market
+    print(
+        f"P2P market: {market.volume.sum():.2f} kWh traded "
+        f"in {(market.volume > 0).sum()} of {len(market.volume)} hours"
+    )
+    balance = community.cooperative.community_token_balance
+    print(f"Final token balance: {balance:.2f} CT")
+
+    if args.compare:
+        cooperative = Cooperative(config, initial_token_balance=100)
+        started = time.perf_counter()
+        cooperative.simulate_households(store, 0.5, 0.2, 0.1, 0.1, grid_costs)
+        elapsed = time.perf_counter() - started
+        print(
+            f"Monolithic loop: {elapsed:.2f} s "
+            f"(the agents took {community.elapsed / elapsed:.1f}x as long), "
+            f"final token balance {cooperative.community_token_balance:.2f} CT "
+            f"(difference {balance - cooperative.community_token_balance:+.2e})"
+        )
@@ -1,12 +1,17 @@
+from operatorzy.agents.registry import DEFAULT_AGENT, available_agents
 from operatorzy.models.cooperative import Cooperative
+from operatorzy.models.log_sink import LEVELS as LOG_LEVELS
+from operatorzy.models.optimal_dispatch import optimal_baseline, token_balance_bound
 from operatorzy.utils.helper_functions import (
     plot_results,
     save_results_to_csv,
-    load_profiles,
     load_storages,
 )
-import sys
-import csv
+from operatorzy.utils.frontend_output import FORMATS as FRONTEND_FORMATS
+from operatorzy.utils.plotting import METHODS as PLOT_METHODS, plot_history
+from operatorzy.utils.profile_cache import load_profile_store
+from operatorzy.utils.run_cache import DEFAULT_CACHE_DIR, RunCache, run_key
+import argparse
 from datetime import datetime
 from pathlib import Path
 
@@ -17,100 +22,403 @@ import json
 def load_grid_costs(filepath):
     with open(filepath, "r") as f:
         data = json.load(f)
-    return [
-        {
+    grid_costs = []
+    for entry in data["grid_costs"]:
+        cost = {
             "hour": entry["Hour"],
             "purchase": float(entry["Purchase"]),
             "sale": float(entry["Sale"]),
         }
-        for entry in data["grid_costs"]
-    ]
+        # Optional weekday/weekend or single-date restrictions, see PriceOracle
+        if "Days" in entry:
+            cost["days"] = entry["Days"]
+        if "Date" in entry:
+            cost["date"] = entry["Date"]
+        grid_costs.append(cost)
+    return grid_costs
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 1:
-        print("No required parameter: storage file path")
-        sys.exit(1)
-    if len(sys.argv) < 2:
-        print("No required parameter: profiles directory path")
-        sys.exit(1)
-    if len(sys.argv) < 3:
-        print("No required parameter: logs directory path")
-        sys.exit(1)
-    if len(sys.argv) < 4:
-        print("No required parameter: grid costs file path")
-        sys.exit(1)
-
-    storages = load_storages(sys.argv[1])
-
-    config = {"storages": storages}
-
-    cooperative = Cooperative(config, initial_token_balance=100)
-
-    # Load profiles
-    profiles = load_profiles(sys.argv[2])
-
-    # Determine the number of steps based on the number of hours in the profiles
-    steps = len(next(iter(profiles.values())))
-
-    # Prepare hourly data based on the loaded profiles
-    hourly_data = []
-    time_labels = []
-    for hour in range(steps):
-        total_consumption = 0
-        total_production = 0
-        for ppe, profile in profiles.items():
-            total_consumption += profile.iloc[hour]["consumption"]
-            total_production += profile.iloc[hour]["production"]
-        date = profile.iloc[hour][
-            "hour"
-        ]  # Assuming 'hour' column contains date information
-        time_labels.append(date)
-        hourly_data.append(
-            {
-                "hour": hour,
-                "consumption": total_consumption,
-                "production": total_production,
-                "date": date,
-            }
-        )
+def parse_agent_params(pairs):
+    """Turn ``KEY=VALUE`` strings into kwargs; values are parsed as JSON when possible."""
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {pair!r}")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+def add_arguments(parser):
+    parser.add_argument("storages", help="storage file path")
+    parser.add_argument("profiles", help="profiles directory path")
+    parser.add_argument("logs", help="logs directory path")
+    parser.add_argument("grid_costs", help="grid costs file path")
+    parser.add_argument(
+        "--config",
+        help='JSON file with "agent" and "agent_params" (CLI flags take precedence)',
+    )
+    parser.add_argument(
+        "--agent",
+        choices=available_agents(),
+        help=f"decision agent (default: {DEFAULT_AGENT})",
+    )
+    parser.add_argument(
+        "--agent-param",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="agent constructor parameter, may be repeated",
+    )
+    parser.add_argument(
+        "--frontend-output",
+        default="frontend_output.json",
+        metavar="PATH",
+        help="dashboard data file, written while the run progresses "
+        "(default: frontend_output.json; .ndjson/.jsonl select NDJSON)",
+    )
+    parser.add_argument(
+        "--frontend-format",
+        choices=FRONTEND_FORMATS,
+        help="dashboard data format (default: from the file suffix)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="write the dashboard JSON without indentation",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default="INFO",
+        help="per-step log detail; OFF skips logging entirely (default: INFO)",
+    )
+    parser.add_argument(
+        "--households",
+        action="store_true",
+        help="keep every PPE separate and clear a P2P market between them each "
+        "hour before storage and grid",
+    )
+    parser.add_argument(
+        "--no-baseline",
+        action="store_true",
+        help="skip the perfect-foresight aggregate-unit optimum and upper bound",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each phase of the simulation step and print a summary",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        metavar="PATH",
+        help="also write a Chrome trace (chrome://tracing, Perfetto) of every step",
+    )
+    parser.add_argument(
+        "--plot",
+        choices=("full", "downsampled", "none"),
+        default="full",
+        help="result plots: every point, downsampled series (fast for long "
+        "horizons) or none (default: full)",
+    )
+    parser.add_argument(
+        "--plot-points",
+        type=int,
+        default=2000,
+        help="points per series with --plot downsampled (default: 2000)",
+    )
+    parser.add_argument(
+        "--plot-method",
+        choices=PLOT_METHODS,
+        default="minmax",
+        help="downsampling: min/max envelope per bucket or LTTB (default: minmax)",
+    )
+    parser.add_argument(
+        "--plot-panels",
+        action="store_true",
+        help="with --plot downsampled, write each panel to its own file, in parallel",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always simulate, neither reading nor storing the run cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"run cache directory (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=512,
+        metavar="MB",
+        help="run cache size limit; least recently used runs are evicted (default: 512)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="keep only run totals and daily/monthly rollups (constant memory); "
+        "writes summary and rollup CSVs instead of the per-step CSV, log, dashboard "
+        "data and plots",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        metavar="STEPS",
+        help="snapshot the full simulation state every STEPS hours",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help="checkpoint file, replaced at every snapshot "
+        "(default: simulation_<date>.ckpt in the logs directory)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="PATH",
+        help="continue the run saved in a checkpoint; pass the same profiles and "
+        "grid costs, storages and agent come from the checkpoint",
+    )
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the energy community simulation")
+    return add_arguments(parser)
+
+
+def run(args):
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    agent_params = {**config.get("agent_params", {}), **parse_agent_params(args.agent_param)}
+
+    storages = load_storages(args.storages)
+
+    now = datetime.now()
+    formatted_date = now.strftime("%Y-%m-%d_%H-%M-%S")
+
+    # The log is streamed to this file in batches while the run progresses
+    log_dir = Path(args.logs)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / f"simulation_{formatted_date}.log"
+    checkpoint_path = args.checkpoint or log_dir / f"simulation_{formatted_date}.ckpt"
+
+    results_dir = Path("results")
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    config = {
+        "storages": storages,
+        "agent": args.agent or config.get("agent", DEFAULT_AGENT),
+        "agent_params": agent_params,
+        "frontend_output": args.frontend_output,
+        "frontend_format": args.frontend_format,
+        "frontend_compact": args.compact,
+        "log_level": args.log_level,
+        "log_path": log_path,
+        "profile": args.profile,
+        "profile_trace": args.profile_trace,
+    }
+    if args.stream:
+        # Finished days and months go straight to their CSV files
+        config["history"] = "stream"
+        config["rollup_paths"] = {
+            period: results_dir / f"simulation_{period}_{formatted_date}.csv"
+            for period in ("daily", "monthly")
+        }
+
+    # Load profiles into an aligned columnar store (memory-mapped when cached)
+    store = load_profile_store(args.profiles)
+
+    # Community totals per hour, aggregated in one vectorized pass
+    hourly_data = store.hourly_data()
+    time_labels = [entry["date"] for entry in hourly_data]
 
     # Load grid costs
-    grid_costs = load_grid_costs(sys.argv[4])
+    grid_costs = load_grid_costs(args.grid_costs)
 
     p2p_base_price = 0.5
     min_price = 0.2
     token_mint_rate = 0.1
     token_burn_rate = 0.1
 
-    cooperative.simulate(
-        len(hourly_data),
-        p2p_base_price,
-        min_price,
-        token_mint_rate,
-        token_burn_rate,
-        hourly_data,
-        grid_costs,
+    # Identical inputs give identical results: reuse a stored run if there is
+    # one (profiled runs always simulate, that is their point; resumed runs
+    # carry their settings in the checkpoint, streaming ones keep no history)
+    cache = None
+    if not (args.no_cache or args.resume or args.stream):
+        cache = RunCache(args.cache_dir, max_bytes=int(args.cache_size * 2**20))
+    key = run_key(
+        profiles=store.fingerprint,
+        storages=storages,
+        grid_costs=grid_costs,
+        agent=config["agent"],
+        agent_params=agent_params,
+        economics=[p2p_base_price, min_price, token_mint_rate, token_burn_rate, 100],
+        households=args.households,
+        outputs=[
+            Path(args.frontend_output or "").suffix,
+            args.frontend_format,
+            args.compact,
+            args.log_level,
+        ],
     )
+    cached = None
+    if cache is not None and not (args.profile or args.profile_trace):
+        cached = cache.get(key)
 
-    results_dir = Path("results")
-    results_dir.mkdir(parents=True, exist_ok=True)
-    now = datetime.now()
-    formatted_date = now.strftime("%Y-%m-%d_%H-%M-%S")
+    if cached is not None:
+        cooperative = Cooperative(
+            {"storages": storages, "frontend_output": None, "log_level": "OFF"},
+            initial_token_balance=100,
+        )
+        cooperative.history.load(cached.array("history"))
+        cooperative.community_token_balance = cached.meta["community_token_balance"]
+        cached.copy_file("frontend", args.frontend_output or None)
+        if args.households:
+            residual = cached.array("residual")
+            hourly_data = [
+                dict(entry, production=p, consumption=c)
+                for entry, p, c in zip(
+                    hourly_data, residual[0].tolist(), residual[1].tolist()
+                )
+            ]
+            print(cached.meta["market"])
+        print(f"Loaded from the run cache ({cached.path})")
+    else:
+        if args.resume:
+            # Outputs continue in the files the checkpointed run was writing
+            cooperative = Cooperative.restore(args.resume)
+            if cooperative.log_sink is not None and cooperative.log_sink.path:
+                log_path = Path(cooperative.log_sink.path)
+            print(f"Resuming {args.resume} at step {cooperative.next_step}")
+        else:
+            cooperative = Cooperative(config, initial_token_balance=100)
+        if args.households:
+            # The cooperative only sees what is left after P2P trading
+            hourly_data = cooperative.simulate_households(
+                store,
+                p2p_base_price,
+                min_price,
+                token_mint_rate,
+                token_burn_rate,
+                grid_costs,
+                checkpoint_every=args.checkpoint_every,
+                checkpoint_path=checkpoint_path,
+            )
+            market = cooperative.market
+            market_summary = (
+                f"P2P market: {market.volume.sum():.2f} kWh traded "
+                f"in {(market.volume > 0).sum()} of {len(market.volume)} hours"
+            )
+            print(market_summary)
+        else:
+            cooperative.simulate(
+                len(hourly_data),
+                p2p_base_price,
+                min_price,
+                token_mint_rate,
+                token_burn_rate,
+                hourly_data,
+                grid_costs,
+                checkpoint_every=args.checkpoint_every,
+                checkpoint_path=checkpoint_path,
+            )
+
+    # Compare against perfect foresight: the schedule that is optimal when the
+    # storages act as one unit, and a bound no agent can beat
+    summary = f"Final token balance: {cooperative.community_token_balance:.2f} CT"
+    optimal_balance = cached.meta.get("optimal_token_balance") if cached else None
+    upper_bound = cached.meta.get("upper_bound_token_balance") if cached else None
+    if not args.no_baseline:
+        economics = (
+            config,
+            hourly_data,
+            grid_costs,
+            p2p_base_price,
+            min_price,
+            token_mint_rate,
+            token_burn_rate,
+        )
+        if optimal_balance is None:
+            _, optimal = optimal_baseline(*economics, initial_token_balance=100)
+            optimal_balance = optimal.community_token_balance
+        if upper_bound is None:
+            upper_bound = token_balance_bound(*economics, initial_token_balance=100)
+        summary += (
+            f" (aggregate-unit optimum: {optimal_balance:.2f} CT, "
+            f"upper bound: {upper_bound:.2f} CT)"
+        )
+    print(summary)
+
+    if cooperative.aggregates is not None:
+        cooperative.aggregates.save_summary(
+            results_dir / f"simulation_summary_{formatted_date}.csv"
+        )
+        return
 
     # Save results to CSV files
     save_results_to_csv(cooperative, time_labels, results_dir, formatted_date)
 
-    # Save logs to a text file
-    log_dir = Path(sys.argv[3])
-    log_dir.mkdir(parents=True, exist_ok=True)
+    if args.log_level != "OFF":
+        if cached is not None:
+            cached.copy_file("log", log_path)
+        else:
+            # Write out the rest of the log
+            cooperative.save_logs(str(log_path))
 
-    cooperative.save_logs(str(log_dir / f"simulation_{formatted_date}.log"))
+    if cache is not None and cached is None:
+        meta = {
+            "community_token_balance": cooperative.community_token_balance,
+            "optimal_token_balance": optimal_balance,
+            "upper_bound_token_balance": upper_bound,
+        }
+        arrays = {"history": cooperative.history.to_numpy()}
+        if args.households:
+            meta["market"] = market_summary
+            arrays["residual"] = [
+                [entry["production"] for entry in hourly_data],
+                [entry["consumption"] for entry in hourly_data],
+            ]
+        cache.put(
+            key,
+            meta,
+            arrays,
+            files={
+                "frontend": args.frontend_output or None,
+                "log": log_path if args.log_level != "OFF" else None,
+            },
+        )
 
     # Generate labels for the X-axis
     labels = time_labels
 
-    # Assign the modified method to the cooperative object
-    cooperative.plot_results = plot_results.__get__(cooperative)
+    if args.plot == "downsampled":
+        plot_history(
+            cooperative.history,
+            [storage.name for storage in cooperative.storages],
+            labels,
+            results_dir,
+            formatted_date,
+            points=args.plot_points,
+            method=args.plot_method,
+            separate=args.plot_panels,
+        )
+    elif args.plot == "full":
+        # Assign the modified method to the cooperative object
+        cooperative.plot_results = plot_results.__get__(cooperative)
+
+        cooperative.plot_results(len(hourly_data), labels, results_dir, formatted_date)
+
 
-    cooperative.plot_results(len(hourly_data), labels, results_dir, formatted_date)
+def main(argv=None):
+    run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
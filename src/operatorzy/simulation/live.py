@@ -0,0 +1,524 @@
+import asyncio
+import json
+import os
+import time
+
+from operatorzy.models.cooperative import Cooperative
+from operatorzy.models.price_oracle import PriceOracle, infer_calendar
+from operatorzy.utils.latency import LatencyHistogram
+
+# Readings are ``hourly_data``-style dicts plus the site they come from, e.g.
+# {"site": "PPE1", "date": "2023-06-01 00:00", "consumption": 1.2,
+# "production": 0.4}; sources are async iterables of them. File and socket
+# streams are NDJSON and end with this line.
+END = {"end": True}
+SOURCES = ("replay", "file", "socket")
+# Steps the shared price tables reach past the latest reading
+PRICE_LOOKAHEAD = 48
+
+
+class QueueSource:
+    """Readings put on an ``asyncio.Queue`` in the same process; None ends."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def __aiter__(self):
+        while True:
+            reading = await self.queue.get()
+            if reading is None:
+                return
+            yield reading
+
+
+class FileTailSource:
+    """NDJSON readings from a file another process appends to, like ``tail -f``.
+
+    Waits for the file to appear and for new lines at its end; an incomplete
+    last line is held back until its newline arrives. ``END`` ends the stream,
+    and so does the end of the file with ``follow=False``.
+    """
+
+    def __init__(self, path, follow=True, poll_interval=0.05):
+        self.path = os.fspath(path)
+        self.follow = follow
+        self.poll_interval = poll_interval
+
+    async def __aiter__(self):
+        while self.follow and not os.path.exists(self.path):
+            await asyncio.sleep(self.poll_interval)
+        with open(self.path, "rb") as f:
+            pending = b""
+            while True:
+                chunk = f.read(1 << 16)
+                if not chunk:
+                    if not self.follow:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        reading = json.loads(line)
+                        if reading.get("end"):
+                            return
+                        yield reading
+
+
+class SocketSource:
+    """NDJSON readings from clients of a local socket.
+
+    Listens on the Unix socket ``path``, or on ``host:port`` (port 0 picks a
+    free one); ``address`` is set and ``started`` fires once it listens. Any
+    number of clients send readings one per line, and ``END`` from any of
+    them ends the stream. At most ``buffer`` readings are read ahead of the
+    consumer, so a fast sender is slowed down by the socket's flow control.
+    """
+
+    def __init__(self, path=None, host="127.0.0.1", port=0, buffer=1024):
+        self.path = os.fspath(path) if path else None
+        self.host = host
+        self.port = port
+        self.buffer = buffer
+        self.address = None
+        self.started = asyncio.Event()
+
+    async def __aiter__(self):
+        queue = asyncio.Queue(self.buffer)
+
+        async def handle(reader, writer):
+            try:
+                async for line in reader:
+                    if not line.strip():
+                        continue
+                    reading = json.loads(line)
+                    if reading.get("end"):
+                        await queue.put(None)
+                        break
+                    await queue.put(reading)
+            finally:
+                writer.close()
+
+        if self.path:
+            server = await asyncio.start_unix_server(handle, self.path)
+            self.address = self.path
+        else:
+            server = await asyncio.start_server(handle, self.host, self.port)
+            self.address = server.sockets[0].getsockname()[:2]
+        self.started.set()
+        try:
+            while True:
+                reading = await queue.get()
+                if reading is None:
+                    return
+                yield reading
+        finally:
+            server.close()
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class ReplaySource:
+    """Meter readings replayed from a ``ProfileStore``, e.g. ``pv_profiles/``.
+
+    Every PPE is a site. With more ``sites`` than PPEs the profiles are
+    reused in turn (``"<ppe>#<k>"``), so a few profiles can stand in for
+    thousands of meters. ``aggregate=True`` replays the community totals as
+    the single site ``"community"``, i.e. the input of ``Cooperative.simulate``.
+    All sites' readings of a step are emitted before the next step, which
+    starts ``interval`` seconds after the previous one (0: as fast as they are
+    consumed).
+    """
+
+    def __init__(self, store, sites=None, interval=0.0, steps=None, aggregate=False):
+        self.store = store
+        self.interval = interval
+        self.steps = len(store) if steps is None else min(steps, len(store))
+        self.aggregate = aggregate
+        n_ppe = store.n_ppe
+        if aggregate:
+            self.sites = ["community"]
+        else:
+            count = sites or n_ppe
+            self._rows = [i % n_ppe for i in range(count)]
+            self.sites = [
+                store.names[row] if count <= n_ppe else f"{store.names[row]}#{i // n_ppe}"
+                for i, row in enumerate(self._rows)
+            ]
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        from operatorzy.utils.profile_cache import load_profile_store
+
+        return cls(load_profile_store(directory), **kwargs)
+
+    def __len__(self):
+        return self.steps * len(self.sites)
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        store = self.store
+        labels = store.labels[: self.steps].tolist()
+        if self.aggregate:
+            production = store.total_production()[None, : self.steps]
+            consumption = store.total_consumption()[None, : self.steps]
+            rows = [0]
+        else:
+            production, consumption, rows = store.production, store.consumption, self._rows
+        start = loop.time()
+        for step, date in enumerate(labels):
+            produced = production[:, step].tolist()
+            consumed = consumption[:, step].tolist()
+            for site, row in zip(self.sites, rows):
+                yield {
+                    "site": site,
+                    "date": date,
+                    "production": produced[row],
+                    "consumption": consumed[row],
+                }
+            if self.interval:
+                await asyncio.sleep(max(0.0, start + (step + 1) * self.interval - loop.time()))
+
+
+class QueueSink:
+    """Publishes decisions to a bounded ``asyncio.Queue``; None marks the end."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def publish(self, record):
+        await self.queue.put(record)
+
+    async def close(self):
+        await self.queue.put(None)
+
+
+class NdjsonSink:
+    """Appends decisions to an NDJSON file, ``batch_size`` lines per write."""
+
+    def __init__(self, path, batch_size=256):
+        self.path = os.fspath(path)
+        self.batch_size = batch_size
+        self._lines = []
+        self._file = None
+
+    async def publish(self, record):
+        self._lines.append(json.dumps(record, separators=(",", ":")))
+        if len(self._lines) >= self.batch_size:
+            self._write()
+
+    def _write(self):
+        if self._file is None:
+            self._file = open(self.path, "w")
+        self._file.write("\n".join(self._lines) + "\n")
+        self._file.flush()
+        self._lines = []
+
+    async def close(self):
+        if self._lines or self._file is None:
+            self._write()
+        self._file.close()
+
+
+class LiveRuntime:
+    """Runs the configured agent and storage dispatch per meter reading.
+
+    Every site is a ``Cooperative`` without per-step outputs
+    (``history="off"``) that gets its readings one at a time through
+    ``step_reading``, so a site sees the same decisions, storage levels and
+    token balances as ``simulate`` over the same data. Agents that look at
+    future readings (``future_data``) see none. Sites starting at the same
+    time share one price table, extended as the run goes on.
+
+    A router reads the source into one bounded queue per site and one task
+    per site decides and publishes to ``sink`` (``publish``/``close``
+    coroutines; None drops the decisions). Backpressure is twofold: a site
+    that falls behind fills its queue of ``queue_size`` readings, and at most
+    ``max_in_flight`` readings are queued over all sites. Either stalls the
+    router and with it the source, which bounds memory and keeps latency
+    from piling up in queues. The latency of a decision runs from the router
+    receiving its reading to the sink accepting the decision.
+    """
+
+    def __init__(
+        self,
+        config,
+        grid_costs,
+        sink=None,
+        initial_token_balance=100,
+        p2p_base_price=0.5,
+        min_price=0.2,
+        token_mint_rate=0.1,
+        token_burn_rate=0.1,
+        queue_size=64,
+        max_in_flight=4096,
+        step_minutes=60,
+        horizon=24 * 7,
+    ):
+        self.config = dict(config, history="off", frontend_output=None, log_level="OFF")
+        self.grid_costs = grid_costs
+        self.sink = sink
+        self.initial_token_balance = initial_token_balance
+        self.economics = (p2p_base_price, min_price, token_mint_rate, token_burn_rate)
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight
+        self.step_minutes = step_minutes
+        self.horizon = horizon
+        self.sites = {}
+        self.latency = LatencyHistogram()
+        self.readings = 0
+        self.decisions = 0
+        self.max_queue_depth = 0
+        self.elapsed = 0.0
+        self._prices = {}  # calendar start -> PriceOracle shared by its sites
+        self._error = None
+
+    def _oracle(self, start, steps):
+        """Price table from ``start`` covering at least ``steps`` steps."""
+        oracle = self._prices.get(start)
+        if oracle is None or len(oracle) - PRICE_LOOKAHEAD < steps:
+            horizon = max(self.horizon, steps)
+            if oracle is not None:
+                horizon = max(horizon, 2 * (len(oracle) - PRICE_LOOKAHEAD))
+            oracle = self._prices[start] = PriceOracle.from_grid_costs(
+                self.grid_costs,
+                horizon,
+                start=start,
+                step_minutes=self.step_minutes,
+                lookahead=PRICE_LOOKAHEAD,
+            )
+        return oracle
+
+    def _site(self, start):
+        cooperative = Cooperative(self.config, self.initial_token_balance)
+        cooperative.create_agent(self.grid_costs)
+        cooperative.prices = self._oracle(start, 1)
+        return cooperative
+
+    async def _serve(self, name, start, queue, in_flight, router):
+        cooperative = self.sites[name]
+        sink = self.sink
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                reading, received = item
+                step = cooperative.next_step
+                if step >= len(cooperative.prices) - PRICE_LOOKAHEAD:
+                    cooperative.prices = self._oracle(start, step + 1)
+                decision = cooperative.step_reading(step, reading, *self.economics)
+                if sink is not None:
+                    await sink.publish(
+                        {
+                            "site": name,
+                            "step": step,
+                            "date": reading["date"],
+                            "action": Cooperative._get_ai_action_label(
+                                decision, reading["production"] - reading["consumption"]
+                            ),
+                            "storage_levels": cooperative.storage_bank.level.tolist(),
+                            "token_balance": cooperative.community_token_balance,
+                        }
+                    )
+                self.latency.record((time.perf_counter_ns() - received) / 1e9)
+                self.decisions += 1
+                in_flight.release()
+        except Exception as exc:
+            # A stuck site would stall the router forever; stop the run instead
+            self._error = exc
+            router.cancel()
+
+    async def run(self, source):
+        """Consume ``source`` until it ends and every decision is published."""
+        started = time.perf_counter()
+        router = asyncio.current_task()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        queues = {}
+        tasks = []
+        try:
+            async for reading in source:
+                received = time.perf_counter_ns()
+                await in_flight.acquire()
+                name = reading.get("site", "community")
+                queue = queues.get(name)
+                if queue is None:
+                    # A site's calendar starts at its first reading
+                    start = infer_calendar([reading.get("date")])[0]
+                    self.sites[name] = self._site(start)
+                    queue = queues[name] = asyncio.Queue(self.queue_size)
+                    tasks.append(
+                        asyncio.create_task(self._serve(name, start, queue, in_flight, router))
+                    )
+                await queue.put((reading, received))
+                self.readings += 1
+                depth = queue.qsize()
+                if depth > self.max_queue_depth:
+                    self.max_queue_depth = depth
+            for queue in queues.values():
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            if self._error is None:
+                raise
+            raise self._error from None
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.elapsed = time.perf_counter() - started
+        if self.sink is not None:
+            await self.sink.close()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "sites": len(self.sites),
+            "readings": self.readings,
+            "decisions": self.decisions,
+            "elapsed_s": self.elapsed,
+            "decisions_per_s": self.decisions / self.elapsed if self.elapsed else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+            "latency": self.latency.summary(),
+        }
+
+    def report(self):
+        stats = self.stats()
+        latency = stats["latency"]
+        lines = [
+            f"{stats['decisions']} decisions for {stats['sites']} sites in "
+            f"{stats['elapsed_s']:.2f} s ({stats['decisions_per_s']:.0f}/s), "
+            f"deepest site queue {stats['max_queue_depth']}"
+        ]
+        if latency["count"]:
+            lines.append(
+                "Decision latency: "
+                + ", ".join(
+                    f"{key[:-3]} {value:.3f} ms"
+                    for key, value in latency.items()
+                    if key.endswith("_ms")
+                )
+            )
+        return "\n".join(lines)
+
+
+def open_source(kind, profiles=None, path=None, host="127.0.0.1", port=0, **replay):
+    """Source of a ``SOURCES`` kind; ``replay`` goes to ``ReplaySource``."""
+    if kind == "replay":
+        return ReplaySource.from_directory(profiles, **replay)
+    if kind == "file":
+        return FileTailSource(path)
+    if kind == "socket":
+        return SocketSource(path=path, host=host, port=port)
+    raise ValueError(f"Unknown live source {kind!r}, expected one of {SOURCES}")
+
+
+def add_arguments(parser):
+    from operatorzy.agents.registry import DEFAULT_AGENT, available_agents
+
+    parser.add_argument("storages", help="storage file path (every site gets these)")
+    parser.add_argument("grid_costs", help="grid costs file path")
+    parser.add_argument(
+        "--source",
+        choices=SOURCES,
+        default="replay",
+        help="meter readings: replayed profiles, an NDJSON file being appended to, "
+        "or NDJSON lines on a local socket (default: replay)",
+    )
+    parser.add_argument(
+        "--profiles", default="pv_profiles", help="profiles directory to replay"
+    )
+    parser.add_argument(
+        "--path", help="file to tail, or Unix socket to listen on (default: TCP)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument(
+        "--sites", type=int, help="replayed sites, cycling through the profiles"
+    )
+    parser.add_argument(
+        "--aggregate",
+        action="store_true",
+        help="replay the community totals as one site, like the batch simulation",
+    )
+    parser.add_argument("--steps", type=int, help="replay at most this many steps")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        help="seconds between replayed steps (default: 0, as fast as possible)",
+    )
+    parser.add_argument(
+        "--agent",
+        choices=available_agents(),
+        help=f"decision agent (default: {DEFAULT_AGENT})",
+    )
+    parser.add_argument(
+        "--agent-param", action="append", default=[], metavar="KEY=VALUE"
+    )
+    parser.add_argument("--output", metavar="PATH", help="NDJSON file for the decisions")
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="readings buffered per site before the source is paused (default: 64)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=4096,
+        help="readings buffered over all sites before the source is paused "
+        "(default: 4096)",
+    )
+    return parser
+
+
+def run(args):
+    from operatorzy.agents.registry import DEFAULT_AGENT
+    from operatorzy.simulation.energy_community_simulation import (
+        load_grid_costs,
+        parse_agent_params,
+    )
+    from operatorzy.utils.helper_functions import load_storages
+
+    config = {
+        "storages": load_storages(args.storages),
+        "agent": args.agent or DEFAULT_AGENT,
+        "agent_params": parse_agent_params(args.agent_param),
+    }
+    source = open_source(
+        args.source,
+        profiles=args.profiles,
+        path=args.path,
+        host=args.host,
+        port=args.port,
+        sites=args.sites,
+        interval=args.interval,
+        steps=args.steps,
+        aggregate=args.aggregate,
+    )
+    runtime = LiveRuntime(
+        config,
+        load_grid_costs(args.grid_costs),
+        sink=NdjsonSink(args.output) if args.output else None,
+        queue_size=args.queue_size,
+        max_in_flight=args.max_in_flight,
+    )
+
+    async def main():
+        if isinstance(source, SocketSource):
+            async def announce():
+                await source.started.wait()
+                print(f"Listening on {source.address}", flush=True)
+
+            asyncio.get_running_loop().create_task(announce())
+        return await runtime.run(source)
+
+    asyncio.run(main())
+    print(runtime.report())
+    balances = [site.community_token_balance for site in runtime.sites.values()]
+    if balances:
+        print(
+            f"Final token balance: {sum(balances) / len(balances):.2f} CT "
+            f"average over {len(balances)} sites"
+        )
@@ -0,0 +1,411 @@
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from operatorzy.agents.registry import DEFAULT_AGENT
+from operatorzy.models.cooperative import Cooperative
+from operatorzy.models.optimal_dispatch import optimal_baseline, token_balance_bound
+from operatorzy.models.price_oracle import PriceOracle, resolve_prices
+from operatorzy.simulation.energy_community_simulation import load_grid_costs
+from operatorzy.utils.helper_functions import load_storages
+from operatorzy.utils.profile_cache import load_profile_store
+from operatorzy.utils.run_cache import DEFAULT_CACHE_DIR, RunCache, run_key
+
+# Run-level parameters a spec may sweep, with the defaults of ``run``
+RUN_DEFAULTS = {
+    "p2p_base_price": 0.5,
+    "min_price": 0.2,
+    "token_mint_rate": 0.1,
+    "token_burn_rate": 0.1,
+    "initial_token_balance": 100,
+}
+SUMMARY_FIELDS = (
+    "final_token_balance",
+    "grid_cost",
+    "energy_bought_from_grid",
+    "energy_sold",
+    "self_consumption",
+    "optimal_token_balance",
+    "optimal_grid_cost",
+    "upper_bound_token_balance",
+)
+
+
+def expand_spec(spec):
+    """Parameter sets of a sweep spec.
+
+    ``spec["params"]`` maps a parameter to a list of values, a scalar, or a
+    range ``{"low": .., "high": .., "num": ..}`` (add ``"int": true`` for
+    integers). ``"mode": "grid"`` (default) takes the cartesian product;
+    ``"mode": "random"`` draws ``samples`` sets (lists are sampled uniformly,
+    ranges continuously) from a generator seeded with ``seed``.
+
+    Parameter names are agent constructor arguments, except ``agent``, the
+    keys of ``RUN_DEFAULTS``, ``storage:<id>`` (capacity of one storage) and
+    ``storage_scale`` (factor on every capacity).
+    """
+    params = spec.get("params", {})
+    mode = spec.get("mode", "grid")
+    if mode == "grid":
+        values = [_grid_values(value) for value in params.values()]
+        return [dict(zip(params, combo)) for combo in itertools.product(*values)]
+    if mode == "random":
+        rng = np.random.default_rng(spec.get("seed", 0))
+        return [
+            {name: _sample(rng, value) for name, value in params.items()}
+            for _ in range(spec.get("samples", 100))
+        ]
+    raise ValueError(f"Unknown sweep mode {mode!r}, expected 'grid' or 'random'")
+
+
+def _grid_values(value):
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        values = np.linspace(value["low"], value["high"], value.get("num", 5))
+        if value.get("int"):
+            return sorted({int(round(v)) for v in values})
+        return values.tolist()
+    return [value]
+
+
+def _sample(rng, value):
+    if isinstance(value, list):
+        return value[rng.integers(len(value))]
+    if isinstance(value, dict):
+        if value.get("int"):
+            return int(rng.integers(value["low"], value["high"], endpoint=True))
+        return float(rng.uniform(value["low"], value["high"]))
+    return value
+
+
+class SharedArrays:
+    """Named read-only NumPy arrays packed into one shared memory block.
+
+    The creating process owns the block (``close`` unlinks it); workers
+    ``attach`` by the picklable ``handle`` and get views without copying.
+    """
+
+    def __init__(self, arrays):
+        self.layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            self.layout[name] = (offset, array.shape, array.dtype.str)
+            offset += -(-array.nbytes // 8) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            _view(self._shm, *self.layout[name], writeable=True)[...] = array
+
+    @property
+    def handle(self):
+        return self._shm.name, self.layout
+
+    @staticmethod
+    def attach(handle):
+        name, layout = handle
+        shm = shared_memory.SharedMemory(name=name)
+        arrays = {key: _view(shm, *spec) for key, spec in layout.items()}
+        return shm, arrays
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _view(shm, offset, shape, dtype, writeable=False):
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+    array.flags.writeable = writeable
+    return array
+
+
+# Per-process state set up once by ``_init_worker``
+_worker = {}
+
+
+def _init_worker(handle, storages, agent, cache=None, inputs=None):
+    shm, arrays = SharedArrays.attach(handle)
+    consumption = arrays["consumption"].tolist()
+    production = arrays["production"].tolist()
+    _worker.update(
+        shm=shm,  # keeps the mapping alive for the arrays below
+        storages=storages,
+        agent=agent,
+        hourly_data=[
+            {
+                "hour": hour,
+                "consumption": consumption[hour],
+                "production": production[hour],
+                "date": date,
+            }
+            for hour, date in enumerate(arrays["labels"].tolist())
+        ],
+        consumption=arrays["consumption"],
+        production=arrays["production"],
+        prices=PriceOracle(
+            arrays["purchase"], arrays["sale"], arrays["hour_of_day"]
+        ),
+        baselines={},
+        # Run cache and the inputs shared by every run's key (profiles, tariff)
+        cache=None if cache is None else RunCache(*cache),
+        inputs=inputs,
+    )
+
+
+def _run_one(task):
+    index, params = task
+    config = {
+        "storages": [dict(storage) for storage in _worker["storages"]],
+        "agent": _worker["agent"],
+        "agent_params": {},
+        "frontend_output": None,
+        "log_level": "OFF",
+    }
+    run = dict(RUN_DEFAULTS)
+    scale = 1.0
+    for name, value in params.items():
+        if name == "agent":
+            config["agent"] = value
+        elif name in RUN_DEFAULTS:
+            run[name] = value
+        elif name == "storage_scale":
+            scale = value
+        elif name.startswith("storage:"):
+            storage_id = name.partition(":")[2]
+            matches = [s for s in config["storages"] if str(s["id"]) == storage_id]
+            if not matches:
+                raise ValueError(f"Unknown storage {storage_id!r} in sweep spec")
+            matches[0]["capacity"] = value
+        else:
+            config["agent_params"][name] = value
+    for storage in config["storages"]:
+        storage["capacity"] *= scale
+
+    cache = _worker["cache"]
+    if cache is not None:
+        key = run_key(
+            **_worker["inputs"],
+            kind="sweep",
+            storages=config["storages"],
+            agent=config["agent"],
+            agent_params=config["agent_params"],
+            run=run,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return {"run": index, **params, **cached.meta["summary"]}
+
+    hourly_data = _worker["hourly_data"]
+    cooperative = Cooperative(config, initial_token_balance=run["initial_token_balance"])
+    cooperative.simulate(
+        len(hourly_data),
+        run["p2p_base_price"],
+        run["min_price"],
+        run["token_mint_rate"],
+        run["token_burn_rate"],
+        hourly_data,
+        _worker["prices"],
+    )
+    summary = summarize(cooperative, _worker)
+    optimal = _baseline(config["storages"], run)
+    summary["optimal_token_balance"] = optimal["final_token_balance"]
+    summary["optimal_grid_cost"] = optimal["grid_cost"]
+    summary["upper_bound_token_balance"] = optimal["upper_bound_token_balance"]
+    if cache is not None:
+        cache.put(key, {"summary": summary}, evict=False)
+    return {"run": index, **params, **summary}
+
+
+def _baseline(storages, run):
+    """Aggregate-unit optimum summary and upper bound, once per setup per worker."""
+    key = (
+        tuple(tuple(sorted((k, str(v)) for k, v in s.items())) for s in storages),
+        tuple(sorted(run.items())),
+    )
+    baselines = _worker["baselines"]
+    if key not in baselines:
+        economics = (
+            {"storages": storages},
+            _worker["hourly_data"],
+            _worker["prices"],
+            run["p2p_base_price"],
+            run["min_price"],
+            run["token_mint_rate"],
+            run["token_burn_rate"],
+        )
+        initial = run["initial_token_balance"]
+        _, optimal = optimal_baseline(*economics, initial_token_balance=initial)
+        baselines[key] = summarize(optimal, _worker)
+        baselines[key]["upper_bound_token_balance"] = token_balance_bound(
+            *economics, initial_token_balance=initial
+        )
+    return baselines[key]
+
+
+def summarize(cooperative, data):
+    """Summary metrics of a finished run (without the perfect-foresight baselines).
+
+    Self-consumption is the share of production used in the community:
+    what covered same-hour demand plus what went into storage.
+    """
+    history = cooperative.history
+    production = data["production"]
+    total_production = float(production.sum())
+    used = np.minimum(data["consumption"], production).sum()
+    used += history.column("energy_added_to_storage").sum()
+    return {
+        "final_token_balance": float(cooperative.community_token_balance),
+        "grid_cost": float(history.column("cost_from_grid").sum()),
+        "energy_bought_from_grid": float(
+            history.column("energy_bought_from_grid").sum()
+        ),
+        "energy_sold": float(history.column("energy_sold_to_grid").sum()),
+        "self_consumption": float(used / total_production) if total_production else 0.0,
+    }
+
+
+def run_sweep(
+    storages, store, grid_costs, param_sets, agent=DEFAULT_AGENT, workers=None, cache=None
+):
+    """Run every parameter set and return the summary rows in input order.
+
+    Profile totals and resolved tariffs go to the workers once, through
+    shared memory; each task only carries its parameter dict. With a
+    ``RunCache``, summaries of runs already done are reused and new ones
+    stored.
+    """
+    hourly_data = store.hourly_data()
+    lookahead = max(
+        [48] + [int(p["lookahead"]) for p in param_sets if "lookahead" in p]
+    )
+    prices = resolve_prices(grid_costs, hourly_data, lookahead=lookahead)
+    arrays = {
+        "labels": store.labels,
+        "consumption": store.total_consumption(),
+        "production": store.total_production(),
+        "purchase": prices.purchase,
+        "sale": prices.sale,
+        "hour_of_day": prices.hour_of_day,
+    }
+    workers = workers or os.cpu_count() or 1
+    tasks = list(enumerate(param_sets))
+    inputs = {"profiles": store.fingerprint, "grid_costs": grid_costs}
+    if cache is not None and store.fingerprint is None:
+        cache = None  # no stable identity for the profiles
+    cache_spec = None if cache is None else (cache.directory, cache.max_bytes)
+    with SharedArrays(arrays) as shared:
+        initargs = (shared.handle, storages, agent, cache_spec, inputs)
+        try:
+            if workers == 1:
+                _init_worker(*initargs)
+                try:
+                    return [_run_one(task) for task in tasks]
+                finally:
+                    _worker.pop("shm").close()
+                    _worker.clear()
+            # A few chunks per worker keeps IPC low while balancing uneven runs
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=initargs
+            ) as pool:
+                return list(pool.map(_run_one, tasks, chunksize=chunksize))
+        finally:
+            if cache is not None:
+                cache.evict()
+
+
+def write_summary(rows, path):
+    params = []
+    for row in rows:
+        params += [key for key in row if key not in params]
+    fields = ["run"] + [
+        key for key in params if key != "run" and key not in SUMMARY_FIELDS
+    ]
+    fields += list(SUMMARY_FIELDS)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {
+                    key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                    for key, value in row.items()
+                }
+            )
+
+
+def add_arguments(parser):
+    parser.add_argument("storages", help="storage file path")
+    parser.add_argument("profiles", help="profiles directory path")
+    parser.add_argument("grid_costs", help="grid costs file path")
+    parser.add_argument("spec", help="JSON sweep spec (see expand_spec)")
+    parser.add_argument(
+        "--workers", type=int, help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--output",
+        help="summary CSV path (default: results/sweep_<timestamp>.csv)",
+    )
+    parser.add_argument("--samples", type=int, help="override the spec's samples")
+    parser.add_argument("--seed", type=int, help="override the spec's seed")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always simulate, neither reading nor storing the run cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"run cache directory (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=512,
+        metavar="MB",
+        help="run cache size limit; least recently used runs are evicted (default: 512)",
+    )
+    return parser
+
+
+def run(args):
+    with open(args.spec) as f:
+        spec = json.load(f)
+    if args.samples is not None:
+        spec["samples"] = args.samples
+    if args.seed is not None:
+        spec["seed"] = args.seed
+    param_sets = expand_spec(spec)
+
+    rows = run_sweep(
+        load_storages(args.storages),
+        load_profile_store(args.profiles),
+        load_grid_costs(args.grid_costs),
+        param_sets,
+        agent=spec.get("agent", DEFAULT_AGENT),
+        workers=args.workers,
+        cache=None
+        if args.no_cache
+        else RunCache(args.cache_dir, max_bytes=int(args.cache_size * 2**20)),
+    )
+
+    output = args.output
+    if output is None:
+        formatted_date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output = Path("results") / f"sweep_{formatted_date}.csv"
+    write_summary(rows, output)
+    print(f"{len(rows)} runs written to {output}")
@@ -1,2 +1,15 @@
-# fetchai-agent-simulation/fetchai-agent-simulation/operatorzy/utils/__init__.py
-# This file initializes the utils package.
+# Loading, output and profiling helpers; imported on first access.
+from operatorzy._lazy import lazy_exports
+
+_EXPORTS = {
+    "open_frontend_sink": ".frontend_output",
+    "load_profiles": ".helper_functions",
+    "load_storages": ".helper_functions",
+    "plot_results": ".helper_functions",
+    "save_results_to_csv": ".helper_functions",
+    "load_profile_store": ".profile_cache",
+    "ProfileStore": ".profile_store",
+    "PhaseProfiler": ".profiler",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,139 @@
+import json
+import os
+
+FORMATS = ("json", "ndjson")
+
+
+class JsonArraySink:
+    """Writes ``{"data": [...]}`` one record at a time, flushed in chunks.
+
+    With ``indent=2`` the finished file is byte-identical to
+    ``json.dump({"data": records}, f, indent=2)``; ``compact=True`` drops all
+    whitespace. Until ``close`` the file is an unterminated array, which the
+    dashboard's reader (``frontend/lib/stream-data.ts``) cuts back to the last
+    complete record.
+
+    Pickling a sink flushes it and records how far the file is written; the
+    unpickled sink cuts the file back to that point on its first write and
+    continues from there, so a run resumed from a checkpoint produces the same
+    file as an uninterrupted one. Writing after ``close`` works the same way:
+    the closing brackets are cut off and the array goes on, so a run continued
+    by another ``simulate`` call ends up with one file.
+    """
+
+    def __init__(self, path, compact=False, chunk_size=256):
+        self.path = path
+        self.chunk_size = chunk_size
+        if compact:
+            self._dumps = _compact_dumps
+            self._head, self._sep, self._tail = '{"data":[', ",", "]}"
+            self._empty = '{"data":[]}'
+        else:
+            self._dumps = _indented_dumps
+            self._head, self._sep, self._tail = '{\n  "data": [\n', ",\n", "\n  ]\n}"
+            self._empty = '{\n  "data": []\n}'
+        self._file = None
+        self._chunk = []
+        self.count = 0
+        self._resume_at = None
+
+    def write(self, record):
+        if self._file is None:
+            self._open()
+        self._chunk.append(self._dumps(record))
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._resume_at is None:
+            self._file = open(self.path, "w")
+            return
+        self._file = open(self.path, "r+")
+        self._file.truncate(self._resume_at)
+        self._file.seek(self._resume_at)
+        self._resume_at = None
+
+    def flush(self):
+        if not self._chunk:
+            return
+        prefix = self._sep if self.count else self._head
+        self._file.write(prefix + self._sep.join(self._chunk))
+        self._file.flush()
+        self.count += len(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        if self._file is None:
+            self._open()
+        self.flush()
+        end = self._file.tell()
+        self._file.write(self._tail if self.count else self._empty)
+        self._file.close()
+        self._file = None
+        self._resume_at = end
+
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        state["_file"] = None
+        if self._file is not None:
+            state["_resume_at"] = self._file.tell()
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NdjsonSink(JsonArraySink):
+    """One compact JSON record per line; every flushed line is complete."""
+
+    def __init__(self, path, chunk_size=256):
+        super().__init__(path, compact=True, chunk_size=chunk_size)
+
+    def flush(self):
+        if not self._chunk:
+            return
+        self._file.write("\n".join(self._chunk) + "\n")
+        self._file.flush()
+        self.count += len(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        if self._file is None:
+            self._open()
+        self.flush()
+        self._resume_at = self._file.tell()
+        self._file.close()
+        self._file = None
+
+
+def open_frontend_sink(path, format=None, compact=False, chunk_size=256):
+    """Sink for the dashboard records of a run.
+
+    ``format`` is ``"json"`` or ``"ndjson"``; by default it follows the file
+    suffix (``.ndjson``/``.jsonl`` mean NDJSON). Returns None for no path.
+    """
+    if not path:
+        return None
+    path = os.fspath(path)
+    if format is None:
+        format = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "json"
+    if format == "ndjson":
+        return NdjsonSink(path, chunk_size=chunk_size)
+    if format == "json":
+        return JsonArraySink(path, compact=compact, chunk_size=chunk_size)
+    raise ValueError(f"Unknown frontend output format {format!r}, expected one of {FORMATS}")
+
+
+def _compact_dumps(record):
+    return json.dumps(record, separators=(",", ":"))
+
+
+def _indented_dumps(record):
+    return "    " + json.dumps(record, indent=2).replace("\n", "\n    ")
@@ -1,25 +1,46 @@
-import matplotlib.pyplot as plt
 import os
-import pandas as pd
+import re
+
+# pandas and matplotlib are imported by the functions that use them, so that
+# importing this module (and the CLI, sweep workers) stays fast
 
 def load_profiles(directory):
+    import pandas as pd
+
     profiles = {}
-    for filename in os.listdir(directory):
+    sources = {}
+    for filename in sorted(os.listdir(directory)):
         if filename.endswith(".csv"):
             filepath = os.path.join(directory, filename)
             df = pd.read_csv(filepath)
-            ppe = filename.split('_')[-1].split('.')[0]  # Wyciągnij nazwę PPE z nazwy pliku
+            # Wyciągnij nazwę PPE z nazwy pliku: "PPE_<n>", or the whole file name
+            match = re.search(r"PPE_\d+", filename)
+            ppe = match.group() if match else filename[: -len(".csv")]
+            if ppe in profiles:
+                raise ValueError(
+                    f"Profiles {sources[ppe]} and {filename} both belong to {ppe}"
+                )
             profiles[ppe] = df
+            sources[ppe] = filename
     return profiles
 
 def load_storages(filepath):
+    import pandas as pd
+
     storages = []
     df = pd.read_csv(filepath, comment='#')
+    optional = [key for key in ('max_charge', 'max_discharge', 'efficiency') if key in df.columns]
     for _, row in df.iterrows():
-        storages.append({'id': row['id'], 'capacity': row['capacity']})
+        storage = {'id': row['id'], 'capacity': row['capacity']}
+        for key in optional:
+            if pd.notna(row[key]):
+                storage[key] = row[key]
+        storages.append(storage)
     return storages
 
 def save_results_to_csv(cooperative, time_labels, results_dir, formatted_date):
+    import pandas as pd
+
     data = {
         'Time': time_labels,
         'Total Consumption': cooperative.history_consumption,
@@ -41,6 +62,8 @@ def save_results_to_csv(cooperative, time_labels, results_dir, formatted_date):
     
 
 def plot_results(self, steps, labels, results_dir, formatted_date):
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(6, 1, figsize=(15, 30))
     
     ax[0].plot(range(steps), self.history_consumption, label='Total Consumption')
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Constant-memory latency recorder with log-spaced buckets.
+
+    Bucket edges grow by ``1 + precision`` from ``lowest`` to ``highest``
+    seconds, so any percentile is reported within ``precision`` (1% by
+    default) of the exact value, however many samples are recorded. Values
+    outside the range land in the first or last bucket; the exact minimum,
+    maximum and mean are tracked separately.
+    """
+
+    def __init__(self, lowest=1e-6, highest=100.0, precision=0.01):
+        self.lowest = lowest
+        self._log_base = math.log1p(precision)
+        self._buckets = int(math.log(highest / lowest) / self._log_base) + 2
+        self.counts = np.zeros(self._buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, seconds):
+        if seconds <= self.lowest:
+            return 0
+        bucket = int(math.log(seconds / self.lowest) / self._log_base) + 1
+        return min(bucket, self._buckets - 1)
+
+    def record(self, seconds):
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the ``q``-th percentile, in seconds."""
+        if not self.count:
+            return math.nan
+        rank = max(1, math.ceil(q / 100 * self.count))
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank))
+        edge = self.lowest * math.exp(bucket * self._log_base)
+        return min(max(edge, self.min), self.max)
+
+    def summary(self, percentiles=PERCENTILES):
+        """Count, mean, min, max and ``percentiles`` in milliseconds."""
+        summary = {"count": self.count}
+        if self.count:
+            summary["mean_ms"] = self.total / self.count * 1e3
+            summary["min_ms"] = self.min * 1e3
+            summary.update(
+                {f"p{q:g}_ms": self.percentile(q) * 1e3 for q in percentiles}
+            )
+            summary["max_ms"] = self.max * 1e3
+        return summary
@@ -0,0 +1,186 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Panels of the results figure: name, title, y label and (history column,
+# legend label) pairs; the storage panel gets one line per storage
+PANELS = (
+    (
+        "energy",
+        "Energy Consumption and Production",
+        "Energy (kWh)",
+        (("consumption", "Total Consumption"), ("production", "Total Production")),
+    ),
+    (
+        "prices",
+        "Energy Prices Over Time",
+        "Price (Tokens/kWh)",
+        (
+            ("p2p_price", "P2P Price"),
+            ("purchase_price", "Purchase Grid Price"),
+            ("grid_price", "Sale Grid Price"),
+        ),
+    ),
+    ("storage", "Storage Levels Over Time", "Energy (kWh)", ()),
+    ("deficit", "Energy Deficit Over Time", "Energy (kWh)", (("energy_deficit", "Energy Deficit"),)),
+    ("surplus", "Energy Surplus Over Time", "Energy (kWh)", (("energy_surplus", "Energy Surplus"),)),
+    ("tokens", "Token Balance Over Time", "Tokens", (("token_balance", "Token Balance"),)),
+)
+METHODS = ("minmax", "lttb")
+PANEL_SIZE = (15, 5)  # inches, as one row of the original 15x30 figure
+
+
+def minmax_indices(y, points):
+    """Indices keeping the min and max of ``y`` in ``points // 2`` buckets.
+
+    Every peak and trough survives, so the drawn envelope matches the full
+    series at screen resolution. The first and last points are kept.
+    """
+    n = len(y)
+    buckets = max(points // 2, 1)
+    if n <= points:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    rows = np.arange(buckets) * size
+    valid = rows < n
+    padding = np.isnan(padded)
+    low = rows + np.argmin(np.where(padding, np.inf, padded), axis=1)
+    high = rows + np.argmax(np.where(padding, -np.inf, padded), axis=1)
+    return np.unique(np.concatenate(([0], low[valid], high[valid], [n - 1])))
+
+
+def lttb_indices(y, points):
+    """Largest-Triangle-Three-Buckets: ``points`` indices preserving the shape.
+
+    Each bucket keeps the point forming the largest triangle with the point
+    kept before it and the mean of the next bucket.
+    """
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    indices = np.empty(points, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+    # Mean of every bucket, for the "next bucket" corner of the triangle
+    x_means = (edges[:-1] + edges[1:] - 1) / 2
+    sums = np.add.reduceat(y[: n - 1], edges[:-1])
+    y_means = np.r_[sums / np.diff(edges), y[-1]]
+    x_means = np.r_[x_means, n - 1]
+    previous = 0
+    for b in range(points - 2):
+        start, stop = edges[b], edges[b + 1]
+        x = np.arange(start, stop)
+        area = np.abs(
+            (previous - x_means[b + 1]) * (y[start:stop] - y[previous])
+            - (previous - x) * (y_means[b + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        indices[b + 1] = previous
+    return indices
+
+
+def downsample(y, points, method="minmax"):
+    """``(x, y)`` of at most about ``points`` points of the series ``y``."""
+    y = np.asarray(y, dtype=np.float64)
+    if method == "minmax":
+        x = minmax_indices(y, points)
+    elif method == "lttb":
+        x = lttb_indices(y, points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method!r}, expected one of {METHODS}")
+    return x, y[x]
+
+
+def panel_lines(history, storage_names, points=2000, method="minmax"):
+    """Downsampled ``(label, x, y)`` lines of every panel, by panel name."""
+    lines = {}
+    for name, _, _, series in PANELS:
+        if name == "storage":
+            series = [(f"storage_{s}", f"Storage Level {s}") for s in storage_names]
+        lines[name] = [
+            (label, *downsample(history.column(column), points, method))
+            for column, label in series
+        ]
+    return lines
+
+
+def _draw(ax, panel, lines, ticks):
+    _, title, ylabel, _ = panel
+    for label, x, y in lines:
+        ax.plot(x, y, label=label, linewidth=0.8)
+    ax.set_title(title)
+    ax.set_xlabel("Time")
+    ax.set_ylabel(ylabel)
+    ax.legend(loc="upper left", bbox_to_anchor=(1, 1))
+    positions, tick_labels = ticks
+    ax.set_xticks(positions)
+    ax.set_xticklabels(tick_labels, rotation=90)
+
+
+def _render(job):
+    """Draw ``panels`` into one PNG with the non-interactive Agg canvas."""
+    path, panels, ticks, dpi = job
+    # Figure + Agg canvas instead of pyplot: no GUI backend, no global state
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(PANEL_SIZE[0], PANEL_SIZE[1] * len(panels)))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(len(panels), 1, squeeze=False)[:, 0]
+    for ax, (panel, lines) in zip(axes, panels):
+        _draw(ax, panel, lines, ticks)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def plot_history(
+    history,
+    storage_names,
+    labels,
+    results_dir,
+    formatted_date,
+    points=2000,
+    method="minmax",
+    separate=False,
+    workers=None,
+    dpi=100,
+):
+    """Plot the result panels from downsampled history series.
+
+    Draws the same six panels as ``plot_results`` after reducing every series
+    to about ``points`` points. With ``separate=True`` each panel goes to
+    its own ``simulation_plots_<date>_<panel>.png``, rendered in parallel
+    over ``workers`` processes. Returns the written paths.
+    """
+    import matplotlib.figure  # noqa: F401  (loaded once, before any fork)
+
+    # About 30 date ticks, like ``plot_results``
+    every = max(1, len(history) // 30)
+    ticks = (list(range(0, len(history), every)), list(labels[::every]))
+    lines = panel_lines(history, storage_names, points, method)
+    panels = [(panel, lines[panel[0]]) for panel in PANELS]
+    if not separate:
+        path = os.path.join(results_dir, f"simulation_plots_{formatted_date}.png")
+        return [_render((path, panels, ticks, dpi))]
+
+    jobs = [
+        (
+            os.path.join(results_dir, f"simulation_plots_{formatted_date}_{panel[0]}.png"),
+            [(panel, data)],
+            ticks,
+            dpi,
+        )
+        for panel, data in panels
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, jobs))
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+
+from operatorzy.utils.profile_store import ProfileStore
+
+CACHE_DIRNAME = ".profile_cache"
+CACHE_VERSION = 1
+_ARRAYS = ("labels", "production", "consumption")
+
+
+def profile_manifest(directory):
+    """Name, size and mtime of every profile CSV, in ``load_profiles`` order."""
+    files = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".csv"):
+            st = os.stat(os.path.join(directory, filename))
+            files.append(
+                {"name": filename, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            )
+    return {"version": CACHE_VERSION, "files": files}
+
+
+def manifest_fingerprint(manifest):
+    payload = json.dumps(manifest, sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def load_profile_store(directory, cache_dir=None, refresh=False):
+    """Load a profile directory through a memory-mappable ``.npy`` cache.
+
+    The first load parses the CSVs and writes one ``.npy`` file per column plus
+    a ``manifest.json``; later loads memory-map the arrays as long as the
+    profile file names, sizes and mtimes still match the manifest.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(directory, CACHE_DIRNAME)
+    fingerprint = manifest_fingerprint(profile_manifest(directory))
+
+    if not refresh:
+        store = _read_cache(cache_dir, fingerprint)
+        if store is not None:
+            return store
+
+    store = ProfileStore.load(directory)
+    store.fingerprint = fingerprint
+    try:
+        _write_cache(cache_dir, fingerprint, store)
+    except OSError:
+        pass  # read-only profile directory: run uncached
+    return store
+
+
+def _read_cache(cache_dir, fingerprint):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("fingerprint") != fingerprint:
+        return None
+    try:
+        arrays = {
+            name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+            for name in _ARRAYS
+        }
+    except (OSError, ValueError):
+        return None
+    store = ProfileStore(
+        manifest["names"],
+        arrays["labels"],
+        arrays["production"],
+        arrays["consumption"],
+    )
+    store.fingerprint = fingerprint
+    return store
+
+
+def _write_cache(cache_dir, fingerprint, store):
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under unique temporary names and swap them in, so concurrent runs
+    # never memory-map a half-written file; the manifest goes last.
+    suffix = f".{uuid.uuid4().hex}.tmp"
+    for name in _ARRAYS:
+        tmp = os.path.join(cache_dir, f"{name}{suffix}")
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(getattr(store, name)))
+        os.replace(tmp, os.path.join(cache_dir, f"{name}.npy"))
+    tmp = os.path.join(cache_dir, f"manifest{suffix}")
+    with open(tmp, "w") as f:
+        json.dump({"fingerprint": fingerprint, "names": store.names}, f)
+    os.replace(tmp, os.path.join(cache_dir, "manifest.json"))
@@ -0,0 +1,110 @@
+import numpy as np
+
+from operatorzy.utils.helper_functions import load_profiles
+
+
+class ProfileStore:
+    """Aligned columnar view over the PV/consumption profiles of every PPE.
+
+    Production and consumption are kept as ``(n_ppe, steps)`` float arrays so
+    community totals are a single reduction and per-PPE rows or time windows
+    are plain NumPy views (no copies). Profiles are aligned by position, as the
+    original per-hour aggregation did, and truncated to the shortest one.
+    """
+
+    def __init__(self, names, labels, production, consumption, timestamps=None):
+        self.names = list(names)
+        self.labels = np.asarray(labels)
+        self._timestamps = timestamps
+        self.production = production
+        self.consumption = consumption
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.fingerprint = None
+
+    @classmethod
+    def from_profiles(cls, profiles):
+        """Build a store from the ``{ppe: DataFrame}`` dict of ``load_profiles``."""
+        if not profiles:
+            raise ValueError("No profiles to load")
+        names = list(profiles)
+        frames = list(profiles.values())
+        steps = min(len(df) for df in frames)
+        # Date labels come from the last profile, like the legacy hourly loop
+        labels = frames[-1]["hour"].to_numpy(dtype=str)[:steps]
+        production = np.stack(
+            [df["production"].to_numpy(dtype=np.float64)[:steps] for df in frames]
+        )
+        consumption = np.stack(
+            [df["consumption"].to_numpy(dtype=np.float64)[:steps] for df in frames]
+        )
+        return cls(names, labels, production, consumption)
+
+    @classmethod
+    def load(cls, directory):
+        return cls.from_profiles(load_profiles(directory))
+
+    def __len__(self):
+        return self.production.shape[1]
+
+    @property
+    def timestamps(self):
+        if self._timestamps is None:
+            self._timestamps = self.labels.astype("datetime64[m]")
+        return self._timestamps
+
+    @property
+    def n_ppe(self):
+        return self.production.shape[0]
+
+    def total_production(self):
+        return self.production.sum(axis=0)
+
+    def total_consumption(self):
+        return self.consumption.sum(axis=0)
+
+    def ppe(self, name):
+        """Single-PPE view of the store."""
+        i = self._index[name]
+        return ProfileStore(
+            [name],
+            self.labels,
+            self.production[i : i + 1],
+            self.consumption[i : i + 1],
+            self._timestamps,
+        )
+
+    def window(self, start=None, stop=None):
+        """Time-range view; bounds are step indices or timestamps (stop exclusive)."""
+        start = self._position(start, 0)
+        stop = self._position(stop, len(self))
+        timestamps = self._timestamps
+        return ProfileStore(
+            self.names,
+            self.labels[start:stop],
+            self.production[:, start:stop],
+            self.consumption[:, start:stop],
+            None if timestamps is None else timestamps[start:stop],
+        )
+
+    def _position(self, bound, default):
+        if bound is None:
+            return default
+        if isinstance(bound, (int, np.integer)):
+            return int(bound)
+        return int(
+            np.searchsorted(self.timestamps, np.datetime64(bound, "m"), side="left")
+        )
+
+    def hourly_data(self):
+        """Community totals in the ``hourly_data`` format used by ``Cooperative``."""
+        consumption = self.total_consumption().tolist()
+        production = self.total_production().tolist()
+        return [
+            {
+                "hour": hour,
+                "consumption": consumption[hour],
+                "production": production[hour],
+                "date": date,
+            }
+            for hour, date in enumerate(self.labels.tolist())
+        ]
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+from collections import Counter
+
+
+class PhaseProfiler:
+    """Opt-in per-phase timer and event counters for a simulation loop.
+
+    The loop calls ``begin`` at the start of a step, ``mark(phase)`` after each
+    phase (the time since the previous mark goes to ``phase``), ``count`` for
+    events and ``end`` when the step is done. Times come from the monotonic
+    ``time.perf_counter_ns``. With ``trace=True`` every phase interval is
+    also kept for a Chrome trace (``write_trace``; open it in
+    ``chrome://tracing`` or Perfetto).
+
+    Callers keep ``None`` instead of a profiler when profiling is off, so a
+    disabled run pays one ``is not None`` check per phase.
+    """
+
+    def __init__(self, trace=False, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.trace = trace
+        self.phases = {}  # phase -> [calls, total ns]
+        self.counters = Counter()
+        self.steps = 0
+        self.step_ns = 0
+        self._events = []  # (phase, start ns, duration ns) when tracing
+        self._origin = clock()
+        self._step_start = self._last = self._origin
+
+    def begin(self):
+        self._step_start = self._last = self.clock()
+
+    def mark(self, phase):
+        now = self.clock()
+        elapsed = now - self._last
+        stats = self.phases.get(phase)
+        if stats is None:
+            self.phases[phase] = [1, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+        if self.trace:
+            self._events.append((phase, self._last, elapsed))
+        self._last = now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def end(self):
+        now = self.clock()
+        self.steps += 1
+        self.step_ns += now - self._step_start
+        if self.trace:
+            self._events.append(("step", self._step_start, now - self._step_start))
+        self._last = now
+
+    def summary(self):
+        """Per-phase calls, total and mean seconds and share of step time."""
+        total = self.step_ns or 1
+        return {
+            "steps": self.steps,
+            "step_seconds": self.step_ns / 1e9,
+            "phases": {
+                phase: {
+                    "calls": calls,
+                    "seconds": ns / 1e9,
+                    "mean_us": ns / calls / 1e3,
+                    "share": ns / total,
+                }
+                for phase, (calls, ns) in sorted(
+                    self.phases.items(), key=lambda item: -item[1][1]
+                )
+            },
+            "counters": dict(self.counters),
+        }
+
+    def report(self):
+        summary = self.summary()
+        lines = [
+            f"Profile: {summary['steps']} steps in {summary['step_seconds']:.3f} s",
+            f"{'phase':<12} {'calls':>8} {'total ms':>10} {'mean us':>9} {'share':>6}",
+        ]
+        for phase, stats in summary["phases"].items():
+            lines.append(
+                f"{phase:<12} {stats['calls']:>8} {stats['seconds'] * 1e3:>10.2f} "
+                f"{stats['mean_us']:>9.2f} {stats['share']:>6.1%}"
+            )
+        if summary["counters"]:
+            lines.append(
+                "Counters: "
+                + ", ".join(f"{name}={value:g}" for name, value in summary["counters"].items())
+            )
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Write the recorded intervals in the Chrome trace event format."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": phase,
+                "cat": "step" if phase == "step" else "phase",
+                "ph": "X",
+                "ts": (start - self._origin) / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": 0,  # phases nest inside their step
+            }
+            for phase, start, duration in self._events
+        ]
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                    "otherData": self.summary(),
+                },
+                f,
+            )
+
+
+def make_profiler(enabled=False, trace_path=None):
+    """``PhaseProfiler`` when profiling or tracing is requested, else None."""
+    if not enabled and trace_path is None:
+        return None
+    return PhaseProfiler(trace=trace_path is not None)
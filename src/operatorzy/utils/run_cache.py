@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "operatorzy", "runs")
+DEFAULT_MAX_BYTES = 512 * 2**20
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_code_fingerprint = None
+
+
+def code_fingerprint():
+    """Package version plus name, size and mtime of every module in the package.
+
+    Part of every run key, so editing the simulation code (even in an
+    uninstalled checkout) invalidates results computed by the old code.
+    """
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        from importlib import metadata
+
+        try:
+            version = metadata.version("operatorzy")
+        except metadata.PackageNotFoundError:
+            version = None
+        files = []
+        for root, dirs, names in os.walk(_PACKAGE_DIR):
+            dirs.sort()
+            for name in sorted(names):
+                if name.endswith(".py"):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    files.append(
+                        (os.path.relpath(path, _PACKAGE_DIR), st.st_size, st.st_mtime_ns)
+                    )
+        _code_fingerprint = _digest({"version": version, "files": files})
+    return _code_fingerprint
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    raise TypeError(f"Cannot hash {type(value).__name__} in a run key")
+
+
+def _digest(payload):
+    text = json.dumps(payload, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def run_key(**inputs):
+    """Stable hash of everything that determines a run's results.
+
+    ``inputs`` are JSON-compatible values (NumPy scalars and arrays are
+    converted), e.g. the profile fingerprint, storage configs, tariff, agent
+    name and parameters and the economic constants. The cache format version
+    and the package code fingerprint are always included.
+    """
+    return _digest(
+        {"cache_version": CACHE_VERSION, "code": code_fingerprint(), "inputs": inputs}
+    )
+
+
+class CachedRun:
+    """A cache hit: the stored ``meta`` dict, arrays and output files."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+
+    def array(self, name):
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    def file(self, name):
+        """Path of the stored output file ``name``, or None if not stored."""
+        stored = self.meta["files"].get(name)
+        return None if stored is None else os.path.join(self.path, stored)
+
+    def copy_file(self, name, destination):
+        """Copy the stored file ``name`` to ``destination``; False if absent."""
+        source = self.file(name)
+        if source is None or destination is None:
+            return False
+        shutil.copyfile(source, destination)
+        return True
+
+
+class RunCache:
+    """Content-addressed store of finished runs in a local directory.
+
+    Each entry is a directory named by its ``run_key`` holding ``meta.json``,
+    ``.npy`` arrays and copies of output files. Entries are written under a
+    temporary name and renamed into place, so readers never see a partial
+    one. The total size is kept under ``max_bytes`` by evicting the least
+    recently used entries (hits refresh an entry's ``meta.json`` mtime).
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.fspath(directory or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            os.utime(os.path.join(path, "meta.json"))
+        except (OSError, ValueError):
+            return None
+        return CachedRun(path, meta)
+
+    def put(self, key, meta, arrays=None, files=None, evict=True):
+        """Store a run; ``files`` maps names to output paths to copy.
+
+        Pass ``evict=False`` when storing many small entries in a row and
+        call ``evict`` once afterwards.
+        """
+        tmp = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.makedirs(tmp)
+            for name, array in (arrays or {}).items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+            stored = {}
+            for name, source in (files or {}).items():
+                if source is not None and os.path.exists(source):
+                    stored[name] = f"{name}{os.path.splitext(os.fspath(source))[1]}"
+                    shutil.copyfile(source, os.path.join(tmp, stored[name]))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(
+                    {**meta, "files": stored, "created": time.time()},
+                    f,
+                    default=_jsonable,
+                )
+            os.replace(tmp, os.path.join(self.directory, key))
+        except OSError:
+            # Read-only directory, or another process stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        if evict:
+            self.evict()
+
+    def entries(self):
+        """``(last_used, bytes, path)`` of every entry, least recent first."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.startswith("."):
+                continue
+            try:
+                last_used = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except OSError:
+                continue
+            entries.append((last_used, size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
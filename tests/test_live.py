@@ -0,0 +1,111 @@
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from operatorzy.models.cooperative import Cooperative
+from operatorzy.simulation.energy_community_simulation import load_grid_costs
+from operatorzy.simulation.live import FileTailSource, LiveRuntime, ReplaySource
+from operatorzy.utils.helper_functions import load_storages
+from operatorzy.utils.profile_store import ProfileStore
+
+ROOT = Path(__file__).resolve().parents[1]
+ECONOMICS = (0.5, 0.2, 0.1, 0.1)
+
+
+class ListSink:
+    """Keeps every published decision; ``delay`` seconds per publish."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.records = []
+        self.closed = False
+
+    async def publish(self, record):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.records.append(record)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(scope="module")
+def store():
+    return ProfileStore.load(ROOT / "pv_profiles_2_days")
+
+
+@pytest.fixture(scope="module")
+def grid_costs():
+    return load_grid_costs(ROOT / "grid_costs.json")
+
+
+@pytest.fixture(scope="module")
+def config():
+    return {"storages": load_storages(ROOT / "storages.csv")}
+
+
+@pytest.mark.parametrize("agent", ["ultimate_v2", "hybrid", "mpc"])
+def test_aggregate_replay_matches_simulate(store, grid_costs, config, agent):
+    config = dict(config, agent=agent)
+    sink = ListSink()
+    runtime = LiveRuntime(config, grid_costs, sink=sink)
+    stats = asyncio.run(runtime.run(ReplaySource(store, aggregate=True)))
+    assert sink.closed
+    assert stats["readings"] == stats["decisions"] == len(store)
+
+    hourly_data = store.hourly_data()
+    cooperative = Cooperative(
+        dict(config, frontend_output=None, log_level="OFF"), initial_token_balance=100
+    )
+    cooperative.simulate(len(hourly_data), *ECONOMICS, hourly_data, grid_costs)
+    history = cooperative.history
+
+    assert [record["step"] for record in sink.records] == list(range(len(store)))
+    np.testing.assert_array_equal(
+        [record["token_balance"] for record in sink.records],
+        history.column("token_balance"),
+    )
+    np.testing.assert_array_equal(
+        [record["storage_levels"] for record in sink.records],
+        np.column_stack(
+            [history.column(f"storage_{storage.name}") for storage in cooperative.storages]
+        ),
+    )
+    site = runtime.sites["community"]
+    assert site.community_token_balance == cooperative.community_token_balance
+    assert site.token_balances == cooperative.token_balances
+
+
+def test_queues_stay_bounded_under_a_slow_sink(store, grid_costs, config):
+    sink = ListSink(delay=0.001)
+    runtime = LiveRuntime(config, grid_costs, sink=sink, queue_size=4, max_in_flight=64)
+    source = ReplaySource(store, sites=20, steps=12)
+    stats = asyncio.run(runtime.run(source))
+    assert stats["decisions"] == len(sink.records) == len(source)
+    # The sink is the bottleneck, so the queues do fill up, but no further
+    assert stats["max_queue_depth"] == runtime.queue_size
+
+
+def test_file_tail_holds_back_a_partial_line(tmp_path):
+    path = tmp_path / "meters.ndjson"
+    first = {"site": "PPE_1", "date": "2023-06-01 00:00", "consumption": 1.0, "production": 0.5}
+    second = dict(first, date="2023-06-01 01:00", consumption=2.0)
+    line = json.dumps(second)
+    path.write_text(json.dumps(first) + "\n" + line[:20])
+
+    async def main():
+        readings = aiter(FileTailSource(path, poll_interval=0.01))
+        assert await anext(readings) == first
+        pending = asyncio.ensure_future(anext(readings))
+        # The cut-off line must not be parsed (or fail) before it is complete
+        done, _ = await asyncio.wait([pending], timeout=0.1)
+        assert not done
+        with open(path, "a") as f:
+            f.write(line[20:] + "\n" + json.dumps({"end": True}) + "\n")
+        assert await pending == second
+        assert [reading async for reading in readings] == []
+
+    asyncio.run(main())